@@ -0,0 +1,221 @@
+"""
+Banc de mesure des étapes de vérification d'un classeur
+
+    python -m benchmarks.bench                          # 1k / 50k / 300k lignes, comparé à baseline.json
+    python -m benchmarks.bench --tailles 1000 50000     # tailles choisies
+    python -m benchmarks.bench --fixtures               # classeurs versionnés de benchmarks/fixtures
+    python -m benchmarks.bench --enregistrer            # remplace la référence par les mesures
+
+Chaque étape (ouverture, en-têtes, chargement, codes clients, colonnes
+numériques, rapport) est chronométrée séparément, ainsi que, avec pyarrow,
+le chemin des instantanés (premier chargement écrivant l'instantané, puis
+relecture par mappage mémoire) (meilleur temps sur
+--repetitions passages), puis un passage sous tracemalloc relève le pic
+mémoire de chaque étape. Le code de sortie vaut 1 si une mesure dépasse
+la référence de plus de --seuil.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generer_classeur import REPERTOIRE_FIXTURES, ecrire_classeur, generer_fixtures  # noqa: E402
+from verificateur import (REGLES_FEUILLE, ClasseurXlsb, InstantanesFeuilles, SPECS_FEUILLES,  # noqa: E402
+                          colonnes_projetees, construire_rapport, instantanes_disponibles, preparer_contexte,
+                          traiter_fichier)
+
+ETAPES = ["ouverture", "entetes", "chargement", "chargement_instantane", "relecture_instantane", "codes_clients",
+          "numeriques", "rapport", "total"]
+TAILLES_DEFAUT = [1_000, 50_000, 300_000]
+FICHIER_REFERENCE = Path(__file__).resolve().parent / "baseline.json"
+SEUIL_DEFAUT = 0.25
+# En dessous de ces écarts absolus, une variation relative est du bruit de mesure
+PLANCHER_TEMPS = 0.02
+PLANCHER_MEMOIRE_MO = 5.0
+# Erreurs injectées dans les classeurs générés : les chemins d'erreur sont aussi mesurés
+OPTIONS_GENERATION = dict(doublons=1, codes_invalides=0.01, non_numeriques=0.001)
+
+def _classeur_genere(nb_lignes, repertoire):
+    """Classeur synthétique de nb_lignes, réutilisé tant que le générateur ne change pas"""
+    version = hashlib.sha256(Path(sys.modules[ecrire_classeur.__module__].__file__).read_bytes()).hexdigest()[:8]
+    chemin = Path(repertoire) / f"plan_{nb_lignes}_{version}.xlsb"
+    if not chemin.exists():
+        print(f"Génération de {chemin.name}...", file=sys.stderr)
+        temporaire = chemin.with_suffix(".tmp")
+        ecrire_classeur(temporaire, nb_lignes, **OPTIONS_GENERATION)
+        temporaire.replace(chemin)
+    return chemin
+
+def _executer_etapes(chemin, mesurer, resultat, instantanes=None):
+    """
+    Rejoue traiter_fichier étape par étape ; mesurer(etape) encadre chaque étape.
+    Le rapport est construit à partir de resultat, calculé une fois pour toutes.
+    Avec un magasin d'instantanés, les feuilles sont aussi lues en écrivant leur
+    instantané, puis relues depuis celui-ci (hors du total, qui reste le
+    chemin sans instantané).
+    """
+    if instantanes is not None:
+        with ClasseurXlsb(chemin) as classeur:
+            empreintes = {spec['nom_feuille']: classeur.empreinte_feuille(spec['nom_feuille']) for spec in SPECS_FEUILLES}
+            with mesurer("chargement_instantane"):
+                for spec in SPECS_FEUILLES:
+                    nom_feuille = spec['nom_feuille']
+                    with instantanes.ecrivain(empreintes[nom_feuille], nom_feuille) as ecrivain:
+                        classeur.lire_feuille(nom_feuille, colonnes_projetees(spec), ecrivain)
+        with mesurer("relecture_instantane"):
+            for spec in SPECS_FEUILLES:
+                instantanes.lire(empreintes[spec['nom_feuille']], spec['nom_feuille'], colonnes_projetees(spec))
+
+    with mesurer("total"):
+        with mesurer("ouverture"):
+            classeur = ClasseurXlsb(chemin)
+        with classeur:
+            with mesurer("entetes"):
+                for spec in SPECS_FEUILLES:
+                    classeur.lire_entete(spec['nom_feuille'])
+            with mesurer("chargement"):
+                feuilles = [(spec, classeur.lire_feuille(spec['nom_feuille'], colonnes_projetees(spec))[1])
+                            for spec in SPECS_FEUILLES]
+        # Règles évaluées isolément (REGLES_FEUILLE, comme evaluer_regle) sur un contexte préparé une fois
+        with mesurer("codes_clients"):
+            contextes = [(spec, preparer_contexte(df, spec)) for spec, df in feuilles]
+            for spec, contexte in contextes:
+                REGLES_FEUILLE['codes'](contexte, spec)
+        with mesurer("numeriques"):
+            for spec, contexte in contextes:
+                REGLES_FEUILLE['colonnes_numeriques'](contexte, spec)
+    with mesurer("rapport"):
+        construire_rapport([resultat])
+
+def mesurer_fichier(chemin, repetitions=3):
+    """Meilleur temps (s) et pic mémoire tracemalloc (Mo) de chaque étape"""
+    resultat = traiter_fichier(Path(chemin).name, chemin)
+    temps = {}
+    pics = {}
+
+    @contextmanager
+    def chronometre(etape):
+        debut = time.perf_counter()
+        yield
+        duree = time.perf_counter() - debut
+        temps[etape] = min(temps.get(etape, duree), duree)
+
+    @contextmanager
+    def pic_memoire(etape):
+        # Pic mesuré depuis le début de l'étape, au-dessus de la mémoire déjà allouée
+        depart, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        yield
+        _, pic = tracemalloc.get_traced_memory()
+        pics[etape] = max(pic - depart, 0) / 1024 / 1024
+
+    # Magasin d'instantanés propre au banc, supprimé à la fin de la mesure
+    with tempfile.TemporaryDirectory() as repertoire_instantanes:
+        instantanes = InstantanesFeuilles(repertoire_instantanes) if instantanes_disponibles() else None
+        for _ in range(repetitions):
+            _executer_etapes(chemin, chronometre, resultat, instantanes)
+
+        tracemalloc.start()
+        try:
+            _executer_etapes(chemin, pic_memoire, resultat, instantanes)
+        finally:
+            tracemalloc.stop()
+
+    return {'temps': temps, 'pic_memoire_mo': pics}
+
+def comparer(mesures, reference, seuil):
+    """Liste des régressions (libellés) des mesures par rapport à la référence"""
+    regressions = []
+    for taille, mesure in mesures.items():
+        ref = reference.get('resultats', {}).get(taille)
+        if ref is None:
+            continue
+        for cle, plancher, unite in (('temps', PLANCHER_TEMPS, 's'), ('pic_memoire_mo', PLANCHER_MEMOIRE_MO, 'Mo')):
+            for etape, valeur in mesure[cle].items():
+                valeur_ref = ref[cle].get(etape)
+                if valeur_ref is None:
+                    continue
+                if valeur > valeur_ref * (1 + seuil) and valeur - valeur_ref > plancher:
+                    regressions.append(f"{taille} / {etape} : {valeur:.3f} {unite} "
+                                       f"(référence {valeur_ref:.3f} {unite}, +{(valeur / valeur_ref - 1) * 100:.0f} %)")
+    return regressions
+
+def afficher(mesures, reference):
+    """Tableau des mesures, avec l'écart à la référence quand elle existe"""
+    for taille, mesure in mesures.items():
+        ref = reference.get('resultats', {}).get(taille, {})
+        print(f"\n{taille}")
+        print(f"  {'étape':<22}{'temps (s)':>12}{'réf.':>10}{'pic (Mo)':>12}{'réf.':>10}")
+        for etape in ETAPES:
+            temps = mesure['temps'].get(etape)
+            if temps is None:
+                continue
+            pic = mesure['pic_memoire_mo'].get(etape, 0.0)
+            temps_ref = ref.get('temps', {}).get(etape)
+            pic_ref = ref.get('pic_memoire_mo', {}).get(etape)
+            temps_ref = f"{temps_ref:.4f}" if temps_ref is not None else "-"
+            pic_ref = f"{pic_ref:.1f}" if pic_ref is not None else "-"
+            print(f"  {etape:<22}{temps:>12.4f}{temps_ref:>10}{pic:>12.1f}{pic_ref:>10}")
+
+def _analyser_arguments(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES_DEFAUT,
+                        help="Nombres de lignes du Référentiel des classeurs générés")
+    parser.add_argument("--fixtures", action="store_true", help="Mesure les classeurs de benchmarks/fixtures")
+    parser.add_argument("--repetitions", type=int, default=3, help="Passages chronométrés par classeur")
+    parser.add_argument("--reference", type=Path, default=FICHIER_REFERENCE, help="Fichier JSON de référence")
+    parser.add_argument("--seuil", type=float, default=SEUIL_DEFAUT,
+                        help=f"Régression tolérée, en fraction de la référence (défaut : {SEUIL_DEFAUT})")
+    parser.add_argument("--enregistrer", action="store_true", help="Écrit les mesures comme nouvelle référence")
+    parser.add_argument("--repertoire", type=Path, default=Path(tempfile.gettempdir()) / "verificateur_bench",
+                        help="Répertoire des classeurs générés (réutilisés d'une exécution à l'autre)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _analyser_arguments(argv)
+
+    if args.fixtures:
+        chemins = sorted(REPERTOIRE_FIXTURES.glob("*.xlsb")) or generer_fixtures()
+        classeurs = {chemin.name: chemin for chemin in chemins}
+    else:
+        args.repertoire.mkdir(parents=True, exist_ok=True)
+        classeurs = {str(taille): _classeur_genere(taille, args.repertoire) for taille in args.tailles}
+
+    mesures = {}
+    for nom, chemin in classeurs.items():
+        print(f"Mesure de {nom}...", file=sys.stderr)
+        mesures[nom] = mesurer_fichier(chemin, args.repetitions)
+
+    reference = json.loads(args.reference.read_text(encoding="utf-8")) if args.reference.exists() else {}
+    afficher(mesures, reference)
+
+    if args.enregistrer:
+        resultats = {**reference.get('resultats', {}), **mesures}
+        args.reference.write_text(json.dumps({
+            'machine': {'python': platform.python_version(), 'systeme': platform.platform(),
+                        'processeur': platform.processor() or platform.machine()},
+            'resultats': resultats
+        }, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nRéférence enregistrée dans {args.reference}")
+        return 0
+
+    regressions = comparer(mesures, reference, args.seuil)
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.seuil * 100:.0f} % :")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("\nAucune régression" if reference else "\nAucune référence : lancer avec --enregistrer")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
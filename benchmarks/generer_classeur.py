@@ -0,0 +1,258 @@
+"""
+Générateur de classeurs de plan de lignes synthétiques (onglets Référentiel et Promo)
+
+    python -m benchmarks.generer_classeur sortie.xlsb --lignes 50000 --codes-invalides 0.01
+    python -m benchmarks.generer_classeur --fixtures
+
+Le format est déduit de l'extension : .xlsx via openpyxl (mode write_only),
+.xlsb via un écrivain BIFF12 minimal (pyxlsb ne sait que lire). Les deux
+écrivains travaillent en flux : la mémoire ne dépend pas du nombre de lignes.
+"""
+
+import argparse
+import datetime
+import random
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from verificateur.regles import (  # noqa: E402
+    CODES_CLIENTS_AUTORISES,
+    COLONNES_NUMERIQUES,
+    COLONNES_NUMERIQUES_PROMO,
+    COLONNES_PROMO,
+    COLONNES_REFERENTIEL,
+    LIGNES_EXCLUES_EXCEL,
+)
+
+COLONNES_DATES = {"DEBUTVIE1", "FINVIE1", "DEBUTVIE2", "FINVIE2", "DATEOKBUYER", "DATEMAA", "DEBUTCATA", "FINCATA"}
+# Les dates générées (numéros de série Excel) sont dans l'année en cours, donc dans la fenêtre de saison par défaut
+SERIE_DEBUT_ANNEE = (datetime.date(datetime.date.today().year, 1, 1) - datetime.date(1899, 12, 30)).days
+VALEURS_NON_NUMERIQUES = ["N/A", "12,5", "douze", "4.5", "-3", " "]
+CODES_INVALIDES = ["FRXX", "BE", "frca", "ES"]
+
+# Petits classeurs versionnés dans benchmarks/fixtures (régénérés avec --fixtures)
+REPERTOIRE_FIXTURES = Path(__file__).resolve().parent / "fixtures"
+FIXTURES = {
+    "plan_conforme.xlsb": dict(nb_lignes=200),
+    "plan_erreurs.xlsb": dict(nb_lignes=200, doublons=2, codes_invalides=0.05, non_numeriques=0.02, graine=1),
+    "plan_large.xlsb": dict(nb_lignes=50, colonnes_sup=300, densite=0.8, graine=2)
+}
+
+def _ean13(graine):
+    """EAN-13 avec une clé de contrôle valide"""
+    chiffres = f"{graine % 10**12:012d}"
+    somme = sum(int(c) * (3 if i % 2 else 1) for i, c in enumerate(chiffres))
+    return chiffres + str((10 - somme % 10) % 10)
+
+def generer_feuille(colonnes, colonne_reference, colonnes_numeriques, nb_lignes, colonnes_sup=0,
+                    doublons=0, codes_invalides=0.0, non_numeriques=0.0, densite=0.3, graine=0):
+    """
+    Produit les lignes d'un onglet : en-tête, lignes de sous-titres (exclues des
+    vérifications) puis nb_lignes lignes de données. Les erreurs sont injectées
+    selon les taux demandés ; densite est la part des colonnes texte remplies.
+    """
+    aleatoire = random.Random(graine)
+    entete = list(colonnes) + [f"COLONNESUP{i}" for i in range(colonnes_sup)] + list(colonnes[:doublons])
+    yield entete
+
+    for ligne_excel in LIGNES_EXCLUES_EXCEL:
+        yield [f"Sous-titre {ligne_excel}"] + [None] * (len(entete) - 1)
+
+    numeriques = set(colonnes_numeriques)
+    tirer, choisir = aleatoire.random, aleatoire.choice
+    for i in range(nb_lignes):
+        ligne = []
+        for nom in entete:
+            if nom == colonne_reference:
+                valeur = choisir(CODES_INVALIDES) if tirer() < codes_invalides else choisir(CODES_CLIENTS_AUTORISES)
+            elif nom in numeriques:
+                valeur = choisir(VALEURS_NON_NUMERIQUES) if tirer() < non_numeriques else float(1 + int(tirer() * 48))
+            elif nom in ("REFCOL", "CODEPSS"):
+                valeur = f"REF{i:07d}"
+            elif nom in ("EAN", "EANMAITRE"):
+                valeur = _ean13(3_000_000_000 + i)
+            elif nom in COLONNES_DATES:
+                valeur = float(SERIE_DEBUT_ANNEE + i % 365)
+            elif tirer() < densite:
+                valeur = f"{nom[:6]}-{int(tirer() * 1000)}"
+            else:
+                valeur = None
+            ligne.append(valeur)
+        yield ligne
+
+def generer_classeur(nb_lignes, **options):
+    """Onglets Référentiel et Promo (Promo deux fois plus court), prêts à écrire"""
+    return {
+        "Référentiel": generer_feuille(COLONNES_REFERENTIEL, "CODECLIENT", COLONNES_NUMERIQUES, nb_lignes, **options),
+        "Promo": generer_feuille(COLONNES_PROMO, "CLIENT", COLONNES_NUMERIQUES_PROMO, max(nb_lignes // 2, 1), **options)
+    }
+
+def ecrire_xlsx(chemin, feuilles):
+    """Écrit les onglets en .xlsx avec openpyxl en mode write_only (flux)"""
+    from openpyxl import Workbook
+
+    classeur = Workbook(write_only=True)
+    for nom, lignes in feuilles.items():
+        feuille = classeur.create_sheet(nom)
+        for ligne in lignes:
+            feuille.append(ligne)
+    classeur.save(chemin)
+
+class EcrivainXlsb:
+    """
+    Écrivain .xlsb minimal : juste ce que lisent pyxlsb et le vérificateur
+    (liste des feuilles, calendrier 1904 en option, table des chaînes partagées, cellules nombre/texte/booléen)
+    """
+
+    TAILLE_TAMPON = 1 << 20
+
+    def __init__(self, chemin, date1904=False):
+        self._zip = zipfile.ZipFile(chemin, "w", zipfile.ZIP_DEFLATED)
+        self._feuilles = []
+        self._chaines = {}
+        self._date1904 = date1904
+
+    @staticmethod
+    def _enregistrement(type_enreg, donnees=b""):
+        # Identifiant : octets de poids faible d'abord ; longueur : entier variable sur 7 bits
+        entete = bytearray()
+        while True:
+            entete.append(type_enreg & 0xFF)
+            type_enreg >>= 8
+            if not type_enreg:
+                break
+        longueur = len(donnees)
+        while True:
+            octet, longueur = longueur & 0x7F, longueur >> 7
+            entete.append(octet | 0x80 if longueur else octet)
+            if not longueur:
+                break
+        return bytes(entete) + donnees
+
+    @staticmethod
+    def _chaine(texte):
+        return struct.pack("<I", len(texte)) + texte.encode("utf-16-le")
+
+    def ajouter_feuille(self, nom, lignes, nb_lignes, nb_colonnes):
+        """Écrit une feuille en flux ; les dimensions doivent être connues à l'avance"""
+        numero = len(self._feuilles) + 1
+        self._feuilles.append(nom)
+        enreg = self._enregistrement
+        # Les enregistrements de cellule ont une taille fixe : leur en-tête est constant
+        booleen, nombre, chaine = struct.Struct("<IIB").pack, struct.Struct("<IId").pack, struct.Struct("<III").pack
+        with self._zip.open(f"xl/worksheets/sheet{numero}.bin", "w") as flux:
+            tampon = bytearray(enreg(0x0181) + enreg(0x0194, struct.pack("<IIII", 0, max(nb_lignes - 1, 0), 0,
+                                                                           nb_colonnes - 1)) + enreg(0x0191))
+            for r, ligne in enumerate(lignes):
+                if all(v is None for v in ligne):
+                    continue
+                tampon += b"\x00\x11" + struct.pack("<I", r) + bytes(13)
+                for c, valeur in enumerate(ligne):
+                    if valeur is None:
+                        continue
+                    if isinstance(valeur, bool):
+                        tampon += b"\x04\x09" + booleen(c, 0, valeur)
+                    elif isinstance(valeur, (int, float)):
+                        tampon += b"\x05\x10" + nombre(c, 0, float(valeur))
+                    else:
+                        tampon += b"\x07\x0c" + chaine(c, 0, self._chaines.setdefault(str(valeur), len(self._chaines)))
+                if len(tampon) > self.TAILLE_TAMPON:
+                    flux.write(tampon)
+                    tampon.clear()
+            flux.write(tampon + enreg(0x0192) + enreg(0x0182))
+
+    def close(self):
+        enreg = self._enregistrement
+        classeur = enreg(0x0183)
+        if self._date1904:
+            # BrtWbProp : options (bit 0 : calendrier 1904), version du thème, nom de code vide
+            classeur += enreg(0x0199, struct.pack("<III", 1, 0, 0))
+        classeur += enreg(0x018F)
+        relations = []
+        for numero, nom in enumerate(self._feuilles, 1):
+            classeur += enreg(0x019C, struct.pack("<II", 0, numero) + self._chaine(f"rId{numero}") + self._chaine(nom))
+            relations.append(f'<Relationship Id="rId{numero}" Target="worksheets/sheet{numero}.bin" Type="http://'
+                             f'schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>')
+        classeur += enreg(0x0190) + enreg(0x0184)
+        self._zip.writestr("xl/workbook.bin", classeur)
+        self._zip.writestr("xl/_rels/workbook.bin.rels",
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="http://'
+                           'schemas.openxmlformats.org/package/2006/relationships">' + "".join(relations)
+                           + "</Relationships>")
+
+        with self._zip.open("xl/sharedStrings.bin", "w") as flux:
+            tampon = bytearray(enreg(0x019F, struct.pack("<II", len(self._chaines), len(self._chaines))))
+            for texte in self._chaines:
+                tampon += enreg(0x0013, b"\x00" + self._chaine(texte))
+                if len(tampon) > self.TAILLE_TAMPON:
+                    flux.write(tampon)
+                    tampon.clear()
+            flux.write(tampon + enreg(0x01A0))
+
+        self._zip.writestr("[Content_Types].xml",
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Types xmlns="http://'
+                           'schemas.openxmlformats.org/package/2006/content-types"><Default Extension="bin" '
+                           'ContentType="application/vnd.ms-excel.sheet.binary.macroEnabled.main"/></Types>')
+        self._zip.close()
+
+def ecrire_xlsb(chemin, feuilles, dimensions):
+    """Écrit les onglets en .xlsb ; dimensions : {nom: (nb_lignes, nb_colonnes)}"""
+    ecrivain = EcrivainXlsb(chemin)
+    for nom, lignes in feuilles.items():
+        ecrivain.ajouter_feuille(nom, lignes, *dimensions[nom])
+    ecrivain.close()
+
+def ecrire_classeur(chemin, nb_lignes, **options):
+    """Génère et écrit un classeur synthétique, au format déduit de l'extension"""
+    feuilles = generer_classeur(nb_lignes, **options)
+    if str(chemin).endswith(".xlsx"):
+        ecrire_xlsx(chemin, feuilles)
+        return
+
+    colonnes_en_plus = options.get("colonnes_sup", 0) + options.get("doublons", 0)
+    dimensions = {
+        "Référentiel": (nb_lignes + 1 + len(LIGNES_EXCLUES_EXCEL), len(COLONNES_REFERENTIEL) + colonnes_en_plus),
+        "Promo": (max(nb_lignes // 2, 1) + 1 + len(LIGNES_EXCLUES_EXCEL), len(COLONNES_PROMO) + colonnes_en_plus)
+    }
+    ecrire_xlsb(chemin, feuilles, dimensions)
+
+def generer_fixtures(repertoire=REPERTOIRE_FIXTURES):
+    """(Ré)écrit les classeurs de FIXTURES et retourne leurs chemins"""
+    repertoire = Path(repertoire)
+    repertoire.mkdir(parents=True, exist_ok=True)
+    chemins = []
+    for nom, options in FIXTURES.items():
+        options = dict(options)
+        ecrire_classeur(repertoire / nom, options.pop("nb_lignes"), **options)
+        chemins.append(repertoire / nom)
+    return chemins
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un classeur de plan de lignes synthétique (.xlsx ou .xlsb)")
+    parser.add_argument("sortie", nargs="?", help="Chemin du fichier à créer (.xlsx ou .xlsb)")
+    parser.add_argument("--fixtures", action="store_true", help=f"Régénère les fixtures de {REPERTOIRE_FIXTURES.name}/")
+    parser.add_argument("--lignes", type=int, default=1000, help="Lignes de données du Référentiel")
+    parser.add_argument("--colonnes-sup", type=int, default=0, help="Colonnes supplémentaires non vérifiées")
+    parser.add_argument("--doublons", type=int, default=0, help="Nombre d'en-têtes dupliqués")
+    parser.add_argument("--codes-invalides", type=float, default=0.0, help="Taux de CODECLIENT/CLIENT invalides")
+    parser.add_argument("--non-numeriques", type=float, default=0.0, help="Taux de cellules PCB non numériques")
+    parser.add_argument("--densite", type=float, default=0.3, help="Part des colonnes texte remplies")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        for chemin in generer_fixtures():
+            print(chemin)
+        return
+    if not args.sortie:
+        parser.error("le chemin de sortie est obligatoire (sauf avec --fixtures)")
+    ecrire_classeur(args.sortie, args.lignes, colonnes_sup=args.colonnes_sup, doublons=args.doublons,
+                    codes_invalides=args.codes_invalides, non_numeriques=args.non_numeriques,
+                    densite=args.densite, graine=args.graine)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,30 @@
 import streamlit as st
 import pandas as pd
-import io
 from datetime import datetime
-import traceback
+from pathlib import Path
+import secrets
+import tempfile
+import time
+
+from verificateur import (
+    EXTENSIONS_CLASSEURS,
+    FORMATS_EXPORT,
+    construire_rapport,
+    construire_synthese,
+    exporter_constats,
+    formater_plages,
+    parquet_disponible,
+    resume_profil,
+    traiter_fichier,
+    verifier_entetes_fichier,
+)
+# Importé directement (et non via verificateur) : le module est aussi le point d'entrée du worker
+from verificateur.travaux import ANNULE, ECHEC, EN_ATTENTE, STATUTS_FINAUX, FileTravaux
+
+LIBELLES_STATUTS = {
+    'en_attente': "⏳ en attente", 'en_cours': "🔄 en cours", 'termine': "✅ terminée",
+    'annule': "⏹️ annulée", 'echec': "❌ échec"
+}
 
 # Configuration de la page
 st.set_page_config(
@@ -12,362 +34,205 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ✅ Configuration des colonnes obligatoires
-COLONNES_REFERENTIEL = [
-    "STATUTARTICLE", "DTR/NDTR", "CODECOLOR", "LIBCOLORFR", "LIBCOLOREN", "REFCOL", "REFCOLCLIENT", "IFLS", "EAN",
-    "NBREF", "NBREFCO", "LIGNEDEPRODUIT", "TYPEPIECE/DIMENSION", "PACKAGING/MERCH", "COMPOSITION", "RECONDUIT/NOUVEAU",
-    "IDB", "LIBZONEIMPLANTNAT", "COMMENTAIRESASSISTANT", "CODEIMPLANTNAT", "TYPODEMISAISON1", "TYPODEMISAISON2",
-    "NBMAGDEMISAISON1", "NBMAGDEMISAISON2", "DEBUTVIE1", "FINVIE1", "DEBUTVIE2", "FINVIE2", "REFFRN", "LIBFRN",
-    "CODEFRN", "BUREAUGS", "ORIGINEPRODUIT", "CODEREGROUPEMENT", "LIBREGROUPEMENT", "PABRUT", "DEVISE", "INCOTERM",
-    "CYCFS", "TAUX$", "COEFAPPROCHE", "TXREMISESGLOGALES", "PCLSANSTAXE", "ROYALTIES", "TAXEDEEE", "NOMCP",
-    "TAXEECO", "TAXEBOIS", "PCMFDR", "PVFORTTTCFDR", "TXMARGEIN", "ROYALTIESPROMO", "PCMPROMO", "PVPROMO",
-    "NUMPACKING", "FLUXIMPLANT", "FLUXREASSORT", "FLUXPROMO", "NBREUNITESPARLOT", "CODECLIENT", "PVUNITAIRE",
-    "PRESENCECATALOGUE", "PRESENCEPICKING", "RECAPTAILLES", "GRILLETAILLE"
-] + [f"TAILLE{i}" for i in range(1, 40)] + [
-    "COLLECTIONPSS", "PCBIMPLANT", "PCBPROMO", "PCBMASTERPICKING", "SPCBINNERPICKING", "CODEPACKINGIMPLANT",
-    "CODEPACKINGREASSORT", "DATEOKBUYER", "DATEMAA", "CIRCUITDACHAT", "CODEBCOLL", "DATERELECTUREPSS",
-    "CODEGFAMNAT", "LIBGFAMNAT", "VOLUMEIMPLANT", "CODEFAMNAT", "VOLUMEPICKING", "LIBFAMNAT", "CODESFAMNAT",
-    "LIBSFAMNAT", "VOLUMEPROMO", "VOLUMETOTAL", "CODESFAMINT", "NUMBOX", "CODEPSS", "LIBPRODUITFR", "LIBPRODUITEN",
-    "LIBELLECOURTPRODUITFR", "LIBELLECAISSEPRODUITFR", "CIBLE", "SAISON", "QUADRYPTIQUE", "MARQUE",
-    "TEX RESPONSABLE", "PERSONNAGE", "FRANCHISE"
-]
-
-COLONNES_PROMO = [
-    "STATUTARTICLE", "COMMENTAIRE", "REFCOL", "CLIENT", "NOMCATA", "CPRO", "GRFAMILLE", "NUMEROCATA",
-    "DEBUTCATA", "FINCATA", "NUMDISPLAY", "LIGNEDEPRODUIT", "CODEPSS", "LIBPRODUITFR", "MARQUE", "COLORIS",
-    "COLORISPSS", "PVFORTTTCFDR", "LIBELLEUB", "NUMPAGEDEf", "NUMUBDEF", "EANMAITRE", "LIBELLEPUB", "LOGO",
-    "LEGENDE", "EXISTEAUSSI", "PLUSPRODUIT", "MISEENPAGE", "UNITEDEVENTE", "TYPODEMISAISON1", "TYPODEMISAISON2",
-    "PCBPROMO", "PCBMASTERPICKING", "SPCBINNERPICKING", "RECONDUIT/NOUVEAU", "TOPUB", "PHARE", "MECACATA1",
-    "MAXXING", "PHOTOCATA1", "MEA_CATA", "VITESSECATA1", "POSCATA1", "REMISEPROMO", "PCMCATA1", "PVCATA1",
-    "PVPROMOASAISIR", "TXREMISECATA1", "MARGECATAVAL", "MARGECATA%", "QTEESTOTALES", "VALEURVENTECATA",
-    "ESTITXREVENTECATA1", "ESTIVOLUMEVENTECATA1", "ESTICACATA1", "RECEPTIONECH"
-]
-
-COLONNES_NUMERIQUES = ["PCBMASTERPICKING", "SPCBINNERPICKING", "PCBPROMO", "PCBIMPLANT"]
-# Colonnes numériques pour l'onglet Promo (sans PCBIMPLANT)
-COLONNES_NUMERIQUES_PROMO = ["PCBMASTERPICKING", "SPCBINNERPICKING", "PCBPROMO"]
-
-def detecter_colonnes_dupliquees_brutes(contenu_fichier, nom_feuille):
-    """
-    Détecte les colonnes strictement dupliquées en analysant les en-têtes bruts
-    sans passer par pandas qui peut automatiquement renommer les doublons
-    """
-    try:
-        # Lecture brute des noms de colonnes (seulement la 1ʳᵉ ligne)
-        raw_header = pd.read_excel(io.BytesIO(contenu_fichier), engine="pyxlsb", 
-                                 sheet_name=nom_feuille, header=None, nrows=1).iloc[0].tolist()
-        
-        deja_vus = {}
-        duplicatas = []
-        details_duplicatas = []
-
-        for i, nom in enumerate(raw_header):
-            # Convertir en string pour éviter les problèmes avec les valeurs NaN
-            nom_str = str(nom) if pd.notna(nom) else f"Colonne_vide_{i}"
-            
-            if nom_str in deja_vus:
-                duplicatas.append((nom_str, deja_vus[nom_str], i))
-                details_duplicatas.append(f"'{nom_str}' en colonnes Excel {deja_vus[nom_str]+1} et {i+1}")
+def enregistrer_uploads(uploaded_files, repertoire):
+    """Écrit chaque fichier uploadé dans repertoire et retourne les couples (nom, chemin)"""
+    fichiers = []
+    for i, uploaded_file in enumerate(uploaded_files):
+        # Préfixe : deux uploads peuvent porter le même nom
+        chemin = Path(repertoire) / f"{i}_{Path(uploaded_file.name).name}"
+        with open(chemin, "wb") as f:
+            f.write(uploaded_file.getbuffer())  # Vue sur le tampon de l'upload, sans copie
+        fichiers.append((uploaded_file.name, str(chemin)))
+    return fichiers
+
+def afficher_controles_colonnes(feuille):
+    """Contrôles des dates et des colonnes de clés d'un onglet (EAN, unicité, présence dans le Référentiel)"""
+    titres = {
+        'colonnes_dates': ("Dates", "Dates valides et dans la saison"),
+        'periodes': ("Périodes", "Début antérieur ou égal à la fin"),
+        'codes_ean': ("Codes EAN-13", "Clés de contrôle valides"),
+        'unicite': ("Unicité des clés", "Aucune valeur en double"),
+        'references': ("Présence des clés dans le Référentiel", "Toutes les valeurs existent dans le Référentiel")
+    }
+    for cle_verification, (titre, message_ok) in titres.items():
+        if not feuille.get(cle_verification):
+            continue
+        st.write(f"**{titre}:**")
+        for col_name, col_info in feuille[cle_verification].items():
+            if col_info['statut'] == 'ABSENT':
+                st.warning(f"⚠️ {col_name}: {col_info['details']}")
+            elif col_info['statut'] == 'OK':
+                st.success(f"✅ {col_name}: {message_ok}")
             else:
-                deja_vus[nom_str] = i
-
-        if duplicatas:
-            return {
-                'statut': 'ERREUR',
-                'nb_duplicatas': len(duplicatas),
-                'duplicatas': duplicatas,
-                'details': f"{len(duplicatas)} colonne(s) dupliquée(s) : " + " | ".join(details_duplicatas),
-                'details_liste': details_duplicatas
-            }
-        else:
-            return {
-                'statut': 'OK',
-                'nb_duplicatas': 0,
-                'duplicatas': [],
-                'details': 'Aucune colonne strictement dupliquée détectée',
-                'details_liste': []
-            }
-            
-    except Exception as e:
-        return {
-            'statut': 'ERREUR',
-            'nb_duplicatas': 0,
-            'duplicatas': [],
-            'details': f"Erreur lors de la détection des doublons : {str(e)}",
-            'details_liste': []
-        }
-
-def verifier_colonnes_dupliquees(df, nom_feuille):
-    """Vérifie s'il y a des colonnes dupliquées dans les en-têtes (ligne 1) - Ancienne méthode"""
-    colonnes = df.columns.tolist()
-    colonnes_dupliquees = []
-    colonnes_vues = {}
-    
-    for i, col in enumerate(colonnes):
-        if col in colonnes_vues:
-            if col not in colonnes_dupliquees:
-                colonnes_dupliquees.append(col)
+                st.error(f"❌ {col_name}: {col_info['details']}")
+                st.write(f"Exemples de valeurs: {col_info['exemples']}")
+
+def afficher_detail_fichier(resultat):
+    """Affiche le détail des vérifications d'un fichier"""
+    st.subheader(f"📄 {resultat['nom_fichier']} - {'✅ CONFORME' if resultat['statut_global'] == 'OK' else '❌ NON CONFORME'}")
+    if 'comparaison' in resultat:
+        comparaison = resultat['comparaison']
+        st.info(f"🔁 Depuis la vérification précédente : {comparaison['corrigees']} erreurs corrigées, "
+                f"{comparaison['nouvelles']} nouvelles, {comparaison['inchangees']} inchangées")
+    reprises = [f"{nom_feuille} ({', '.join(resultat[cle]['regles_reprises'])})"
+                for cle, nom_feuille in (('referentiel', 'Référentiel'), ('promo', 'Promo'))
+                if resultat.get(cle, {}).get('regles_reprises')]
+    if reprises:
+        st.caption("Colonnes inchangées, résultats repris de la vérification précédente : " + " ; ".join(reprises))
+
+    # Référentiel
+    if 'referentiel' in resultat:
+        st.subheader("📑 Onglet Référentiel")
+        
+        if 'erreur' in resultat['referentiel']:
+            st.error(f"🔴 {resultat['referentiel']['erreur']}")
         else:
-            colonnes_vues[col] = i
-    
-    if colonnes_dupliquees:
-        return {
-            'statut': 'ERREUR',
-            'colonnes_dupliquees': colonnes_dupliquees,
-            'details': f"Colonnes dupliquées détectées: {', '.join(colonnes_dupliquees)}"
-        }
-    else:
-        return {
-            'statut': 'OK',
-            'colonnes_dupliquees': [],
-            'details': 'Aucune colonne dupliquée détectée'
-        }
-
-def verifier_colonnes_obligatoires(df, colonnes_requises, nom_feuille):
-    """Vérifie la présence des colonnes obligatoires dans une feuille"""
-    colonnes_presentes = df.columns.tolist()
-    colonnes_manquantes = [col for col in colonnes_requises if col not in colonnes_presentes]
-
-    return {
-        'nom_feuille': nom_feuille,
-        'colonnes_manquantes': colonnes_manquantes,
-        'nb_colonnes_manquantes': len(colonnes_manquantes),
-        'nb_colonnes_totales': len(colonnes_requises),
-        'statut': 'OK' if len(colonnes_manquantes) == 0 else 'ERREUR'
-    }
-
-def verifier_codeclient(df):
-    """Vérifie la validité de la colonne CODECLIENT"""
-    if "CODECLIENT" not in df.columns:
-        return {'statut': 'ABSENT', 'details': 'Colonne CODECLIENT absente'}
-
-    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
-    lignes_exclues_excel = [2, 3, 4, 5, 6]
-    index_exclus = [i - 2 for i in lignes_exclues_excel]
-
-    # Exclure les lignes concernées
-    df_codeclient = df.drop(index=index_exclus, errors='ignore')
-
-    # Trouver la dernière ligne où CODECLIENT est rempli (zone de données utiles)
-    codeclient_rempli = ~(df_codeclient["CODECLIENT"].isna() | (df_codeclient["CODECLIENT"].astype(str).str.strip() == ""))
-
-    if codeclient_rempli.sum() == 0:
-        return {'statut': 'ERREUR', 'details': 'Aucune donnée trouvée dans CODECLIENT'}
-
-    # Déterminer la zone de données utiles (jusqu'à la dernière ligne avec CODECLIENT rempli)
-    derniere_ligne_utile = codeclient_rempli[codeclient_rempli].index.max()
-    zone_utile = df_codeclient.loc[:derniere_ligne_utile]
-
-    # Vérifier dans la zone utile
-    codeclient_vide_zone = zone_utile["CODECLIENT"].isna() | (zone_utile["CODECLIENT"].astype(str).str.strip() == "")
-    codeclient_invalides_zone = ~zone_utile["CODECLIENT"].isin(["FRCA", "FRCH"]) & ~codeclient_vide_zone
-
-    nb_vides = codeclient_vide_zone.sum()
-    nb_invalides = codeclient_invalides_zone.sum()
-    nb_lignes_utiles = len(zone_utile)
-
-    details = []
-    lignes_vides = []
-    lignes_invalides = []
-    valeurs_invalides = []
-
-    if nb_vides > 0:
-        lignes_vides = (codeclient_vide_zone[codeclient_vide_zone].index + 2).tolist()
-        details.append(f'{nb_vides} lignes vides (lignes Excel: {lignes_vides})')
-
-    if nb_invalides > 0:
-        lignes_invalides = (codeclient_invalides_zone[codeclient_invalides_zone].index + 2).tolist()
-        # Récupérer les valeurs invalides
-        valeurs_invalides = zone_utile.loc[codeclient_invalides_zone, "CODECLIENT"].unique().tolist()
-        valeurs_invalides = [str(v) for v in valeurs_invalides if pd.notna(v)]
-        details.append(f'{nb_invalides} codes invalides: {valeurs_invalides} (lignes Excel: {lignes_invalides})')
-
-    # Ajouter info sur la zone analysée
-    details_zone = f"Zone analysée: {nb_lignes_utiles} lignes (jusqu'à ligne Excel {derniere_ligne_utile + 2})"
+            ref = resultat['referentiel']
+            if 'nb_lignes' in ref:
+                st.info(f"Nombre de lignes: {ref['nb_lignes']}")
+
+            # Vérification des colonnes dupliquées (nouvelle méthode améliorée)
+            dup_status = ref['colonnes_dupliquees_brutes']
+            if dup_status['statut'] == 'OK':
+                st.success(f"✅ Colonnes dupliquées: {dup_status['details']}")
+            else:
+                st.error(f"❌ Colonnes dupliquées: {dup_status['details']}")
+                if dup_status['details_liste']:
+                    with st.expander("Détail des colonnes dupliquées"):
+                        for detail in dup_status['details_liste']:
+                            st.write(f"• {detail}")
+
+            # Colonnes
+            col_status = ref['colonnes']
+            if col_status['statut'] == 'OK':
+                st.success(f"✅ Colonnes: Toutes présentes ({col_status['nb_colonnes_totales']})")
+            else:
+                st.error(f"❌ Colonnes: {col_status['nb_colonnes_manquantes']} manquantes sur {col_status['nb_colonnes_totales']}")
+                with st.expander("Voir les colonnes manquantes"):
+                    approchantes = col_status.get('colonnes_approchantes', {})
+                    for col in col_status['colonnes_manquantes']:
+                        if col in approchantes:
+                            orthographes = ", ".join(f"'{nom}'" for nom in approchantes[col])
+                            st.write(f"• {col} (présente sous la forme {orthographes} : casse ou espaces à corriger)")
+                        else:
+                            st.write(f"• {col}")
 
-    if nb_vides == 0 and nb_invalides == 0:
-        return {'statut': 'OK', 'details': f'Tous les codes clients sont valides (hors lignes exclues). {details_zone}'}
-    else:
-        return {
-            'statut': 'ERREUR',
-            'details': ' | '.join(details) + f' | {details_zone}',
-            'lignes_vides': lignes_vides,
-            'lignes_invalides': lignes_invalides,
-            'valeurs_invalides': valeurs_invalides,
-            'zone_analysee': nb_lignes_utiles
-        }
-
-def verifier_client(df):
-    """Vérifie la validité de la colonne CLIENT pour l'onglet PROMO"""
-    if "CLIENT" not in df.columns:
-        return {'statut': 'ABSENT', 'details': 'Colonne CLIENT absente'}
-
-    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
-    lignes_exclues_excel = [2, 3, 4, 5, 6]
-    index_exclus = [i - 2 for i in lignes_exclues_excel]
-
-    # Exclure les lignes concernées
-    df_client = df.drop(index=index_exclus, errors='ignore')
-
-    # Trouver la dernière ligne où CLIENT est rempli (zone de données utiles)
-    client_rempli = ~(df_client["CLIENT"].isna() | (df_client["CLIENT"].astype(str).str.strip() == ""))
-
-    if client_rempli.sum() == 0:
-        return {'statut': 'ERREUR', 'details': 'Aucune donnée trouvée dans CLIENT'}
-
-    # Déterminer la zone de données utiles (jusqu'à la dernière ligne avec CLIENT rempli)
-    derniere_ligne_utile = client_rempli[client_rempli].index.max()
-    zone_utile = df_client.loc[:derniere_ligne_utile]
-
-    # Vérifier dans la zone utile
-    client_vide_zone = zone_utile["CLIENT"].isna() | (zone_utile["CLIENT"].astype(str).str.strip() == "")
-    client_invalides_zone = ~zone_utile["CLIENT"].isin(["FRCA", "FRCH"]) & ~client_vide_zone
-
-    nb_vides = client_vide_zone.sum()
-    nb_invalides = client_invalides_zone.sum()
-    nb_lignes_utiles = len(zone_utile)
-
-    details = []
-    lignes_vides = []
-    lignes_invalides = []
-    valeurs_invalides = []
-
-    if nb_vides > 0:
-        lignes_vides = (client_vide_zone[client_vide_zone].index + 2).tolist()
-        details.append(f'{nb_vides} lignes vides (lignes Excel: {lignes_vides})')
-
-    if nb_invalides > 0:
-        lignes_invalides = (client_invalides_zone[client_invalides_zone].index + 2).tolist()
-        # Récupérer les valeurs invalides
-        valeurs_invalides = zone_utile.loc[client_invalides_zone, "CLIENT"].unique().tolist()
-        valeurs_invalides = [str(v) for v in valeurs_invalides if pd.notna(v)]
-        details.append(f'{nb_invalides} codes invalides: {valeurs_invalides} (lignes Excel: {lignes_invalides})')
-
-    # Ajouter info sur la zone analysée
-    details_zone = f"Zone analysée: {nb_lignes_utiles} lignes (jusqu'à ligne Excel {derniere_ligne_utile + 2})"
-
-    if nb_vides == 0 and nb_invalides == 0:
-        return {'statut': 'OK', 'details': f'Tous les codes clients sont valides (hors lignes exclues). {details_zone}'}
-    else:
-        return {
-            'statut': 'ERREUR',
-            'details': ' | '.join(details) + f' | {details_zone}',
-            'lignes_vides': lignes_vides,
-            'lignes_invalides': lignes_invalides,
-            'valeurs_invalides': valeurs_invalides,
-            'zone_analysee': nb_lignes_utiles
-        }
-
-def verifier_colonnes_numeriques(df, colonnes_num, colonne_reference="CODECLIENT"):
-    """Vérifie que les colonnes spécifiées contiennent uniquement des chiffres"""
-    resultats = {}
-
-    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
-    lignes_exclues_excel = [2, 3, 4, 5, 6]
-    index_exclus = [i - 2 for i in lignes_exclues_excel]
-
-    # Exclure les lignes concernées
-    df_col = df.drop(index=index_exclus, errors='ignore')
-
-    # Déterminer la zone de données utiles basée sur la colonne de référence
-    if colonne_reference in df_col.columns:
-        ref_rempli = ~(df_col[colonne_reference].isna() | (df_col[colonne_reference].astype(str).str.strip() == ""))
-        if ref_rempli.sum() > 0:
-            derniere_ligne_utile = ref_rempli[ref_rempli].index.max()
-            df_col = df_col.loc[:derniere_ligne_utile]
-
-    for col in colonnes_num:
-        if col not in df.columns:
-            resultats[col] = {'statut': 'ABSENT', 'nb_erreurs': 0, 'lignes_erreur': [], 'valeurs_non_numeriques': []}
+            # CODECLIENT (absent en mode structure seule)
+            if 'codeclient' in ref:
+                cc_status = ref['codeclient']
+                if cc_status['statut'] == 'OK':
+                    st.success(f"✅ CODECLIENT: {cc_status['details']}")
+                else:
+                    st.error(f"❌ CODECLIENT: {cc_status['details']}")
+
+            # Colonnes numériques
+            if 'colonnes_numeriques' in ref:
+                st.write("**Vérification des colonnes numériques:**")
+                for col_name, col_info in ref['colonnes_numeriques'].items():
+                    if col_info['statut'] == 'ABSENT':
+                        st.warning(f"⚠️ {col_name}: Colonne absente")
+                    elif col_info['statut'] == 'OK':
+                        st.success(f"✅ {col_name}: Valeurs numériques")
+                    else:
+                        st.error(f"❌ {col_name}: {col_info['nb_erreurs']} valeurs non numériques")
+                        st.write(f"Lignes Excel: {formater_plages(col_info['plages_erreur'])}")
+                        if col_info['valeurs_non_numeriques']:
+                            st.write(f"Exemples de valeurs: {col_info['valeurs_non_numeriques']}")
+
+            afficher_controles_colonnes(ref)
+
+            # Clés déclarées dans d'autres fichiers du lot
+            if 'doublons_lot' in ref:
+                st.write("**Clés partagées avec d'autres fichiers du lot:**")
+                for col_name, col_info in ref['doublons_lot'].items():
+                    if col_info['statut'] == 'OK':
+                        st.success(f"✅ {col_name}: Aucune valeur déclarée dans un autre fichier")
+                    else:
+                        st.error(f"❌ {col_name}: {col_info['details']}")
+                        with st.expander(f"Valeurs de {col_name} présentes dans d'autres fichiers"):
+                            for valeur, autres in list(col_info['autres_fichiers'].items())[:50]:
+                                st.write(f"• {valeur} : {', '.join(autres)}")
+
+    # Promo
+    if 'promo' in resultat:
+        st.subheader("📑 Onglet Promo")
+        
+        if 'erreur' in resultat['promo']:
+            st.error(f"🔴 {resultat['promo']['erreur']}")
         else:
-            # Vérifier les valeurs numériques avec gestion des NaN
-            non_numeriques = ~df_col[col].astype(str).str.strip().str.fullmatch(r'\d+', na=True)
-            nb_erreurs = non_numeriques.sum()
-            lignes_erreur = (non_numeriques[non_numeriques].index + 2).tolist() if nb_erreurs > 0 else []
-
-            # Récupérer les valeurs non numériques uniques
-            valeurs_non_numeriques = []
-            if nb_erreurs > 0:
-                valeurs_non_num = df_col.loc[non_numeriques, col].astype(str).str.strip().unique()
-                valeurs_non_numeriques = [v for v in valeurs_non_num if v != 'nan' and v != '']
-
-            resultats[col] = {
-                'statut': 'OK' if nb_erreurs == 0 else 'ERREUR',
-                'nb_erreurs': nb_erreurs,
-                'lignes_erreur': lignes_erreur,
-                'valeurs_non_numeriques': valeurs_non_numeriques[:10],  # Limiter à 10 valeurs pour éviter l'encombrement
-                'zone_analysee': len(df_col)
-            }
-
-    return resultats
-
-def traiter_fichier(nom_fichier, contenu):
-    """Traite un fichier XLSB et retourne les résultats de vérification"""
-    resultats = {
-        'nom_fichier': nom_fichier,
-        'statut_global': 'OK',
-        'erreurs': []
-    }
+            promo = resultat['promo']
+            if 'nb_lignes' in promo:
+                st.info(f"Nombre de lignes: {promo['nb_lignes']}")
+
+            # Vérification des colonnes dupliquées (nouvelle méthode améliorée)
+            dup_status = promo['colonnes_dupliquees_brutes']
+            if dup_status['statut'] == 'OK':
+                st.success(f"✅ Colonnes dupliquées: {dup_status['details']}")
+            else:
+                st.error(f"❌ Colonnes dupliquées: {dup_status['details']}")
+                if dup_status['details_liste']:
+                    with st.expander("Détail des colonnes dupliquées"):
+                        for detail in dup_status['details_liste']:
+                            st.write(f"• {detail}")
+
+            # Colonnes
+            col_status = promo['colonnes']
+            if col_status['statut'] == 'OK':
+                st.success(f"✅ Colonnes: Toutes présentes ({col_status['nb_colonnes_totales']})")
+            else:
+                st.error(f"❌ Colonnes: {col_status['nb_colonnes_manquantes']} manquantes sur {col_status['nb_colonnes_totales']}")
+                with st.expander("Voir les colonnes manquantes"):
+                    approchantes = col_status.get('colonnes_approchantes', {})
+                    for col in col_status['colonnes_manquantes']:
+                        if col in approchantes:
+                            orthographes = ", ".join(f"'{nom}'" for nom in approchantes[col])
+                            st.write(f"• {col} (présente sous la forme {orthographes} : casse ou espaces à corriger)")
+                        else:
+                            st.write(f"• {col}")
 
-    try:
-        # Vérification de l'onglet "Référentiel"
-        try:
-            df_ref = pd.read_excel(io.BytesIO(contenu), engine="pyxlsb", sheet_name="Référentiel")
-            resultats['referentiel'] = {
-                'colonnes_dupliquees_brutes': detecter_colonnes_dupliquees_brutes(contenu, "Référentiel"),
-                'colonnes': verifier_colonnes_obligatoires(df_ref, COLONNES_REFERENTIEL, "Référentiel"),
-                'codeclient': verifier_codeclient(df_ref),
-                'colonnes_numeriques': verifier_colonnes_numeriques(df_ref, COLONNES_NUMERIQUES, "CODECLIENT"),
-                'nb_lignes': len(df_ref)
-            }
-        except Exception as e:
-            resultats['referentiel'] = {'erreur': f"Impossible de lire l'onglet Référentiel: {str(e)}"}
-            resultats['statut_global'] = 'ERREUR'
-
-        # Vérification de l'onglet "Promo"
-        try:
-            df_promo = pd.read_excel(io.BytesIO(contenu), engine="pyxlsb", sheet_name="Promo")
-            resultats['promo'] = {
-                'colonnes_dupliquees_brutes': detecter_colonnes_dupliquees_brutes(contenu, "Promo"),
-                'colonnes': verifier_colonnes_obligatoires(df_promo, COLONNES_PROMO, "Promo"),
-                'client': verifier_client(df_promo),
-                'colonnes_numeriques': verifier_colonnes_numeriques(df_promo, COLONNES_NUMERIQUES_PROMO, "CLIENT"),
-                'nb_lignes': len(df_promo)
-            }
-        except Exception as e:
-            resultats['promo'] = {'erreur': f"Impossible de lire l'onglet Promo: {str(e)}"}
-            resultats['statut_global'] = 'ERREUR'
-
-        # Déterminer le statut global
-        if 'referentiel' in resultats and 'colonnes' in resultats['referentiel']:
-            if resultats['referentiel']['colonnes_dupliquees_brutes']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            if resultats['referentiel']['colonnes']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            if resultats['referentiel']['codeclient']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            for col_num in resultats['referentiel']['colonnes_numeriques'].values():
-                if col_num['statut'] == 'ERREUR':
-                    resultats['statut_global'] = 'ERREUR'
-
-        if 'promo' in resultats and 'colonnes' in resultats['promo']:
-            if resultats['promo']['colonnes_dupliquees_brutes']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            if resultats['promo']['colonnes']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            if resultats['promo']['client']['statut'] == 'ERREUR':
-                resultats['statut_global'] = 'ERREUR'
-            # Vérifier aussi les colonnes numériques de Promo
-            if 'colonnes_numeriques' in resultats['promo']:
-                for col_num in resultats['promo']['colonnes_numeriques'].values():
-                    if col_num['statut'] == 'ERREUR':
-                        resultats['statut_global'] = 'ERREUR'
-
-    except Exception as e:
-        resultats['erreur_generale'] = str(e)
-        resultats['statut_global'] = 'ERREUR'
-
-    return resultats
+            # CLIENT (absent en mode structure seule)
+            if 'client' in promo:
+                client_status = promo['client']
+                if client_status['statut'] == 'OK':
+                    st.success(f"✅ CLIENT: {client_status['details']}")
+                else:
+                    st.error(f"❌ CLIENT: {client_status['details']}")
+
+            # Colonnes numériques pour Promo (sans PCBIMPLANT)
+            if 'colonnes_numeriques' in promo:
+                st.write("**Vérification des colonnes numériques:**")
+                for col_name, col_info in promo['colonnes_numeriques'].items():
+                    if col_info['statut'] == 'ABSENT':
+                        st.warning(f"⚠️ {col_name}: Colonne absente")
+                    elif col_info['statut'] == 'OK':
+                        st.success(f"✅ {col_name}: Valeurs numériques")
+                    else:
+                        st.error(f"❌ {col_name}: {col_info['nb_erreurs']} valeurs non numériques")
+                        st.write(f"Lignes Excel: {formater_plages(col_info['plages_erreur'])}")
+                        if col_info['valeurs_non_numeriques']:
+                            st.write(f"Exemples de valeurs: {col_info['valeurs_non_numeriques']}")
+
+            afficher_controles_colonnes(promo)
+
+    # Erreur générale
+    if 'erreur_generale' in resultat:
+        st.error(f"🔴 Erreur générale: {resultat['erreur_generale']}")
+
+def afficher_compteurs(zone, resultats, nb_fichiers):
+    """Compteurs en direct pendant la vérification d'un lot"""
+    fichiers_ok = sum(1 for r in resultats if r['statut_global'] == 'OK')
+    with zone.container():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Vérifiés", f"{len(resultats)}/{nb_fichiers}")
+        col2.metric("✅ Conformes", fichiers_ok)
+        col3.metric("❌ Avec erreurs", len(resultats) - fichiers_ok)
+
+def generer_export_constats(tous_resultats, format_export):
+    """Écrit les constats lot par lot dans un fichier temporaire (mémoire bornée) et le retourne rembobiné"""
+    fichier = tempfile.TemporaryFile()
+    exporter_constats(tous_resultats, fichier, format_export)
+    fichier.seek(0)
+    return fichier
 
 def afficher_resultats_streamlit(tous_resultats):
     """Affiche les résultats dans Streamlit"""
@@ -385,125 +250,250 @@ def afficher_resultats_streamlit(tous_resultats):
     with col3:
         st.metric("❌ Avec erreurs", fichiers_erreur, delta=None)
 
-    # Détail par fichier
-    for i, resultat in enumerate(tous_resultats, 1):
-        with st.expander(f"📄 {resultat['nom_fichier']} - {'✅ CONFORME' if resultat['statut_global'] == 'OK' else '❌ NON CONFORME'}", 
-                        expanded=resultat['statut_global'] == 'ERREUR'):
-            
-            # Référentiel
-            if 'referentiel' in resultat:
-                st.subheader("📑 Onglet Référentiel")
-                
-                if 'erreur' in resultat['referentiel']:
-                    st.error(f"🔴 {resultat['referentiel']['erreur']}")
-                else:
-                    ref = resultat['referentiel']
-                    st.info(f"Nombre de lignes: {ref['nb_lignes']}")
+    # Évolution par rapport à la vérification précédente des mêmes noms de fichiers
+    comparaisons = [r['comparaison'] for r in tous_resultats if 'comparaison' in r]
+    if comparaisons:
+        st.info(f"🔁 Depuis la vérification précédente ({len(comparaisons)} fichier(s) déjà vérifié(s)) : "
+                f"{sum(c['corrigees'] for c in comparaisons)} erreurs corrigées, "
+                f"{sum(c['nouvelles'] for c in comparaisons)} nouvelles")
+
+    # Synthèse : une ligne par fichier, filtrable et triable (clic sur un en-tête de colonne)
+    col_filtre, col_recherche = st.columns([1, 2])
+    with col_filtre:
+        filtre = st.radio("Afficher", ["Tous", "Non conformes", "Conformes"], horizontal=True, key="filtre_statut")
+    with col_recherche:
+        recherche = st.text_input("Rechercher un fichier", key="recherche_fichier")
+
+    synthese = pd.DataFrame(construire_synthese(tous_resultats))
+    if filtre != "Tous":
+        synthese = synthese[synthese['Statut'] == ('✅ CONFORME' if filtre == "Conformes" else '❌ NON CONFORME')]
+    if recherche:
+        synthese = synthese[synthese['Fichier'].str.contains(recherche, case=False, regex=False)]
+
+    # Sélection propre à chaque filtre : une sélection conservée désignerait, par sa position, un autre
+    # fichier du tableau filtré ; le changement de filtre ou de recherche la réinitialise
+    selection = st.dataframe(
+        synthese.drop(columns='index'),
+        hide_index=True,
+        column_config={'Durée (s)': st.column_config.NumberColumn(format="%.2f")},
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"synthese-{filtre}-{recherche}"
+    )
 
-                    # Vérification des colonnes dupliquées (nouvelle méthode améliorée)
-                    dup_status = ref['colonnes_dupliquees_brutes']
-                    if dup_status['statut'] == 'OK':
-                        st.success(f"✅ Colonnes dupliquées: {dup_status['details']}")
-                    else:
-                        st.error(f"❌ Colonnes dupliquées: {dup_status['details']}")
-                        if dup_status['details_liste']:
-                            with st.expander("Détail des colonnes dupliquées"):
-                                for detail in dup_status['details_liste']:
-                                    st.write(f"• {detail}")
-
-                    # Colonnes
-                    col_status = ref['colonnes']
-                    if col_status['statut'] == 'OK':
-                        st.success(f"✅ Colonnes: Toutes présentes ({col_status['nb_colonnes_totales']})")
-                    else:
-                        st.error(f"❌ Colonnes: {col_status['nb_colonnes_manquantes']} manquantes sur {col_status['nb_colonnes_totales']}")
-                        with st.expander("Voir les colonnes manquantes"):
-                            for col in col_status['colonnes_manquantes']:
-                                st.write(f"• {col}")
-
-                    # CODECLIENT
-                    cc_status = ref['codeclient']
-                    if cc_status['statut'] == 'OK':
-                        st.success(f"✅ CODECLIENT: {cc_status['details']}")
-                    else:
-                        st.error(f"❌ CODECLIENT: {cc_status['details']}")
-
-                    # Colonnes numériques
-                    st.write("**Vérification des colonnes numériques:**")
-                    for col_name, col_info in ref['colonnes_numeriques'].items():
-                        if col_info['statut'] == 'ABSENT':
-                            st.warning(f"⚠️ {col_name}: Colonne absente")
-                        elif col_info['statut'] == 'OK':
-                            st.success(f"✅ {col_name}: Valeurs numériques")
-                        else:
-                            st.error(f"❌ {col_name}: {col_info['nb_erreurs']} valeurs non numériques")
-                            if col_info['valeurs_non_numeriques']:
-                                st.write(f"Exemples de valeurs: {col_info['valeurs_non_numeriques']}")
-
-            # Promo
-            if 'promo' in resultat:
-                st.subheader("📑 Onglet Promo")
-                
-                if 'erreur' in resultat['promo']:
-                    st.error(f"🔴 {resultat['promo']['erreur']}")
-                else:
-                    promo = resultat['promo']
-                    st.info(f"Nombre de lignes: {promo['nb_lignes']}")
+    # Détail du seul fichier sélectionné : la page reste légère quel que soit le nombre de fichiers
+    # (positions dans le tableau fourni, même si l'utilisateur l'a trié)
+    lignes_selectionnees = [i for i in selection.selection.rows if i < len(synthese)]
+    if lignes_selectionnees:
+        afficher_detail_fichier(tous_resultats[synthese['index'].iloc[lignes_selectionnees[0]]])
+    else:
+        st.caption("Sélectionnez une ligne du tableau pour afficher le détail du fichier")
+
+    # Métriques de performance (une colonne par fichier, une ligne par étape)
+    with st.sidebar.expander("⏱️ Métriques de performance"):
+        durees = {}
+        pics_memoire = {}
+        admission = {}
+        for resultat in tous_resultats:
+            metriques = resultat.get('metriques', {})
+            etapes = metriques.get('etapes', {})
+            durees[resultat['nom_fichier']] = {etape: mesure['duree'] for etape, mesure in etapes.items()}
+            if any('pic_memoire' in mesure for mesure in etapes.values()):
+                pics_memoire[resultat['nom_fichier']] = {
+                    etape: mesure['pic_memoire'] / 1024 / 1024 for etape, mesure in etapes.items()
+                }
+            if 'memoire_estimee' in metriques:
+                admission[resultat['nom_fichier']] = {
+                    'Estimé (Mo)': metriques['memoire_estimee'] / 1024 / 1024,
+                    'Mesuré (Mo)': metriques.get('pic_processus', float('nan')) / 1024 / 1024,
+                    'Attente (s)': metriques['attente_admission']
+                }
+        st.write("**Durées (s)**")
+        st.dataframe(pd.DataFrame(durees).style.format("{:.3f}"))
+        if pics_memoire:
+            st.write("**Pic mémoire (Mo)**")
+            st.dataframe(pd.DataFrame(pics_memoire).style.format("{:.1f}"))
+        if admission:
+            st.write("**Contrôle d'admission : pic mémoire du processus estimé et mesuré**")
+            st.dataframe(pd.DataFrame(admission).T.style.format("{:.1f}"))
+        st.caption("Mesures prises lors de la vérification : un résultat repris du cache garde ses mesures d'origine")
+
+def afficher_profil(file_travaux, travail, etat):
+    """Profil cProfile du fichier choisi à la soumission : fonctions les plus coûteuses et fichier .pstats"""
+    chemin_profil = file_travaux.chemin_profil(travail)
+    if etat['profil'] is None or not chemin_profil.exists():
+        return
+    nom_profil = f"{Path(file_travaux.noms_fichiers(travail)[etat['profil']]).stem}.pstats"
+    with st.sidebar.expander("🔬 Profil", expanded=True):
+        st.download_button(
+            label=f"Télécharger {nom_profil}",
+            data=chemin_profil.read_bytes(),
+            file_name=nom_profil,
+            mime="application/octet-stream"
+        )
+        st.code(resume_profil(chemin_profil))
+
+@st.cache_resource
+def obtenir_file_travaux():
+    """File des travaux de vérification (base SQLite partagée avec le worker en arrière-plan)"""
+    return FileTravaux()
+
+def proprietaire_session():
+    """
+    Propriétaire des travaux soumis depuis cette session : l'adresse de
+    l'utilisateur connecté (authentification Streamlit configurée), sinon un
+    jeton aléatoire gardé côté serveur dans l'état de la session. Jamais dans
+    l'URL : quiconque verrait celle-ci pourrait consulter et annuler les
+    vérifications ; sans authentification, elles ne sont donc plus
+    accessibles après rechargement de l'onglet.
+    """
+    # Jeton d'une version antérieure resté dans l'URL : retiré, sans être repris
+    st.query_params.pop('session', None)
+    if st.user.get("is_logged_in"):
+        return f"utilisateur:{st.user.get('email')}"
+    if 'jeton_session' not in st.session_state:
+        st.session_state['jeton_session'] = secrets.token_urlsafe(16)
+    return f"session:{st.session_state['jeton_session']}"
+
+def selectionner_travail(travail):
+    """
+    Travail affiché par cette session ; repris dans l'URL pour le retrouver après
+    rechargement de l'onglet (utilisateur connecté : seul son propriétaire l'ouvre)
+    """
+    st.session_state['travail'] = travail
+    st.query_params['travail'] = travail
 
-                    # Vérification des colonnes dupliquées (nouvelle méthode améliorée)
-                    dup_status = promo['colonnes_dupliquees_brutes']
-                    if dup_status['statut'] == 'OK':
-                        st.success(f"✅ Colonnes dupliquées: {dup_status['details']}")
-                    else:
-                        st.error(f"❌ Colonnes dupliquées: {dup_status['details']}")
-                        if dup_status['details_liste']:
-                            with st.expander("Détail des colonnes dupliquées"):
-                                for detail in dup_status['details_liste']:
-                                    st.write(f"• {detail}")
-
-                    # Colonnes
-                    col_status = promo['colonnes']
-                    if col_status['statut'] == 'OK':
-                        st.success(f"✅ Colonnes: Toutes présentes ({col_status['nb_colonnes_totales']})")
-                    else:
-                        st.error(f"❌ Colonnes: {col_status['nb_colonnes_manquantes']} manquantes sur {col_status['nb_colonnes_totales']}")
-                        with st.expander("Voir les colonnes manquantes"):
-                            for col in col_status['colonnes_manquantes']:
-                                st.write(f"• {col}")
-
-                    # CLIENT
-                    client_status = promo['client']
-                    if client_status['statut'] == 'OK':
-                        st.success(f"✅ CLIENT: {client_status['details']}")
-                    else:
-                        st.error(f"❌ CLIENT: {client_status['details']}")
-
-                    # Colonnes numériques pour Promo (sans PCBIMPLANT)
-                    if 'colonnes_numeriques' in promo:
-                        st.write("**Vérification des colonnes numériques:**")
-                        for col_name, col_info in promo['colonnes_numeriques'].items():
-                            if col_info['statut'] == 'ABSENT':
-                                st.warning(f"⚠️ {col_name}: Colonne absente")
-                            elif col_info['statut'] == 'OK':
-                                st.success(f"✅ {col_name}: Valeurs numériques")
-                            else:
-                                st.error(f"❌ {col_name}: {col_info['nb_erreurs']} valeurs non numériques")
-                                if col_info['valeurs_non_numeriques']:
-                                    st.write(f"Exemples de valeurs: {col_info['valeurs_non_numeriques']}")
-
-            # Erreur générale
-            if 'erreur_generale' in resultat:
-                st.error(f"🔴 Erreur générale: {resultat['erreur_generale']}")
+def resultats_travail(file_travaux, travail, final=False):
+    """
+    Résultats {position: résultat} d'un travail, conservés dans la session et
+    complétés à chaque appel par les seuls résultats terminés depuis le précédent.
+    Le travail terminé (final), tous sont relus une dernière fois : le worker
+    y a ajouté les clés partagées entre fichiers ('doublons_lot').
+    """
+    suivi = st.session_state.get('suivi_travail')
+    if suivi is None or suivi['travail'] != travail:
+        suivi = {'travail': travail, 'resultats': {}, 'depuis': None, 'final': False}
+        st.session_state['suivi_travail'] = suivi
+    if suivi['final']:
+        return suivi['resultats']
+    if final:
+        suivi['resultats'] = file_travaux.resultats(travail)
+        suivi['final'] = True
+        return suivi['resultats']
+    # Marge d'une seconde : un résultat enregistré pendant la lecture précédente n'est pas manqué
+    instant = time.time() - 1
+    suivi['resultats'].update(file_travaux.resultats(travail, suivi['depuis']))
+    suivi['depuis'] = instant
+    return suivi['resultats']
+
+@st.fragment(run_every=1.0)
+def suivre_travail(file_travaux, travail):
+    """Progression d'un travail en cours, rafraîchie chaque seconde sans réexécuter toute la page"""
+    etat = file_travaux.etat(travail)
+    if etat is None or etat['statut'] in STATUTS_FINAUX:
+        # Travail terminé : la page complète affiche les résultats
+        st.rerun()
+
+    if etat['statut'] == EN_ATTENTE:
+        st.info(f"⏳ Vérification en attente : position {etat['position_file'] + 1} dans la file "
+                f"({etat['position_file']} vérification(s) avant celle-ci, {etat['fichiers_avant']} fichier(s) à traiter)")
+        # Worker arrêté (serveur redémarré...) : relancé, il reprendra la file
+        file_travaux.assurer_worker()
+    else:
+        resultats = resultats_travail(file_travaux, travail)
+        st.progress(len(resultats) / etat['nb_fichiers'],
+                    text=f"Traitement en cours: {len(resultats)}/{etat['nb_fichiers']} fichier(s)...")
+        resultats_partiels = [resultats[i] for i in sorted(resultats)]
+        afficher_compteurs(st.empty(), resultats_partiels, etat['nb_fichiers'])
+        if resultats_partiels:
+            st.dataframe(pd.DataFrame(construire_synthese(resultats_partiels)).drop(columns='index'), hide_index=True)
+
+    st.button("⏹️ Annuler la vérification", key="annuler_lot", on_click=file_travaux.annuler, args=(travail,))
+    st.caption(f"Travail {travail} : la vérification continue en arrière-plan, même si vous fermez l'onglet "
+               f"(retrouvez-la dans « Vérifications récentes »)")
+
+def afficher_travaux_recents(file_travaux, proprietaire):
+    """Historique des travaux de l'utilisateur dans la barre latérale : les résultats restent consultables"""
+    travaux = file_travaux.travaux_recents(proprietaire)
+    if not travaux:
+        return
+    libelles = {
+        t['id']: f"{datetime.fromtimestamp(t['soumis']):%d/%m %H:%M} · {t['nb_fichiers']} fichier(s) · "
+                 f"{LIBELLES_STATUTS[t['statut']]}"
+        for t in travaux
+    }
+    with st.sidebar.expander("📚 Vérifications récentes"):
+        st.selectbox("Afficher les résultats de", list(libelles), index=None, format_func=libelles.get,
+                     placeholder="Choisir une vérification", key="travail_choisi",
+                     on_change=lambda: selectionner_travail(st.session_state['travail_choisi']))
+
+def afficher_travail(file_travaux, travail, proprietaire):
+    """Suivi d'un travail en cours, puis ses résultats une fois terminé (seulement pour son propriétaire)"""
+    etat = file_travaux.etat(travail)
+    if etat is None:
+        st.warning("Cette vérification n'est plus disponible (supprimée après la durée de conservation)")
+        return
+    if etat['proprietaire'] != proprietaire:
+        st.error("Cette vérification a été lancée par un autre utilisateur ou une autre session")
+        return
+    if etat['statut'] not in STATUTS_FINAUX:
+        st.header("⏳ Vérification en cours")
+        suivre_travail(file_travaux, travail)
+        return
+
+    resultats = resultats_travail(file_travaux, travail, final=True)
+    tous_resultats = [resultats[i] for i in sorted(resultats)]
+    if etat['statut'] == ANNULE and len(tous_resultats) < etat['nb_fichiers']:
+        st.warning(f"⏹️ Vérification annulée : {len(tous_resultats)}/{etat['nb_fichiers']} fichier(s) vérifié(s)")
+    elif etat['statut'] == ECHEC:
+        st.error(f"❌ La vérification s'est arrêtée : {etat['erreur']}")
+
+    if tous_resultats:
+        st.header("📈 Résultats de la vérification")
+        debut_affichage = time.perf_counter()
+        afficher_resultats_streamlit(tous_resultats)
+        st.sidebar.caption(f"Affichage des résultats : {time.perf_counter() - debut_affichage:.2f} s")
+
+        # Option de téléchargement (optionnel)
+        st.markdown("---")
+        st.subheader("💾 Export des résultats")
+
+        # Rapport et liste complète des lignes en erreur, construits seulement au clic
+        st.download_button(
+            label="📄 Télécharger le rapport complet",
+            data=lambda: construire_rapport(tous_resultats),
+            file_name=f"rapport_verification_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            mime="text/plain",
+            on_click="ignore"
+        )
+        formats = [f for f in FORMATS_EXPORT if f != 'parquet' or parquet_disponible()]
+        format_export = st.radio(
+            "Format des constats (une ligne par anomalie)", formats, horizontal=True, key="format_constats"
+        )
+        mime, extension = FORMATS_EXPORT[format_export]
+        st.download_button(
+            label=f"📋 Télécharger tous les constats ({format_export.upper()})",
+            data=lambda: generer_export_constats(tous_resultats, format_export),
+            file_name=f"constats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            on_click="ignore"
+        )
+        st.caption(f"Vérification {travail} du {datetime.fromtimestamp(etat['soumis']):%d/%m/%Y %H:%M} "
+                   f"({etat['fin'] - etat['soumis']:.1f} s, attente comprise)")
+        afficher_profil(file_travaux, travail, etat)
+        if etat['cache_succes'] is not None:
+            st.caption(f"Cache : {etat['cache_succes']} succès / {etat['cache_echecs']} échecs pour cette vérification "
+                       f"({etat['cache_entrees']} entrées, {etat['cache_taille'] / 1024 / 1024:.1f} Mo sur disque)")
 
 # Interface Streamlit
 def main():
-    st.title("📊 Vérificateur de fichiers Excel (.xlsb)")
+    st.title("📊 Vérificateur de fichiers Excel (.xlsb, .xlsx)")
     st.markdown("---")
     
     # Description
     st.markdown("""
     ### 📋 Description
-    Cet outil vérifie la conformité de vos fichiers Excel (.xlsb) en analysant :
+    Cet outil vérifie la conformité de vos fichiers Excel (.xlsb ou .xlsx) en analysant :
     - **Vérification des colonnes dupliquées** : Détecte les colonnes en double dans les en-têtes
     - **Onglet Référentiel** : Présence des colonnes obligatoires, validité des codes clients, format des colonnes numériques
     - **Onglet Promo** : Présence des colonnes obligatoires, validité des codes clients, format des colonnes numériques
@@ -513,90 +503,60 @@ def main():
     # Upload des fichiers
     st.header("📂 Upload des fichiers")
     uploaded_files = st.file_uploader(
-        "Sélectionnez vos fichiers .xlsb",
-        type=['xlsb'],
+        "Sélectionnez vos fichiers .xlsb ou .xlsx",
+        type=list(EXTENSIONS_CLASSEURS),
         accept_multiple_files=True,
         help="Vous pouvez sélectionner plusieurs fichiers à la fois"
     )
     
     if uploaded_files:
         st.success(f"✅ {len(uploaded_files)} fichier(s) sélectionné(s)")
+
+        # Mode de vérification
+        mode = st.radio(
+            "Mode de vérification",
+            ["Vérification complète", "Structure uniquement (en-têtes)"],
+            horizontal=True,
+            help="Le mode structure ne lit que la ligne 1 de chaque onglet : colonnes obligatoires et colonnes dupliquées"
+        )
+        fonction_verification = traiter_fichier if mode == "Vérification complète" else verifier_entetes_fichier
+
+        # Profilage optionnel d'un fichier (cProfile), pour diagnostiquer une vérification lente
+        with st.sidebar.expander("🔬 Profilage"):
+            fichier_a_profiler = st.selectbox(
+                "Profiler un fichier",
+                ["Aucun"] + [f.name for f in uploaded_files],
+                help="Vérifie à nouveau ce fichier sous cProfile après les autres et propose le fichier .pstats "
+                     "au téléchargement avec les résultats"
+            )
         
-        # Bouton de traitement
+        # Bouton de traitement : la vérification est confiée au worker en arrière-plan,
+        # elle continue même si la page est réexécutée ou l'onglet fermé
         if st.button("🚀 Lancer la vérification", type="primary"):
-            tous_resultats = []
-            
-            # Barre de progression
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            for i, uploaded_file in enumerate(uploaded_files):
-                status_text.text(f'Traitement en cours: {uploaded_file.name}...')
-                progress_bar.progress((i + 1) / len(uploaded_files))
-                
-                try:
-                    # Lire le contenu du fichier
-                    contenu = uploaded_file.read()
-                    uploaded_file.seek(0)  # Reset pour une éventuelle relecture
-                    
-                    # Traiter le fichier
-                    resultat = traiter_fichier(uploaded_file.name, contenu)
-                    tous_resultats.append(resultat)
-                    
-                except Exception as e:
-                    st.error(f"❌ Erreur lors du traitement de {uploaded_file.name}: {str(e)}")
-                    st.write("Détails de l'erreur:")
-                    st.code(traceback.format_exc())
-            
-            status_text.text('Traitement terminé!')
-            
-            # Affichage des résultats
-            if tous_resultats:
-                st.header("📈 Résultats de la vérification")
-                afficher_resultats_streamlit(tous_resultats)
-                
-                # Option de téléchargement (optionnel)
-                st.markdown("---")
-                st.subheader("💾 Export des résultats")
-                
-                # Créer un résumé textuel
-                rapport_texte = f"RAPPORT DE VÉRIFICATION - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                rapport_texte += "=" * 80 + "\n\n"
-                
-                total_fichiers = len(tous_resultats)
-                fichiers_ok = sum(1 for r in tous_resultats if r['statut_global'] == 'OK')
-                fichiers_erreur = total_fichiers - fichiers_ok
-                
-                rapport_texte += f"RÉSUMÉ GLOBAL\n"
-                rapport_texte += f"Total fichiers traités: {total_fichiers}\n"
-                rapport_texte += f"Fichiers conformes: {fichiers_ok}\n"
-                rapport_texte += f"Fichiers avec erreurs: {fichiers_erreur}\n\n"
-                
-                for resultat in tous_resultats:
-                    rapport_texte += f"FICHIER: {resultat['nom_fichier']}\n"
-                    rapport_texte += f"Statut: {'CONFORME' if resultat['statut_global'] == 'OK' else 'NON CONFORME'}\n"
-                    rapport_texte += "-" * 60 + "\n\n"
-                
-                # Bouton de téléchargement du rapport
-                st.download_button(
-                    label="📄 Télécharger le rapport complet",
-                    data=rapport_texte,
-                    file_name=f"rapport_verification_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain"
-                )
-    
+            file_travaux = obtenir_file_travaux()
+            travail, repertoire = file_travaux.preparer()
+            # Copie des fichiers dans le répertoire du travail : le worker les lit par leur chemin
+            fichiers = enregistrer_uploads(uploaded_files, repertoire)
+            # Profilage fait par le worker sur la copie du fichier, comme sa vérification
+            profil = next((i for i, f in enumerate(uploaded_files) if f.name == fichier_a_profiler), None)
+            file_travaux.soumettre(travail, fichiers, 'complet' if fonction_verification is traiter_fichier else 'entetes',
+                                   proprietaire_session(), profil)
+            file_travaux.assurer_worker()
+            selectionner_travail(travail)
+
     else:
-        st.info("👆 Veuillez sélectionner des fichiers .xlsb pour commencer la vérification")
+        st.info("👆 Veuillez sélectionner des fichiers .xlsb ou .xlsx pour commencer la vérification")
         
         # Exemple d'utilisation
         with st.expander("📖 Guide d'utilisation"):
             st.markdown("""
             ### Comment utiliser cet outil :
             
-            1. **Sélectionnez vos fichiers** : Cliquez sur "Browse files" et sélectionnez un ou plusieurs fichiers .xlsb
+            1. **Sélectionnez vos fichiers** : Cliquez sur "Browse files" et sélectionnez un ou plusieurs fichiers .xlsb ou .xlsx
             2. **Lancez la vérification** : Cliquez sur le bouton "🚀 Lancer la vérification"
-            3. **Consultez les résultats** : Les résultats s'affichent avec des détails pour chaque fichier
-            4. **Téléchargez le rapport** : Optionnel, vous pouvez télécharger un rapport complet
+            3. **Mode structure** : Optionnel, vérifie uniquement les en-têtes (colonnes obligatoires et doublons) en quelques millisecondes
+            4. **Consultez les résultats** : Le tableau de synthèse liste les fichiers ; sélectionnez une ligne pour afficher son détail
+            5. **Téléchargez le rapport** : Optionnel, vous pouvez télécharger un rapport complet
             
             ### Structure attendue des fichiers :
             
@@ -616,5 +576,12 @@ def main():
             - Les colonnes numériques vérifiées : PCBMASTERPICKING, SPCBINNERPICKING, PCBPROMO, PCBIMPLANT
             """)
 
+    # Suivi puis résultats du travail courant (soumis ici, choisi dans l'historique ou repris de l'URL)
+    proprietaire = proprietaire_session()
+    afficher_travaux_recents(obtenir_file_travaux(), proprietaire)
+    travail = st.session_state.get('travail') or st.query_params.get('travail')
+    if travail:
+        afficher_travail(obtenir_file_travaux(), travail, proprietaire)
+
 if __name__ == "__main__":
     main()
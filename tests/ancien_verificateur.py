@@ -0,0 +1,171 @@
+"""
+Vérifications d'origine de l'application (streamlit_app.py avant le moteur de
+règles), conservées telles quelles comme référence des tests du moteur
+"""
+
+import pandas as pd
+
+def verifier_codeclient(df):
+    """Vérifie la validité de la colonne CODECLIENT"""
+    if "CODECLIENT" not in df.columns:
+        return {'statut': 'ABSENT', 'details': 'Colonne CODECLIENT absente'}
+
+    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
+    lignes_exclues_excel = [2, 3, 4, 5, 6]
+    index_exclus = [i - 2 for i in lignes_exclues_excel]
+
+    # Exclure les lignes concernées
+    df_codeclient = df.drop(index=index_exclus, errors='ignore')
+
+    # Trouver la dernière ligne où CODECLIENT est rempli (zone de données utiles)
+    codeclient_rempli = ~(df_codeclient["CODECLIENT"].isna() | (df_codeclient["CODECLIENT"].astype(str).str.strip() == ""))
+
+    if codeclient_rempli.sum() == 0:
+        return {'statut': 'ERREUR', 'details': 'Aucune donnée trouvée dans CODECLIENT'}
+
+    # Déterminer la zone de données utiles (jusqu'à la dernière ligne avec CODECLIENT rempli)
+    derniere_ligne_utile = codeclient_rempli[codeclient_rempli].index.max()
+    zone_utile = df_codeclient.loc[:derniere_ligne_utile]
+
+    # Vérifier dans la zone utile
+    codeclient_vide_zone = zone_utile["CODECLIENT"].isna() | (zone_utile["CODECLIENT"].astype(str).str.strip() == "")
+    codeclient_invalides_zone = ~zone_utile["CODECLIENT"].isin(["FRCA", "FRCH"]) & ~codeclient_vide_zone
+
+    nb_vides = codeclient_vide_zone.sum()
+    nb_invalides = codeclient_invalides_zone.sum()
+    nb_lignes_utiles = len(zone_utile)
+
+    details = []
+    lignes_vides = []
+    lignes_invalides = []
+    valeurs_invalides = []
+
+    if nb_vides > 0:
+        lignes_vides = (codeclient_vide_zone[codeclient_vide_zone].index + 2).tolist()
+        details.append(f'{nb_vides} lignes vides (lignes Excel: {lignes_vides})')
+
+    if nb_invalides > 0:
+        lignes_invalides = (codeclient_invalides_zone[codeclient_invalides_zone].index + 2).tolist()
+        # Récupérer les valeurs invalides
+        valeurs_invalides = zone_utile.loc[codeclient_invalides_zone, "CODECLIENT"].unique().tolist()
+        valeurs_invalides = [str(v) for v in valeurs_invalides if pd.notna(v)]
+        details.append(f'{nb_invalides} codes invalides: {valeurs_invalides} (lignes Excel: {lignes_invalides})')
+
+    # Ajouter info sur la zone analysée
+    details_zone = f"Zone analysée: {nb_lignes_utiles} lignes (jusqu'à ligne Excel {derniere_ligne_utile + 2})"
+
+    if nb_vides == 0 and nb_invalides == 0:
+        return {'statut': 'OK', 'details': f'Tous les codes clients sont valides (hors lignes exclues). {details_zone}'}
+    else:
+        return {
+            'statut': 'ERREUR',
+            'details': ' | '.join(details) + f' | {details_zone}',
+            'lignes_vides': lignes_vides,
+            'lignes_invalides': lignes_invalides,
+            'valeurs_invalides': valeurs_invalides,
+            'zone_analysee': nb_lignes_utiles
+        }
+
+def verifier_client(df):
+    """Vérifie la validité de la colonne CLIENT pour l'onglet PROMO"""
+    if "CLIENT" not in df.columns:
+        return {'statut': 'ABSENT', 'details': 'Colonne CLIENT absente'}
+
+    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
+    lignes_exclues_excel = [2, 3, 4, 5, 6]
+    index_exclus = [i - 2 for i in lignes_exclues_excel]
+
+    # Exclure les lignes concernées
+    df_client = df.drop(index=index_exclus, errors='ignore')
+
+    # Trouver la dernière ligne où CLIENT est rempli (zone de données utiles)
+    client_rempli = ~(df_client["CLIENT"].isna() | (df_client["CLIENT"].astype(str).str.strip() == ""))
+
+    if client_rempli.sum() == 0:
+        return {'statut': 'ERREUR', 'details': 'Aucune donnée trouvée dans CLIENT'}
+
+    # Déterminer la zone de données utiles (jusqu'à la dernière ligne avec CLIENT rempli)
+    derniere_ligne_utile = client_rempli[client_rempli].index.max()
+    zone_utile = df_client.loc[:derniere_ligne_utile]
+
+    # Vérifier dans la zone utile
+    client_vide_zone = zone_utile["CLIENT"].isna() | (zone_utile["CLIENT"].astype(str).str.strip() == "")
+    client_invalides_zone = ~zone_utile["CLIENT"].isin(["FRCA", "FRCH"]) & ~client_vide_zone
+
+    nb_vides = client_vide_zone.sum()
+    nb_invalides = client_invalides_zone.sum()
+    nb_lignes_utiles = len(zone_utile)
+
+    details = []
+    lignes_vides = []
+    lignes_invalides = []
+    valeurs_invalides = []
+
+    if nb_vides > 0:
+        lignes_vides = (client_vide_zone[client_vide_zone].index + 2).tolist()
+        details.append(f'{nb_vides} lignes vides (lignes Excel: {lignes_vides})')
+
+    if nb_invalides > 0:
+        lignes_invalides = (client_invalides_zone[client_invalides_zone].index + 2).tolist()
+        # Récupérer les valeurs invalides
+        valeurs_invalides = zone_utile.loc[client_invalides_zone, "CLIENT"].unique().tolist()
+        valeurs_invalides = [str(v) for v in valeurs_invalides if pd.notna(v)]
+        details.append(f'{nb_invalides} codes invalides: {valeurs_invalides} (lignes Excel: {lignes_invalides})')
+
+    # Ajouter info sur la zone analysée
+    details_zone = f"Zone analysée: {nb_lignes_utiles} lignes (jusqu'à ligne Excel {derniere_ligne_utile + 2})"
+
+    if nb_vides == 0 and nb_invalides == 0:
+        return {'statut': 'OK', 'details': f'Tous les codes clients sont valides (hors lignes exclues). {details_zone}'}
+    else:
+        return {
+            'statut': 'ERREUR',
+            'details': ' | '.join(details) + f' | {details_zone}',
+            'lignes_vides': lignes_vides,
+            'lignes_invalides': lignes_invalides,
+            'valeurs_invalides': valeurs_invalides,
+            'zone_analysee': nb_lignes_utiles
+        }
+
+def verifier_colonnes_numeriques(df, colonnes_num, colonne_reference="CODECLIENT"):
+    """Vérifie que les colonnes spécifiées contiennent uniquement des chiffres"""
+    resultats = {}
+
+    # Définir les lignes Excel à exclure et convertir en index pandas (Excel line - 2)
+    lignes_exclues_excel = [2, 3, 4, 5, 6]
+    index_exclus = [i - 2 for i in lignes_exclues_excel]
+
+    # Exclure les lignes concernées
+    df_col = df.drop(index=index_exclus, errors='ignore')
+
+    # Déterminer la zone de données utiles basée sur la colonne de référence
+    if colonne_reference in df_col.columns:
+        ref_rempli = ~(df_col[colonne_reference].isna() | (df_col[colonne_reference].astype(str).str.strip() == ""))
+        if ref_rempli.sum() > 0:
+            derniere_ligne_utile = ref_rempli[ref_rempli].index.max()
+            df_col = df_col.loc[:derniere_ligne_utile]
+
+    for col in colonnes_num:
+        if col not in df.columns:
+            resultats[col] = {'statut': 'ABSENT', 'nb_erreurs': 0, 'lignes_erreur': [], 'valeurs_non_numeriques': []}
+        else:
+            # Vérifier les valeurs numériques avec gestion des NaN
+            non_numeriques = ~df_col[col].astype(str).str.strip().str.fullmatch(r'\d+', na=True)
+            nb_erreurs = non_numeriques.sum()
+            lignes_erreur = (non_numeriques[non_numeriques].index + 2).tolist() if nb_erreurs > 0 else []
+
+            # Récupérer les valeurs non numériques uniques
+            valeurs_non_numeriques = []
+            if nb_erreurs > 0:
+                valeurs_non_num = df_col.loc[non_numeriques, col].astype(str).str.strip().unique()
+                valeurs_non_numeriques = [v for v in valeurs_non_num if v != 'nan' and v != '']
+
+            resultats[col] = {
+                'statut': 'OK' if nb_erreurs == 0 else 'ERREUR',
+                'nb_erreurs': nb_erreurs,
+                'lignes_erreur': lignes_erreur,
+                'valeurs_non_numeriques': valeurs_non_numeriques[:10],  # Limiter à 10 valeurs pour éviter l'encombrement
+                'zone_analysee': len(df_col)
+            }
+
+    return resultats
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generer_classeur import REPERTOIRE_FIXTURES, ecrire_classeur  # noqa: E402
+from verificateur import traitement  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def sans_instantanes_par_defaut(monkeypatch):
+    """Les tests n'écrivent pas dans le magasin d'instantanés de l'utilisateur"""
+    monkeypatch.setattr(traitement, "instantanes_par_defaut", lambda: None)
+
+@pytest.fixture(scope="session")
+def classeurs(tmp_path_factory):
+    """Même plan de lignes synthétique (avec erreurs) écrit en .xlsb et en .xlsx"""
+    repertoire = tmp_path_factory.mktemp("classeurs")
+    chemins = {}
+    for extension in ("xlsb", "xlsx"):
+        chemins[extension] = repertoire / f"plan.{extension}"
+        ecrire_classeur(chemins[extension], 300, doublons=1, codes_invalides=0.05, non_numeriques=0.03, graine=3)
+    return chemins
+
+@pytest.fixture
+def fixtures():
+    """Classeurs versionnés de benchmarks/fixtures"""
+    return REPERTOIRE_FIXTURES
@@ -0,0 +1,65 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.generer_classeur import ecrire_classeur
+from verificateur import ControleAdmission, estimer_memoire, parallele, verifier_lot
+from verificateur.admission import MEMOIRE_BASE
+
+def test_controle_admission():
+    admission = ControleAdmission(budget=100)
+    assert admission.admissible(60)
+    admission.admettre(60)
+    assert admission.admissible(40) and not admission.admissible(41)
+    admission.admettre(40)
+    admission.liberer(60)
+    assert (admission.engagee, admission.nb_admises) == (40, 1)
+    assert admission.admissible(60) and not admission.admissible(61)
+
+def test_fichier_plus_gros_que_le_budget_admis_seul():
+    admission = ControleAdmission(budget=100)
+    # Rien ne tourne : admis malgré le budget, au lieu d'attendre indéfiniment
+    assert admission.admissible(500)
+    admission.admettre(500)
+    assert not admission.admissible(1)
+    admission.liberer(500)
+    assert admission.admissible(500)
+
+def test_estimer_memoire(tmp_path, fixtures):
+    chemin = fixtures / "plan_conforme.xlsb"
+    assert estimer_memoire(chemin, "verifier_entetes_fichier") == MEMOIRE_BASE
+    assert estimer_memoire(b"pas un classeur") == MEMOIRE_BASE
+    ecrire_classeur(tmp_path / "grand.xlsb", 2000)
+    # Le pic estimé croît avec le nombre de cellules vérifiées
+    assert MEMOIRE_BASE < estimer_memoire(chemin) < estimer_memoire(tmp_path / "grand.xlsb")
+
+def test_admission_dans_l_ordre_d_upload(monkeypatch):
+    estimations = {"a": 60, "b": 60, "c": 10, "enorme": 500, "d": 10}
+    monkeypatch.setattr(parallele, "estimer_memoire", lambda contenu, mode: estimations[contenu])
+    verrou = threading.Lock()
+    en_cours = set()
+    demarrages = []
+
+    def verifier(nom, contenu):
+        with verrou:
+            demarrages.append((nom, sorted(en_cours)))
+            en_cours.add(nom)
+        time.sleep(0.05)
+        with verrou:
+            en_cours.discard(nom)
+        return {'nom_fichier': nom, 'statut_global': 'OK'}
+
+    fichiers = [(nom, nom) for nom in estimations]
+    with ThreadPoolExecutor(len(fichiers)) as pool:
+        resultats = {i: future.result() for i, future in verifier_lot(fichiers, verifier, pool, budget_memoire=100)}
+
+    metriques = [resultats[i]['metriques'] for i in range(len(fichiers))]
+    assert [m['memoire_estimee'] for m in metriques] == list(estimations.values())
+    # Les fichiers sont admis dans l'ordre d'upload : c, qui tiendrait dans le budget avec a, attend derrière b
+    attentes = [m['attente_admission'] for m in metriques]
+    assert attentes == sorted(attentes) and attentes[0] < attentes[2]
+    deja_en_cours = dict(demarrages)
+    assert "a" not in deja_en_cours["b"]
+    # Le fichier plus gros que le budget tourne seul, d attend qu'il soit terminé
+    assert deja_en_cours["enorme"] == []
+    assert "enorme" not in deja_en_cours["d"]
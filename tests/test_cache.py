@@ -0,0 +1,51 @@
+import pytest
+
+from verificateur import SPEC_REFERENTIEL, CacheResultats, HistoriqueResultats, empreinte_contenu, verifier_lot
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheResultats(tmp_path / "cache")
+
+def test_cle_par_contenu(cache, tmp_path):
+    chemin = tmp_path / "plan.xlsb"
+    chemin.write_bytes(b"contenu")
+    # Contenu en mémoire ou sur disque, et quel que soit le nom : même clé
+    assert cache.cle(b"contenu") == cache.cle(chemin) == cache.cle(str(chemin))
+    assert cache.cle(b"contenu").startswith(empreinte_contenu(b"contenu"))
+    assert cache.cle(b"contenu") != cache.cle(b"contenu modifie")
+
+def test_cle_par_mode(cache):
+    assert cache.cle(b"contenu", "traiter_fichier") != cache.cle(b"contenu", "verifier_entetes_fichier")
+
+def test_cle_par_version_des_regles(tmp_path, monkeypatch):
+    avant = CacheResultats(tmp_path / "cache").cle(b"contenu")
+    monkeypatch.setitem(SPEC_REFERENTIEL, 'codes_autorises', ["FRCA", "FRCH", "FRBE"])
+    assert CacheResultats(tmp_path / "cache").cle(b"contenu") != avant
+
+def test_niveaux_memoire_et_disque(tmp_path):
+    cache = CacheResultats(tmp_path / "cache")
+    cle = cache.cle(b"contenu")
+    assert cache.obtenir(cle) is None
+    cache.enregistrer(cle, {'nom_fichier': "plan.xlsb", 'statut_global': 'OK'})
+    assert cache.obtenir(cle, "copie.xlsb") == {'nom_fichier': "copie.xlsb", 'statut_global': 'OK'}
+    assert (cache.succes, cache.echecs) == (1, 1)
+
+    # Un autre processus (nouvelle instance, même répertoire) relit le niveau disque
+    autre = CacheResultats(tmp_path / "cache")
+    assert autre.obtenir(cle) == {'nom_fichier': "plan.xlsb", 'statut_global': 'OK'}
+
+def test_historique_par_proprietaire(tmp_path, fixtures):
+    historique = HistoriqueResultats(tmp_path / "historique")
+    assert historique.cle("plan.xlsb", proprietaire="session:a") != historique.cle("plan.xlsb", proprietaire="session:b")
+    assert historique.cle("plan.xlsb", proprietaire="session:a") == historique.cle("plan.xlsb", proprietaire="session:a")
+
+    fichier = [("plan.xlsb", str(fixtures / "plan_erreurs.xlsb"))]
+    resultats = {}
+    for proprietaire in ("session:a", "session:a", "session:b"):
+        for _, future in verifier_lot(fichier, nb_processus=1, historique=historique, proprietaire=proprietaire,
+                                      budget_memoire=None):
+            resultats.setdefault(proprietaire, []).append(future.result())
+    # Seule la deuxième vérification du même propriétaire a un précédent
+    assert 'comparaison' not in resultats["session:a"][0]
+    assert resultats["session:a"][1]['comparaison']['nouvelles'] == 0
+    assert 'comparaison' not in resultats["session:b"][0]
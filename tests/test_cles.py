@@ -0,0 +1,64 @@
+import numpy as np
+
+from benchmarks.generer_classeur import ecrire_xlsx, generer_classeur
+from verificateur import SPEC_PROMO, analyser_ean, traiter_fichier, verifier_codes_ean, verifier_unicite
+
+def _index(*valeurs):
+    """Index de clés (voir moteur) d'une colonne dont les lignes Excel 2, 3... portent valeurs"""
+    categories = list(dict.fromkeys(valeurs))
+    return {
+        'categories': categories,
+        'codes': np.array([categories.index(v) for v in valeurs], dtype=np.int32),
+        'lignes': np.arange(2, len(valeurs) + 2, dtype=np.int32)
+    }
+
+def test_analyser_ean():
+    valeurs = [
+        "4006381333931",   # valide
+        "0030000000007",   # valide, zéros en tête conservés
+        "0000000000000",   # valide : clé 0
+        "4006381333932",   # mauvaise clé
+        "30000000007",     # zéros en tête perdus (cellule saisie en nombre)
+        "400638133393A",   # pas que des chiffres
+        "4006381333931 ",  # 14 caractères
+        "",
+    ]
+    format_valide, cle_valide = analyser_ean(valeurs)
+    assert format_valide.tolist() == [True, True, True, True, False, False, False, False]
+    assert cle_valide.tolist() == [True, True, True, False, False, False, False, False]
+
+def test_verifier_codes_ean():
+    index = _index("4006381333931", "4006381333932", "4006381333932", "ABC", "0030000000007")
+    verification = verifier_codes_ean({'EAN': index}, ["EAN", "EANMAITRE"])
+    assert verification['EANMAITRE']['statut'] == 'ABSENT'
+    ean = verification['EAN']
+    assert ean['statut'] == 'ERREUR'
+    # Chaque ligne d'une valeur invalide est comptée, qu'elle soit mal formée ou de clé fausse
+    assert (ean['nb_erreurs'], ean['nb_formats_invalides'], ean['nb_cles_invalides']) == (3, 1, 2)
+    assert ean['plages_erreur'].tolist() == [[3, 5]]
+
+    assert verifier_codes_ean({'EAN': _index("0030000000007")}, ["EAN"])['EAN']['statut'] == 'OK'
+
+def test_verifier_unicite():
+    verification = verifier_unicite({'REFCOL': _index("R1", "R2", "R1", "R3", "R1", "R2")}, ["REFCOL", "IFLS"])
+    assert verification['IFLS']['statut'] == 'ABSENT'
+    refcol = verification['REFCOL']
+    assert refcol['nb_valeurs_en_double'] == 2
+    assert refcol['nb_erreurs'] == 5
+    assert refcol['plages_erreur'].tolist() == [[2, 4], [6, 7]]
+
+def test_lignes_promo_orphelines(tmp_path):
+    feuilles = {nom: list(lignes) for nom, lignes in generer_classeur(40).items()}
+    promo = feuilles["Promo"]
+    colonne = promo[0].index("REFCOL")
+    # Lignes Excel : en-tête en ligne 1, puis une ligne par élément
+    orphelines = [len(promo) - 3, len(promo)]
+    for ligne_excel in orphelines:
+        promo[ligne_excel - 1][colonne] = f"INCONNUE{ligne_excel}"
+    chemin = tmp_path / "orphelines.xlsx"
+    ecrire_xlsx(chemin, feuilles)
+
+    references = traiter_fichier("orphelines.xlsx", chemin)[SPEC_PROMO['cle']]['references']
+    assert references['CODEPSS']['statut'] == 'OK'
+    assert references['REFCOL']['statut'] == 'ERREUR'
+    assert references['REFCOL']['plages_erreur'].tolist() == [[ligne, ligne] for ligne in orphelines]
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from verificateur import cli
+
+RACINE = Path(__file__).resolve().parent.parent
+
+def _verifier(tmp_path, *arguments):
+    """Lance python -m verificateur (répertoires de travail dans tmp_path) ; retourne (code, lignes JSON)"""
+    # Fenêtre de saison fixe : les dates des fixtures sont celles de l'année où elles ont été générées
+    environnement = {**os.environ, 'PYTHONPATH': str(RACINE), 'VERIFICATEUR_SAISON_DEBUT': "2000-01-01",
+                     'VERIFICATEUR_SAISON_FIN': "2099-12-31"}
+    for nom in ("CACHE", "HISTORIQUE", "TRAVAUX", "INSTANTANES"):
+        environnement[f"VERIFICATEUR_{nom}_DIR"] = str(tmp_path / nom.lower())
+    sortie = tmp_path / "resultats.jsonl"
+    execution = subprocess.run([sys.executable, "-m", "verificateur", "-j", "1", "-o", str(sortie), *arguments],
+                               cwd=tmp_path, env=environnement, capture_output=True, text=True, timeout=300)
+    lignes = [json.loads(ligne) for ligne in sortie.read_text(encoding="utf-8").splitlines()] if sortie.exists() else []
+    return execution.returncode, lignes
+
+def test_fichier_conforme(tmp_path, fixtures):
+    code, lignes = _verifier(tmp_path, str(fixtures / "plan_conforme.xlsb"))
+    assert code == 0
+    assert [ligne['statut_global'] for ligne in lignes] == ['OK']
+
+def test_fichier_en_erreur(tmp_path, fixtures):
+    code, lignes = _verifier(tmp_path, str(fixtures / "plan_erreurs.xlsb"))
+    assert code == 1
+    assert [ligne['statut_global'] for ligne in lignes] == ['ERREUR']
+
+@pytest.mark.parametrize("mode", ["complet", "entetes"])
+def test_doublons_entre_fichiers(tmp_path, fixtures, mode):
+    copie = tmp_path / "copie.xlsb"
+    copie.write_bytes((fixtures / "plan_conforme.xlsb").read_bytes())
+    code, lignes = _verifier(tmp_path, "--mode", mode, str(fixtures / "plan_conforme.xlsb"), str(copie))
+    # Les clés du Référentiel déclarées dans les deux fichiers ne sont contrôlées qu'en mode complet
+    assert code == (1 if mode == "complet" else 0)
+    assert len(lignes) == 2
+
+def test_aucun_fichier(tmp_path):
+    code, lignes = _verifier(tmp_path, str(tmp_path / "*.xlsb"))
+    assert code == 2
+    assert lignes == []
+
+def test_format_de_constats_inconnu(tmp_path, fixtures):
+    code, _ = _verifier(tmp_path, "--constats", "constats.txt", str(fixtures / "plan_conforme.xlsb"))
+    assert code == 2
+
+def test_constats_parquet_sans_pyarrow(tmp_path, fixtures, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "parquet_disponible", lambda: False)
+    assert cli.main(["--constats", str(tmp_path / "constats.parquet"), str(fixtures / "plan_conforme.xlsb")]) == 2
+    assert "pyarrow" in capsys.readouterr().err
+    assert not (tmp_path / "constats.parquet").exists()
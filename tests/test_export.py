@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+import pytest
+
+from verificateur import (CHAMPS_CONSTAT, EcrivainConstats, developper_plages, export, exporter_constats,
+                          iterer_constats, traiter_fichier)
+
+@pytest.fixture(scope="module")
+def resultat(classeurs):
+    return traiter_fichier("plan.xlsb", classeurs["xlsb"])
+
+def _lire(chemin, format_export):
+    """Constats relus d'un export, en tuples comme iterer_constats"""
+    if format_export == 'csv':
+        with open(chemin, encoding="utf-8", newline="") as f:
+            lignes = list(csv.reader(f, delimiter=";"))
+        assert lignes[0] == CHAMPS_CONSTAT
+        # CSV : tout est texte, une valeur absente est vide
+        return [tuple(champ or None for champ in ligne) for ligne in lignes[1:]]
+    if format_export == 'jsonl':
+        with open(chemin, encoding="utf-8") as f:
+            return [tuple(json.loads(ligne)[champ] for champ in CHAMPS_CONSTAT) for ligne in f]
+    pq = pytest.importorskip("pyarrow.parquet")
+    return [tuple(ligne[champ] for champ in CHAMPS_CONSTAT) for ligne in pq.read_table(chemin).to_pylist()]
+
+def _texte(constat):
+    return tuple(None if champ is None else str(champ) for champ in constat)
+
+def test_constats_des_lignes_en_erreur(resultat):
+    constats = list(iterer_constats([resultat]))
+    # Une anomalie par ligne Excel des plages en erreur, avec la valeur de sa cellule
+    for colonne, verification in resultat['referentiel']['colonnes_numeriques'].items():
+        if verification['statut'] != 'ERREUR':
+            continue
+        attendus = developper_plages(verification['plages_erreur']).tolist()
+        lignes = [c for c in constats if c[1] == "Référentiel" and c[2] == 'valeur_non_numerique' and c[3] == colonne]
+        assert [c[4] for c in lignes] == attendus
+        categories = verification['valeurs_lignes']['categories']
+        assert [c[5] for c in lignes] == [categories[code] if code >= 0 else None
+                                          for code in verification['valeurs_lignes']['codes'].tolist()]
+    assert {c[2] for c in constats} >= {'valeur_non_numerique', 'code_invalide'}
+
+@pytest.mark.parametrize("format_export", ["csv", "jsonl", "parquet"])
+def test_formats_identiques(resultat, tmp_path, monkeypatch, format_export):
+    if format_export == 'parquet' and not export.parquet_disponible():
+        pytest.skip("pyarrow non installé")
+    # Petits lots : les constats sont écrits en plusieurs fois
+    monkeypatch.setattr(export, "TAILLE_LOT", 7)
+    chemin = tmp_path / f"constats.{format_export}"
+    attendus = list(iterer_constats([resultat, {**resultat, 'nom_fichier': "copie.xlsb"}]))
+
+    with EcrivainConstats(chemin, format_export) as ecrivain:
+        # Résultats ajoutés au fil de la vérification
+        ecrivain.ecrire([resultat])
+        ecrivain.ecrire([{**resultat, 'nom_fichier': "copie.xlsb"}])
+    assert ecrivain.nb_constats == len(attendus) > 7
+
+    if format_export == 'csv':
+        attendus = [_texte(constat) for constat in attendus]
+    assert _lire(chemin, format_export) == attendus
+
+def test_export_vers_un_flux(resultat):
+    flux = io.BytesIO()
+    nb = exporter_constats([resultat], flux, 'jsonl')
+    # Le flux fourni n'est pas fermé
+    assert len(flux.getvalue().decode("utf-8").splitlines()) == nb
+
+def test_fichier_illisible(tmp_path):
+    chemin = tmp_path / "illisible.xlsb"
+    chemin.write_bytes(b"pas un classeur")
+    constats = list(iterer_constats([traiter_fichier("illisible.xlsb", chemin)]))
+    assert [c[:3] for c in constats] == [("illisible.xlsb", None, 'erreur_generale')]
+
+def test_format_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        EcrivainConstats(tmp_path / "constats.txt", 'txt')
@@ -0,0 +1,182 @@
+import datetime
+import json
+import zipfile
+
+import pytest
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+from benchmarks.generer_classeur import EcrivainXlsb, ecrire_xlsb
+from verificateur import InstantanesFeuilles, lecture, ouvrir_classeur, sans_index_cles, traitement, traiter_fichier
+from verificateur.cli import _json_defaut
+
+# Ligne 1 de Promo : chaînes déjà présentes dans la table ou nouvelles, longues (longueur d'enregistrement
+# sur plusieurs octets en .xlsb), cellules vides, nombres et booléen
+ESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ESPACE_PAQUET = "http://schemas.openxmlformats.org/package/2006"
+ESPACE_RELATIONS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+TYPE_CONTENU = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+ENTETE_PROMO = ["CLIENT", None, 12, 3.5, True, "valeur 7", " COL ", "X" * 300, None, "après un vide"]
+
+def _comparable(resultat):
+    """Résultat sans ce qui dépend de l'exécution (métriques), sous forme JSON"""
+    resultat = {cle: valeur for cle, valeur in sans_index_cles(resultat).items() if cle != 'metriques'}
+    return json.loads(json.dumps(resultat, default=_json_defaut))
+
+@pytest.mark.parametrize("nom_feuille", ["Référentiel", "Promo"])
+def test_xlsb_et_xlsx_lus_a_l_identique(classeurs, nom_feuille):
+    lus = []
+    for extension in ("xlsb", "xlsx"):
+        with ouvrir_classeur(classeurs[extension]) as classeur:
+            lus.append((classeur.lire_entete(nom_feuille), *classeur.lire_feuille(nom_feuille)))
+    (entete_xlsb, brute_xlsb, df_xlsb), (entete_xlsx, brute_xlsx, df_xlsx) = lus
+
+    assert entete_xlsb == entete_xlsx == brute_xlsb == brute_xlsx
+    assert df_xlsb.dtypes.equals(df_xlsx.dtypes)
+    assert df_xlsb.equals(df_xlsx)
+
+def test_xlsb_et_xlsx_meme_resultat(classeurs):
+    resultats = [_comparable(traiter_fichier("plan", classeurs[extension])) for extension in ("xlsb", "xlsx")]
+    assert resultats[0]['statut_global'] == 'ERREUR'
+    # L'empreinte d'une feuille est celle de ses octets dans le zip, propre à chaque format
+    for resultat in resultats:
+        for cle in ('referentiel', 'promo'):
+            del resultat[cle]['empreinte_feuille']
+    assert resultats[0] == resultats[1]
+
+@pytest.mark.parametrize("extension", ["xlsb", "xlsx"])
+def test_instantane_meme_resultat(classeurs, tmp_path, monkeypatch, extension):
+    sans_instantane = _comparable(traiter_fichier("plan", classeurs[extension]))
+
+    instantanes = InstantanesFeuilles(tmp_path / "instantanes")
+    monkeypatch.setattr(traitement, "instantanes_par_defaut", lambda: instantanes)
+    ecriture = _comparable(traiter_fichier("plan", classeurs[extension]))
+    assert instantanes.statistiques()['entrees'] == 2
+    relecture = _comparable(traiter_fichier("plan", classeurs[extension]))
+
+    assert ecriture == sans_instantane
+    assert relecture == sans_instantane
+
+@pytest.mark.parametrize("extension", ["xlsb", "xlsx"])
+def test_instantane_memes_types(classeurs, tmp_path, extension):
+    instantanes = InstantanesFeuilles(tmp_path / "instantanes")
+    with ouvrir_classeur(classeurs[extension]) as classeur:
+        empreinte = classeur.empreinte_feuille("Référentiel")
+        with instantanes.ecrivain(empreinte, "Référentiel") as ecrivain:
+            entete, df = classeur.lire_feuille("Référentiel", ecrivain=ecrivain)
+
+    entete_relu, df_relu = instantanes.lire(empreinte, "Référentiel")
+    assert entete_relu == entete
+    assert df_relu.dtypes.equals(df.dtypes)
+    assert df_relu.equals(df)
+
+@pytest.mark.parametrize("taille_bloc", [lecture.TAILLE_BLOC_CHAINES, 64])
+def test_entete_xlsb_en_fin_de_table(tmp_path, monkeypatch, taille_bloc):
+    # Petits blocs : chaînes à cheval sur deux blocs et enregistrements sautés au-delà du bloc
+    monkeypatch.setattr(lecture, "TAILLE_BLOC_CHAINES", taille_bloc)
+    donnees = [[f"valeur {i}" * (1 + i % 40), i] for i in range(2000)]
+    chemin = tmp_path / "chaines.xlsb"
+    ecrire_xlsb(chemin, {"Données": iter(donnees), "Promo": iter([ENTETE_PROMO, ["FRCA"]])},
+                {"Données": (2000, 2), "Promo": (2, len(ENTETE_PROMO))})
+
+    with ouvrir_classeur(chemin) as classeur:
+        entete = classeur.lire_entete("Promo")
+        entete_feuille, _ = classeur.lire_feuille("Promo")
+    assert entete == entete_feuille == ENTETE_PROMO
+
+def _ecrire_xlsx_chaines_partagees(chemin, feuilles, encodage="utf-8"):
+    """
+    .xlsx minimal dont les textes sont dans la table des chaînes partagées,
+    comme ceux d'Excel (openpyxl n'écrit que des chaînes en ligne)
+    """
+    from xml.sax.saxutils import escape
+
+    chaines = {}
+    parties = {}
+    for numero, lignes in enumerate(feuilles.values(), 1):
+        xml_lignes = []
+        for r, ligne in enumerate(lignes, 1):
+            cellules = []
+            for c, valeur in enumerate(ligne):
+                reference = f"{get_column_letter(c + 1)}{r}"
+                if valeur is None:
+                    continue
+                if isinstance(valeur, bool):
+                    cellules.append(f'<c r="{reference}" t="b"><v>{int(valeur)}</v></c>')
+                elif isinstance(valeur, (int, float)):
+                    cellules.append(f'<c r="{reference}"><v>{valeur}</v></c>')
+                else:
+                    cellules.append(f'<c r="{reference}" t="s"><v>{chaines.setdefault(valeur, len(chaines))}</v></c>')
+            xml_lignes.append(f'<row r="{r}">{"".join(cellules)}</row>')
+        parties[f"xl/worksheets/sheet{numero}.xml"] = (f'<worksheet xmlns="{ESPACE}"><sheetData>{"".join(xml_lignes)}'
+                                                      f'</sheetData></worksheet>')
+
+    # Texte enrichi (plusieurs morceaux, indication phonétique ignorée) pour la dernière chaîne
+    textes = [f'<si><t xml:space="preserve">{escape(texte)}</t></si>' for texte in chaines]
+    textes[-1] = f'<si><r><t>{escape(list(chaines)[-1][:2])}</t></r><r><t>{escape(list(chaines)[-1][2:])}</t></r>' \
+                 f'<rPh sb="0" eb="1"><t>ignoré</t></rPh></si>'
+    parties["xl/sharedStrings.xml"] = (f'<?xml version="1.0" encoding="{encodage}"?>\n'
+                                       f'<sst xmlns="{ESPACE}">{"".join(textes)}</sst>').encode(encodage)
+    relations = "".join(f'<Relationship Id="rId{numero}" Type="{ESPACE_RELATIONS}/worksheet" '
+                        f'Target="worksheets/sheet{numero}.xml"/>' for numero in range(1, len(feuilles) + 1))
+    relations += f'<Relationship Id="rIdChaines" Type="{ESPACE_RELATIONS}/sharedStrings" Target="sharedStrings.xml"/>'
+    parties["xl/_rels/workbook.xml.rels"] = f'<Relationships xmlns="{ESPACE_PAQUET}/relationships">{relations}</Relationships>'
+    feuilles_xml = "".join(f'<sheet name="{nom}" sheetId="{numero}" r:id="rId{numero}"/>'
+                           for numero, nom in enumerate(feuilles, 1))
+    parties["xl/workbook.xml"] = (f'<workbook xmlns="{ESPACE}" xmlns:r="{ESPACE_RELATIONS}"><sheets>{feuilles_xml}'
+                                  f'</sheets></workbook>')
+    parties["_rels/.rels"] = (f'<Relationships xmlns="{ESPACE_PAQUET}/relationships"><Relationship Id="rId1" '
+                              f'Type="{ESPACE_RELATIONS}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+    types = "".join(f'<Override PartName="/xl/worksheets/sheet{numero}.xml" ContentType="{TYPE_CONTENU}.worksheet+xml"/>'
+                    for numero in range(1, len(feuilles) + 1))
+    parties["[Content_Types].xml"] = (
+        f'<Types xmlns="{ESPACE_PAQUET}/content-types">'
+        f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        f'<Override PartName="/xl/workbook.xml" ContentType="{TYPE_CONTENU}.sheet.main+xml"/>'
+        f'<Override PartName="/xl/sharedStrings.xml" ContentType="{TYPE_CONTENU}.sharedStrings+xml"/>{types}</Types>')
+    with zipfile.ZipFile(chemin, "w", zipfile.ZIP_DEFLATED) as conteneur:
+        for nom, xml in parties.items():
+            conteneur.writestr(nom, xml)
+
+@pytest.mark.parametrize("taille_bloc, encodage", [(lecture.TAILLE_BLOC_CHAINES, "utf-8"), (64, "utf-8"),
+                                                    (lecture.TAILLE_BLOC_CHAINES, "utf-16")])
+def test_entete_xlsx_chaines_partagees(tmp_path, monkeypatch, taille_bloc, encodage):
+    monkeypatch.setattr(lecture, "TAILLE_BLOC_CHAINES", taille_bloc)
+    donnees = [[f"valeur {i}", i] for i in range(2000)]
+    chemin = tmp_path / "chaines.xlsx"
+    _ecrire_xlsx_chaines_partagees(chemin, {"Données": donnees, "Promo": [ENTETE_PROMO, ["FRCA"]]}, encodage)
+
+    with ouvrir_classeur(chemin) as classeur:
+        entete = classeur.lire_entete("Promo")
+        entete_feuille, _ = classeur.lire_feuille("Promo")
+    assert entete == entete_feuille == ENTETE_PROMO
+
+@pytest.mark.parametrize("date1904", [False, True])
+def test_calendrier_xlsb(tmp_path, date1904):
+    chemin = tmp_path / "calendrier.xlsb"
+    ecrivain = EcrivainXlsb(chemin, date1904=date1904)
+    ecrivain.ajouter_feuille("Promo", [["DEBUTVIE1"], [45292.0]], 2, 1)
+    ecrivain.close()
+
+    with ouvrir_classeur(chemin) as classeur:
+        assert classeur.date1904 is date1904
+        _, df = classeur.lire_feuille("Promo")
+    assert df["DEBUTVIE1"].tolist() == [45292.0]
+
+@pytest.mark.parametrize("date1904", [False, True])
+def test_calendrier_xlsx(tmp_path, date1904):
+    # Une cellule au format date est rendue en série du calendrier du classeur
+    classeur_openpyxl = Workbook()
+    classeur_openpyxl.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+    feuille = classeur_openpyxl.active
+    feuille.title = "Promo"
+    feuille.append(["DEBUTVIE1"])
+    feuille.append([datetime.datetime(2024, 1, 1)])
+    chemin = tmp_path / "calendrier.xlsx"
+    classeur_openpyxl.save(chemin)
+
+    with ouvrir_classeur(chemin) as classeur:
+        assert classeur.date1904 is date1904
+        _, df = classeur.lire_feuille("Promo")
+    assert df["DEBUTVIE1"].tolist() == [45292 - 1462 if date1904 else 45292]
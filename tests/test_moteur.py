@@ -0,0 +1,154 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from verificateur import (
+    COLONNES_NUMERIQUES,
+    SPEC_PROMO,
+    SPEC_REFERENTIEL,
+    developper_plages,
+    evaluer_feuille,
+    verifier_client,
+    verifier_codeclient,
+    verifier_colonnes_numeriques,
+)
+
+from verificateur.moteur import SERIE_MAX_EXCEL, _dates_excel
+
+import ancien_verificateur as ancien
+
+# Valeurs tirées pour la colonne de référence : codes autorisés, invalides, vides (dont texte blanc)
+VALEURS_CODES = ["FRCA", "FRCH", "FRCA", "FRCH", "FRXX", "frca", "BE", "", "  ", None, 12.0]
+# Cellules texte des colonnes numériques. Le moteur accepte aussi les nombres natifs entiers (12.0), que
+# les anciennes vérifications refusaient. Les cellules vides, qu'elles comptaient non numériques ('nan'
+# sous pandas 2, mais astype(str) conserve NaN sous pandas 3), sont testées à part
+VALEURS_NUMERIQUES = ["12", " 7 ", "007", "0", "N/A", "12,5", "-3", "4.5", "douze", " ", "1e3"]
+
+def _feuille(aleatoire, colonne_reference, colonnes_numeriques):
+    nb_lignes = aleatoire.randint(0, 40)
+    # Fin de feuille vide : la zone utile s'arrête avant la dernière ligne
+    nb_remplies = aleatoire.randint(0, nb_lignes)
+    colonnes = {colonne_reference: [aleatoire.choice(VALEURS_CODES) if i < nb_remplies else None
+                                    for i in range(nb_lignes)]}
+    for col in colonnes_numeriques:
+        if aleatoire.random() < 0.9:
+            colonnes[col] = [aleatoire.choice(VALEURS_NUMERIQUES) for _ in range(nb_lignes)]
+    if aleatoire.random() < 0.1:
+        del colonnes[colonne_reference]
+    return pd.DataFrame(colonnes, index=pd.RangeIndex(nb_lignes))
+
+def _lignes(plages):
+    return [int(ligne) for ligne in developper_plages(plages)]
+
+def _comparer_codes(nouveau, attendu):
+    assert nouveau['statut'] == attendu['statut']
+    if attendu['statut'] != 'ERREUR' or 'zone_analysee' not in attendu:
+        # Détails identiques ; en erreur, les lignes sont désormais résumées en plages
+        assert nouveau['details'] == attendu['details']
+        return
+    assert _lignes(nouveau['plages_vides']) == attendu['lignes_vides']
+    assert _lignes(nouveau['plages_invalides']) == attendu['lignes_invalides']
+    assert nouveau['valeurs_invalides'] == attendu['valeurs_invalides']
+    assert nouveau['zone_analysee'] == attendu['zone_analysee']
+
+@pytest.mark.parametrize("graine", range(200))
+def test_codes_comme_anciennes_verifications(graine):
+    aleatoire = random.Random(graine)
+    referentiel = _feuille(aleatoire, "CODECLIENT", [])
+    _comparer_codes(verifier_codeclient(referentiel), ancien.verifier_codeclient(referentiel))
+    promo = _feuille(aleatoire, "CLIENT", [])
+    _comparer_codes(verifier_client(promo), ancien.verifier_client(promo))
+
+@pytest.mark.parametrize("graine", range(200))
+def test_numeriques_comme_anciennes_verifications(graine):
+    aleatoire = random.Random(graine)
+    df = _feuille(aleatoire, "CODECLIENT", COLONNES_NUMERIQUES)
+    nouveaux = verifier_colonnes_numeriques(df, COLONNES_NUMERIQUES)
+    attendus = ancien.verifier_colonnes_numeriques(df, COLONNES_NUMERIQUES)
+
+    assert list(nouveaux) == list(attendus)
+    for col, attendu in attendus.items():
+        nouveau = nouveaux[col]
+        assert nouveau['statut'] == attendu['statut']
+        assert nouveau['nb_erreurs'] == attendu['nb_erreurs']
+        assert _lignes(nouveau['plages_erreur']) == attendu['lignes_erreur']
+        assert nouveau['valeurs_non_numeriques'] == attendu['valeurs_non_numeriques']
+        assert nouveau.get('zone_analysee') == attendu.get('zone_analysee')
+
+def test_numeriques_natifs_entiers_acceptes():
+    df = pd.DataFrame({"CODECLIENT": ["FRCA"] * 9, "PCBPROMO": [1.0] * 5 + [12.0, 7, 3.5, True]})
+    verification = verifier_colonnes_numeriques(df, ["PCBPROMO"])['PCBPROMO']
+    assert verification['statut'] == 'ERREUR'
+    assert _lignes(verification['plages_erreur']) == [9, 10]
+    assert verification['valeurs_non_numeriques'] == ['3.5', 'True']
+
+@pytest.mark.parametrize("vide", [None, np.nan])
+def test_numeriques_cellules_vides_refusees(vide):
+    # Dans la zone utile, une cellule vide n'est pas un nombre (lue None, ou NaN dans une colonne de nombres)
+    for valeurs in ([1.0, vide, 3.0], ["1", vide, "3"], [True, vide, False], [vide, vide, vide]):
+        df = pd.DataFrame({"CODECLIENT": ["FRCA"] * 8, "PCBPROMO": [1.0] * 5 + valeurs})
+        verification = verifier_colonnes_numeriques(df, ["PCBPROMO"])['PCBPROMO']
+        assert 8 in _lignes(verification['plages_erreur'])
+        assert verification['valeurs_non_numeriques'] == (['True', 'False'] if valeurs[0] is True else [])
+
+@pytest.mark.parametrize("spec, verifier", [(SPEC_REFERENTIEL, verifier_codeclient), (SPEC_PROMO, verifier_client)])
+def test_enveloppes_comme_evaluer_feuille(spec, verifier):
+    aleatoire = random.Random(7)
+    df = _feuille(aleatoire, spec['colonne_reference'], spec['colonnes_numeriques'])
+    while df.empty or spec['colonne_reference'] not in df.columns:
+        df = _feuille(aleatoire, spec['colonne_reference'], spec['colonnes_numeriques'])
+    complet = evaluer_feuille(df, spec)
+
+    codes = verifier(df)
+    assert codes.keys() == complet[spec['cle_codes']].keys()
+    for cle, valeur in codes.items():
+        np.testing.assert_equal(valeur, complet[spec['cle_codes']][cle])
+
+    numeriques = verifier_colonnes_numeriques(df, spec['colonnes_numeriques'], spec['colonne_reference'])
+    np.testing.assert_equal(numeriques, complet['colonnes_numeriques'])
+
+def _dates(serie, date1904=False):
+    dates, invalides = _dates_excel(pd.Series(serie, dtype=object), date1904)
+    return [None if np.isnat(date) else str(date) for date in dates], invalides.tolist()
+
+def test_dates_calendrier_1900():
+    dates, invalides = _dates([1, 59, 60, 60.5, 61, 45292.75, 0, SERIE_MAX_EXCEL, SERIE_MAX_EXCEL + 1, None, "texte"])
+    # Le 29/02/1900 (série 60, hérité de Lotus 1-2-3) n'est pas une date
+    assert dates == ["1900-01-01", "1900-02-28", None, None, "1900-03-01", "2024-01-01", None, "9999-12-31", None,
+                     None, None]
+    assert invalides == [False, False, True, True, False, False, True, False, True, False, True]
+
+def test_dates_calendrier_1904():
+    dates, invalides = _dates([0, 60, 45292.75 - 1462, -1], date1904=True)
+    assert dates == ["1904-01-01", "1904-03-01", "2024-01-01", None]
+    assert invalides == [False, False, False, True]
+
+def _feuille_dates(series):
+    return pd.DataFrame({"CODECLIENT": ["FRCA"] * (len(series) + 5),
+                         "DEBUTVIE1": [None] * 5 + series, "FINVIE1": [None] * 5 + series})
+
+def test_evaluer_feuille_calendrier_1904(monkeypatch):
+    monkeypatch.setitem(SPEC_REFERENTIEL, 'fenetre_dates', ["2024-01-01", "2024-12-31"])
+    serie_2024 = [45292.0, 45300.0]
+    en_1900 = evaluer_feuille(_feuille_dates(serie_2024), SPEC_REFERENTIEL)
+    # Mêmes dates saisies dans un classeur au calendrier 1904 : 1 462 jours de moins
+    en_1904 = evaluer_feuille(_feuille_dates([s - 1462 for s in serie_2024]), SPEC_REFERENTIEL, date1904=True)
+    assert en_1900['colonnes_dates']['DEBUTVIE1']['statut'] == 'OK'
+    assert en_1904['colonnes_dates']['DEBUTVIE1']['statut'] == 'OK'
+    lu_en_1900 = evaluer_feuille(_feuille_dates([s - 1462 for s in serie_2024]), SPEC_REFERENTIEL)
+    assert lu_en_1900['colonnes_dates']['DEBUTVIE1']['nb_erreurs'] == 2
+
+def test_reprise_des_dates_selon_le_calendrier(monkeypatch):
+    monkeypatch.setitem(SPEC_REFERENTIEL, 'fenetre_dates', ["2024-01-01", "2024-12-31"])
+    df = _feuille_dates([45292.0 - 1462, 45300.0 - 1462])
+    precedent = {**evaluer_feuille(df, SPEC_REFERENTIEL), 'nb_lignes': len(df)}
+    assert precedent['colonnes_dates']['DEBUTVIE1']['statut'] == 'ERREUR'
+
+    # Mêmes colonnes, même calendrier : reprises ; calendrier changé : réévaluées
+    assert 'DEBUTVIE1' in evaluer_feuille(df, SPEC_REFERENTIEL, precedent=precedent)['regles_reprises']
+    en_1904 = evaluer_feuille(df, SPEC_REFERENTIEL, precedent=precedent, date1904=True)
+    assert 'DEBUTVIE1' not in en_1904['regles_reprises']
+    assert en_1904['colonnes_dates']['DEBUTVIE1']['statut'] == 'OK'
+    assert en_1904['periodes']['DEBUTVIE1/FINVIE1']['statut'] == 'OK'
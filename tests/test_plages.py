@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from verificateur import developper_plages, encoder_plages, formater_plages, nb_lignes_plages, verification_lignes
+from verificateur.plages import LIMITE_PLAGES
+
+@pytest.mark.parametrize("lignes, plages", [
+    ([], []),
+    ([7], [[7, 7]]),
+    ([2, 3, 4, 5], [[2, 5]]),
+    ([2, 3, 5, 8, 9, 10, 12], [[2, 3], [5, 5], [8, 10], [12, 12]]),
+])
+def test_encoder_plages(lignes, plages):
+    encodees = encoder_plages(lignes)
+    assert encodees.dtype == np.int32 and encodees.shape == (len(plages), 2)
+    assert encodees.tolist() == plages
+    assert developper_plages(encodees).tolist() == lignes
+    assert nb_lignes_plages(encodees) == len(lignes)
+
+def test_plages_compactes():
+    # 300 000 lignes contiguës sauf une : deux plages au lieu de 300 000 numéros
+    lignes = np.delete(np.arange(2, 300_002), 1000)
+    plages = encoder_plages(lignes)
+    assert plages.tolist() == [[2, 1001], [1003, 300_001]]
+    assert nb_lignes_plages(plages) == len(lignes)
+
+def test_formater_plages():
+    assert formater_plages(encoder_plages([])) == ""
+    # Milliers séparés par une espace fine insécable, plages par un tiret demi-cadratin
+    assert formater_plages(encoder_plages([12, *range(4498, 4501), 4510])) == "12, 4 498–4 500, 4 510"
+
+def test_formater_plages_borne():
+    plages = encoder_plages(range(2, 200, 2))
+    assert formater_plages(plages, limite=3) == "2, 4, 6, … (+96 plages)"
+    assert formater_plages(plages[:3], limite=3) == "2, 4, 6"
+
+def test_details_bornes():
+    # Une ligne sur deux en erreur : les détails n'énumèrent que LIMITE_PLAGES plages
+    lignes = np.arange(2, 100_002, dtype=np.int32)
+    en_erreur = lignes % 2 == 0
+    verification = verification_lignes(lignes, en_erreur, ["x"] * int(en_erreur.sum()), "lignes en erreur")
+    assert verification['nb_erreurs'] == 50_000
+    assert len(verification['plages_erreur']) == 50_000
+    assert verification['details'].endswith(f"… (+{50_000 - LIMITE_PLAGES} plages))")
+    assert len(verification['details']) < 300
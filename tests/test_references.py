@@ -0,0 +1,97 @@
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from verificateur import (COLONNES_UNIQUES_LOT, SPEC_REFERENTIEL, IndexLot, annoter_doublons_lot, encoder_plages,
+                          sans_index_cles, traiter_fichier)
+from verificateur.travaux import TERMINE, FileTravaux, executer_travail
+
+def test_resultat_sans_index_cles(classeurs):
+    resultat = traiter_fichier("plan.xlsb", classeurs["xlsb"])
+    # Seules les clés contrôlées entre fichiers sont conservées, pas les index des onglets
+    assert all('index_cles' not in resultat[spec] for spec in ("referentiel", "promo"))
+    assert sorted(resultat['cles_lot']) == sorted(COLONNES_UNIQUES_LOT)
+    assert 'cles_lot' not in sans_index_cles(resultat)
+
+def test_fichier_inchange_repris_avec_ses_cles(classeurs):
+    precedent = traiter_fichier("plan.xlsb", classeurs["xlsb"])
+    resultat = traiter_fichier("plan.xlsb", classeurs["xlsb"], precedent)
+    assert resultat[SPEC_REFERENTIEL['cle']]['feuille_reprise']
+    assert resultat['cles_lot'] is precedent['cles_lot']
+    assert resultat['statut_global'] == precedent['statut_global']
+
+def test_travail_annote_les_doublons_du_lot(tmp_path, fixtures):
+    file_travaux = FileTravaux(tmp_path / "travaux")
+    travail, repertoire = file_travaux.preparer()
+    fichiers = []
+    for nom in ("a.xlsb", "b.xlsb"):
+        shutil.copy(fixtures / "plan_conforme.xlsb", repertoire / nom)
+        fichiers.append((nom, repertoire / nom))
+    file_travaux.soumettre(travail, fichiers, "complet")
+
+    with ThreadPoolExecutor(1) as pool:
+        assert executer_travail(file_travaux, travail, pool) == TERMINE
+
+    resultats = file_travaux.resultats(travail)
+    for position, autre in ((0, "b.xlsb"), (1, "a.xlsb")):
+        assert 'cles_lot' not in resultats[position]
+        doublons = resultats[position][SPEC_REFERENTIEL['cle']]['doublons_lot']
+        assert {col: list(v['fichiers_concernes']) for col, v in doublons.items()} == {
+            col: [autre] for col in COLONNES_UNIQUES_LOT
+        }
+    # Clés du lot supprimées une fois les résultats complétés
+    connexion = sqlite3.connect(file_travaux.chemin_base)
+    try:
+        assert connexion.execute("SELECT COUNT(cles_lot) FROM fichiers").fetchone()[0] == 0
+    finally:
+        connexion.close()
+
+def _cles(*valeurs):
+    """cles_lot d'une colonne REFCOL dont les lignes Excel 2, 3... portent valeurs"""
+    categories = list(dict.fromkeys(valeurs))
+    codes = np.array([categories.index(v) for v in valeurs], dtype=np.int32)
+    return {'REFCOL': {'categories': categories, 'codes': None if len(categories) == len(valeurs) else codes,
+                       'plages': encoder_plages(np.arange(2, len(valeurs) + 2))}}
+
+def test_index_lot_paires_de_fichiers():
+    index_lot = IndexLot()
+    index_lot.ajouter_cles("a.xlsb", _cles("R1", "R2", "R3", "R4"))
+    index_lot.ajouter_cles("b.xlsb", _cles("R3", "R4", "R5"))
+    # Référentiel illisible : aucune clé, aucun doublon
+    index_lot.ajouter_cles("illisible.xlsb", None)
+    # R6 répétée dans un seul fichier : doublon interne (unicité), pas du lot
+    index_lot.ajouter_cles("c.xlsb", _cles("R6", "R4", "R6"))
+    a, b, illisible, c = index_lot.doublons()
+
+    assert illisible == {}
+    # Chaque fichier compte les valeurs qu'il partage avec chacun des autres
+    assert a['REFCOL']['fichiers_concernes'] == {"b.xlsb": 2, "c.xlsb": 1}
+    assert b['REFCOL']['fichiers_concernes'] == {"a.xlsb": 2, "c.xlsb": 1}
+    assert c['REFCOL']['fichiers_concernes'] == {"a.xlsb": 1, "b.xlsb": 1}
+    assert a['REFCOL']['autres_fichiers'] == {"R3": ["b.xlsb"], "R4": ["b.xlsb", "c.xlsb"]}
+    assert c['REFCOL']['autres_fichiers'] == {"R4": ["a.xlsb", "b.xlsb"]}
+    # Lignes Excel en erreur de chaque fichier
+    assert a['REFCOL']['plages_erreur'].tolist() == [[4, 5]]
+    assert b['REFCOL']['plages_erreur'].tolist() == [[2, 3]]
+    assert c['REFCOL']['plages_erreur'].tolist() == [[3, 3]]
+    assert a['REFCOL']['nb_erreurs'] == 2
+
+def test_index_lot_sans_valeur_partagee():
+    index_lot = IndexLot()
+    index_lot.ajouter_cles("a.xlsb", _cles("R1", "R2"))
+    index_lot.ajouter_cles("b.xlsb", _cles("R3"))
+    a, b = index_lot.doublons()
+    assert a['REFCOL']['statut'] == b['REFCOL']['statut'] == 'OK'
+    assert 'fichiers_concernes' not in a['REFCOL']
+    # Colonne déclarée dans un seul fichier : non contrôlée
+    assert 'EAN' not in a
+
+def test_ajouter_doublons_lot(classeurs):
+    resultat = traiter_fichier("plan.xlsb", classeurs["xlsb"])
+    a, b = annoter_doublons_lot([resultat, {**resultat, 'nom_fichier': "copie.xlsb"}])
+    assert a['statut_global'] == b['statut_global'] == 'ERREUR'
+    assert list(a[SPEC_REFERENTIEL['cle']]['doublons_lot']['REFCOL']['fichiers_concernes']) == ["copie.xlsb"]
+    # Résultat d'origine inchangé
+    assert 'doublons_lot' not in resultat[SPEC_REFERENTIEL['cle']]
@@ -0,0 +1,97 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from verificateur import travaux
+from verificateur.travaux import ANNULE, EN_ATTENTE, EN_COURS, TERMINE, FileTravaux, executer_travail
+
+@pytest.fixture
+def file_travaux(tmp_path):
+    return FileTravaux(tmp_path / "travaux")
+
+def _soumettre(file_travaux, fixtures, noms, proprietaire=None):
+    travail, repertoire = file_travaux.preparer()
+    fichiers = []
+    for nom in noms:
+        shutil.copy(fixtures / "plan_conforme.xlsb", repertoire / nom)
+        fichiers.append((nom, repertoire / nom))
+    return file_travaux.soumettre(travail, fichiers, "complet", proprietaire)
+
+def test_mode_inconnu(file_travaux):
+    travail, _ = file_travaux.preparer()
+    with pytest.raises(ValueError):
+        file_travaux.soumettre(travail, [], "rapide")
+
+def test_reserver_dans_l_ordre_de_soumission(file_travaux, fixtures):
+    premier = _soumettre(file_travaux, fixtures, ["a.xlsb"])
+    second = _soumettre(file_travaux, fixtures, ["b.xlsb", "c.xlsb"])
+    etat = file_travaux.etat(second)
+    assert (etat['statut'], etat['position_file'], etat['fichiers_avant']) == (EN_ATTENTE, 1, 1)
+
+    file_travaux.signaler(1)
+    assert file_travaux.reserver(1) == premier
+    assert file_travaux.etat(premier)['statut'] == EN_COURS
+    # Le travail en cours compte dans la position de ceux qui attendent
+    assert file_travaux.etat(second)['position_file'] == 1
+    file_travaux.signaler(2)
+    assert file_travaux.reserver(2) == second
+    assert file_travaux.reserver(3) is None
+
+def test_reprise_apres_arret_du_worker(file_travaux, fixtures, monkeypatch):
+    travail = _soumettre(file_travaux, fixtures, ["a.xlsb", "b.xlsb"])
+    file_travaux.signaler(1)
+    assert file_travaux.reserver(1) == travail
+    debut = file_travaux.etat(travail)['debut']
+    file_travaux.enregistrer_resultat(travail, 0, {'nom_fichier': "a.xlsb", 'statut_global': 'OK'})
+
+    # Worker 1 en vie : son travail n'est pas repris
+    file_travaux.signaler(2)
+    assert file_travaux.reserver(2) is None
+    # Plus de signe de vie depuis DELAI_WORKER_ABSENT : repris là où il s'était arrêté
+    monkeypatch.setattr(travaux, "DELAI_WORKER_ABSENT", -1.0)
+    assert file_travaux.reserver(2) == travail
+    assert file_travaux.etat(travail)['debut'] == debut
+    mode, _, restants = file_travaux.fichiers_restants(travail)
+    assert mode == "complet" and [(position, nom) for position, nom, _ in restants] == [(1, "b.xlsb")]
+
+    with ThreadPoolExecutor(1) as pool:
+        assert executer_travail(file_travaux, travail, pool) == TERMINE
+    resultats = file_travaux.resultats(travail)
+    assert resultats[0] == {'nom_fichier': "a.xlsb", 'statut_global': 'OK'}
+    assert resultats[1]['nom_fichier'] == "b.xlsb"
+
+def test_annuler_un_travail_en_attente(file_travaux, fixtures):
+    travail = _soumettre(file_travaux, fixtures, ["a.xlsb"])
+    file_travaux.annuler(travail)
+    assert file_travaux.etat(travail)['statut'] == ANNULE
+    file_travaux.signaler(1)
+    assert file_travaux.reserver(1) is None
+
+def test_annuler_un_travail_en_cours(file_travaux, fixtures, monkeypatch):
+    travail = _soumettre(file_travaux, fixtures, ["a.xlsb", "b.xlsb", "c.xlsb"])
+    file_travaux.signaler(1)
+    file_travaux.reserver(1)
+    enregistrer = file_travaux.enregistrer_resultat
+
+    def enregistrer_puis_annuler(*args):
+        enregistrer(*args)
+        file_travaux.annuler(travail)
+
+    # Annulation demandée dès le premier résultat : les fichiers suivants sont abandonnés
+    monkeypatch.setattr(file_travaux, "enregistrer_resultat", enregistrer_puis_annuler)
+    with ThreadPoolExecutor(1) as pool:
+        assert executer_travail(file_travaux, travail, pool) == ANNULE
+    assert list(file_travaux.resultats(travail)) == [0]
+    # Annulation demandée pendant l'exécution : le statut final est fixé par le worker
+    assert file_travaux.etat(travail)['statut'] == EN_COURS
+
+def test_travaux_par_proprietaire(file_travaux, fixtures):
+    a = _soumettre(file_travaux, fixtures, ["a.xlsb"], proprietaire="alice")
+    b = _soumettre(file_travaux, fixtures, ["b.xlsb"], proprietaire="bob")
+    a2 = _soumettre(file_travaux, fixtures, ["c.xlsb"], proprietaire="alice")
+    assert [t['id'] for t in file_travaux.travaux_recents("alice")] == [a2, a]
+    assert [t['id'] for t in file_travaux.travaux_recents("bob")] == [b]
+    assert file_travaux.travaux_recents("inconnu") == []
+    assert file_travaux.etat(b)['proprietaire'] == "bob"
+    assert file_travaux.fichiers_restants(a)[1] == "alice"
@@ -0,0 +1,76 @@
+"""Vérification de conformité des fichiers Excel de plan de lignes"""
+
+from .admission import BUDGET_MEMOIRE, ControleAdmission, estimer_memoire
+from .cache import CacheResultats, empreinte_contenu
+from .cles import analyser_ean, verification_index, verifier_codes_ean, verifier_unicite
+from .entetes import IndexEntete, empreinte_entete, normaliser_nom
+from .export import (
+    CHAMPS_CONSTAT,
+    CONTROLES_COLONNES,
+    FORMATS_EXPORT,
+    EcrivainConstats,
+    exporter_constats,
+    iterer_constats,
+    parquet_disponible,
+)
+from .historique import HistoriqueResultats, charger_precedent, comparer_constats, empreintes_colonnes
+from .instantanes import InstantanesFeuilles, instantanes_disponibles, instantanes_par_defaut
+from .lecture import (
+    EXTENSIONS_CLASSEURS,
+    ClasseurXlsb,
+    ClasseurXlsx,
+    dimensions_feuilles,
+    noms_colonnes_pandas,
+    ouvrir_classeur,
+)
+from .metriques import MESURER_MEMOIRE, Metriques, profiler, resume_profil
+from .moteur import (
+    REGLES_FEUILLE,
+    colonnes_projetees,
+    evaluer_feuille,
+    evaluer_regle,
+    preparer_contexte,
+    verification_lignes,
+)
+from .parallele import NB_PROCESSUS, creer_pool, verifier_lot
+from .plages import developper_plages, encoder_plages, formater_plages, nb_lignes_plages
+from .references import (
+    IndexLot,
+    ajouter_doublons_lot,
+    annoter_doublons_lot,
+    extraire_cles_lot,
+    sans_index_cles,
+    verifier_references,
+)
+from .rapport import construire_rapport, construire_synthese
+from .regles import (
+    CODES_CLIENTS_AUTORISES,
+    COLONNES_DATES_PROMO,
+    COLONNES_DATES_REFERENTIEL,
+    COLONNES_EAN_PROMO,
+    COLONNES_EAN_REFERENTIEL,
+    COLONNES_NUMERIQUES,
+    COLONNES_NUMERIQUES_PROMO,
+    COLONNES_PROMO,
+    COLONNES_REFERENCES_PROMO,
+    COLONNES_REFERENTIEL,
+    COLONNES_UNIQUES_LOT,
+    COLONNES_UNIQUES_REFERENTIEL,
+    FENETRE_SAISON,
+    LIGNES_EXCLUES_EXCEL,
+    PERIODES_PROMO,
+    PERIODES_REFERENTIEL,
+    SPEC_PROMO,
+    SPEC_REFERENTIEL,
+    SPECS_FEUILLES,
+    version_regles,
+)
+from .traitement import feuille_en_erreur, traiter_fichier, verifier_entetes_fichier
+from .verifications import (
+    detecter_colonnes_dupliquees_brutes,
+    verifier_client,
+    verifier_codeclient,
+    verifier_colonnes_dupliquees,
+    verifier_colonnes_numeriques,
+    verifier_colonnes_obligatoires,
+)
@@ -0,0 +1,72 @@
+"""Contrôle d'admission des vérifications : un fichier ne démarre que si son pic de mémoire estimé tient dans le budget"""
+
+import os
+
+from .lecture import dimensions_feuilles
+from .moteur import colonnes_projetees
+from .regles import SPECS_FEUILLES
+
+# Mémoire que les vérifications en cours peuvent occuper ensemble (le worker de l'application est unique :
+# ce budget vaut pour tout le serveur)
+BUDGET_MEMOIRE = int(os.environ.get("VERIFICATEUR_BUDGET_MEMOIRE_MO", 4096)) * 1024 * 1024
+
+# Modèle du pic de mémoire d'une vérification complète, ajusté sur les pics mesurés ('pic_processus'
+# des métriques) : base du processus (modules dont pyarrow, classeur ouvert, lot de lignes en cours
+# d'écriture dans l'instantané) plus un coût par cellule des colonnes projetées, seules conservées
+MEMOIRE_BASE = 32 * 1024 * 1024
+OCTETS_PAR_CELLULE = 64
+# Taille décompressée minimale d'une cellule dans la feuille : borne basse du nombre de cellules
+# quand les dimensions déclarées manquent ou sont fausses
+OCTETS_FEUILLE_PAR_CELLULE = {'xlsb': 5, 'xlsx': 12}
+
+def estimer_memoire(contenu, mode="traiter_fichier"):
+    """
+    Pic de mémoire estimé (octets) de la vérification d'un classeur (bytes ou
+    chemin), d'après les dimensions et la taille de ses onglets vérifiés lues
+    dans le zip. La vérification des en-têtes seuls, comme un fichier illisible
+    (en échec dès l'ouverture), ne compte que pour la base.
+    """
+    if mode != "traiter_fichier":
+        return MEMOIRE_BASE
+    try:
+        dimensions = dimensions_feuilles(contenu, [spec['nom_feuille'] for spec in SPECS_FEUILLES])
+    except Exception:
+        return MEMOIRE_BASE
+
+    nb_cellules = 0
+    for spec in SPECS_FEUILLES:
+        feuille = dimensions.get(spec['nom_feuille'])
+        if feuille is None:
+            continue
+        cellules_feuille = max(feuille['nb_lignes'] * feuille['nb_colonnes'],
+                               feuille['taille'] // OCTETS_FEUILLE_PAR_CELLULE[feuille['format']])
+        # Seules les colonnes projetées restent en mémoire ; sans dimensions déclarées, toutes sont comptées
+        nb_projetees = len(colonnes_projetees(spec))
+        if feuille['nb_colonnes'] > nb_projetees:
+            cellules_feuille = cellules_feuille * nb_projetees // feuille['nb_colonnes']
+        nb_cellules += cellules_feuille
+    return MEMOIRE_BASE + OCTETS_PAR_CELLULE * nb_cellules
+
+class ControleAdmission:
+    """
+    Mémoire engagée par les vérifications admises et pas encore terminées.
+    Une vérification est admise si son estimation tient dans le reste du
+    budget ; seule, elle l'est toujours (un fichier plus gros que le budget
+    passe quand rien d'autre ne tourne, au lieu d'attendre indéfiniment).
+    """
+
+    def __init__(self, budget=BUDGET_MEMOIRE):
+        self.budget = budget
+        self.engagee = 0
+        self.nb_admises = 0
+
+    def admissible(self, estimation):
+        return self.nb_admises == 0 or self.engagee + estimation <= self.budget
+
+    def admettre(self, estimation):
+        self.engagee += estimation
+        self.nb_admises += 1
+
+    def liberer(self, estimation):
+        self.engagee -= estimation
+        self.nb_admises -= 1
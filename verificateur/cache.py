@@ -0,0 +1,158 @@
+"""Cache des résultats de vérification adressé par le contenu des fichiers"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .regles import version_regles
+from .repertoires import preparer_repertoire, repertoire_defaut
+
+REPERTOIRE_CACHE = os.environ.get("VERIFICATEUR_CACHE_DIR", repertoire_defaut("cache"))
+TAILLE_MAX_DISQUE = int(os.environ.get("VERIFICATEUR_CACHE_MAX_MO", 512)) * 1024 * 1024
+MAX_ENTREES_MEMOIRE = 256
+
+def _empreinte_code():
+    """Empreinte des sources du paquet : un résultat calculé par une autre version du code n'est pas réutilisé"""
+    empreinte = hashlib.sha256()
+    for chemin in sorted(Path(__file__).parent.glob("*.py")):
+        empreinte.update(chemin.read_bytes())
+    return empreinte.hexdigest()[:16]
+
+def empreinte_contenu(contenu):
+    """SHA-256 du contenu d'un fichier (bytes, ou chemin lu par blocs)"""
+    if isinstance(contenu, (bytes, bytearray)):
+        return hashlib.sha256(contenu).hexdigest()
+    with open(contenu, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+class CacheResultats:
+    """
+    Cache à deux niveaux des résultats de traiter_fichier : un niveau mémoire
+    (LRU borné en nombre d'entrées) et un niveau disque partagé entre les
+    sessions et les redémarrages (borné en octets, éviction LRU par date
+    d'accès). La clé combine le SHA-256 du fichier, la version des règles
+    et le mode de vérification : modifier une liste de règles rend
+    automatiquement les anciennes entrées inaccessibles.
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_CACHE, taille_max_disque=TAILLE_MAX_DISQUE,
+                 max_entrees_memoire=MAX_ENTREES_MEMOIRE):
+        self.repertoire = preparer_repertoire(repertoire) if repertoire else None
+        self.taille_max_disque = taille_max_disque
+        self.max_entrees_memoire = max_entrees_memoire
+        self._memoire = OrderedDict()
+        self._verrou = threading.Lock()
+        self._version = f"{version_regles()}-{_empreinte_code()}"
+        self.succes = 0
+        self.echecs = 0
+
+    def cle(self, contenu, mode="traiter_fichier"):
+        """Clé de cache d'un fichier pour un mode de vérification donné"""
+        return f"{empreinte_contenu(contenu)}-{self._version}-{mode}"
+
+    def obtenir(self, cle, nom_fichier=None):
+        """Retourne le résultat en cache (renommé avec nom_fichier) ou None"""
+        with self._verrou:
+            resultat = self._memoire.get(cle)
+            if resultat is not None:
+                self._memoire.move_to_end(cle)
+            else:
+                resultat = self._lire_disque(cle)
+                if resultat is not None:
+                    self._memoriser(cle, resultat)
+
+            if resultat is None:
+                self.echecs += 1
+                return None
+            self.succes += 1
+
+        # Un même contenu peut être uploadé sous plusieurs noms
+        resultat = dict(resultat)
+        if nom_fichier is not None:
+            resultat['nom_fichier'] = nom_fichier
+        return resultat
+
+    def enregistrer(self, cle, resultat):
+        """Ajoute un résultat aux deux niveaux du cache"""
+        with self._verrou:
+            self._memoriser(cle, resultat)
+            self._ecrire_disque(cle, resultat)
+
+    def statistiques(self):
+        """Compteurs de succès/échecs et occupation du cache"""
+        with self._verrou:
+            fichiers = self._fichiers_disque()
+            return {
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'entrees_memoire': len(self._memoire),
+                'entrees_disque': len(fichiers),
+                'taille_disque': sum(taille for _, _, taille in fichiers)
+            }
+
+    def vider(self):
+        with self._verrou:
+            self._memoire.clear()
+            for chemin, _, _ in self._fichiers_disque():
+                chemin.unlink(missing_ok=True)
+
+    def _memoriser(self, cle, resultat):
+        self._memoire[cle] = resultat
+        self._memoire.move_to_end(cle)
+        while len(self._memoire) > self.max_entrees_memoire:
+            self._memoire.popitem(last=False)
+
+    def _chemin(self, cle):
+        return self.repertoire / f"{cle}.pkl"
+
+    def _lire_disque(self, cle):
+        if self.repertoire is None:
+            return None
+        chemin = self._chemin(cle)
+        try:
+            with open(chemin, "rb") as f:
+                resultat = pickle.load(f)
+            os.utime(chemin)  # Date d'accès pour l'éviction LRU
+            return resultat
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrée corrompue (écriture interrompue, autre version de pandas...)
+            chemin.unlink(missing_ok=True)
+            return None
+
+    def _ecrire_disque(self, cle, resultat):
+        if self.repertoire is None:
+            return
+        # Écriture atomique : un lecteur concurrent ne voit jamais de fichier partiel
+        descripteur, temporaire = tempfile.mkstemp(dir=self.repertoire, suffix=".tmp")
+        with os.fdopen(descripteur, "wb") as f:
+            pickle.dump(resultat, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaire, self._chemin(cle))
+        self._evincer_disque()
+
+    def _fichiers_disque(self):
+        if self.repertoire is None:
+            return []
+        fichiers = []
+        for chemin in self.repertoire.glob("*.pkl"):
+            try:
+                infos = chemin.stat()
+            except FileNotFoundError:
+                continue
+            fichiers.append((chemin, infos.st_mtime, infos.st_size))
+        return fichiers
+
+    def _evincer_disque(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        fichiers = sorted(self._fichiers_disque(), key=lambda f: f[1])
+        taille_totale = sum(taille for _, _, taille in fichiers)
+        for chemin, _, taille in fichiers:
+            if taille_totale <= self.taille_max_disque:
+                break
+            chemin.unlink(missing_ok=True)
+            taille_totale -= taille
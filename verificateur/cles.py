@@ -0,0 +1,69 @@
+"""Contrôles des colonnes de clés sur leur index haché : clés de contrôle EAN-13 et unicité dans l'onglet"""
+
+import numpy as np
+
+from .moteur import LONGUEUR_EAN, verification_lignes
+
+# Pondération des 12 premiers chiffres d'un EAN-13 (1, 3, 1, 3...) pour la clé de contrôle
+POIDS_EAN = np.tile([1, 3], (LONGUEUR_EAN - 1) // 2)
+
+def verification_index(index, en_erreur, details):
+    """Vérification d'une colonne de clés : lignes indexées dont la valeur est marquée par en_erreur (une case par valeur distincte)"""
+    lignes_en_erreur = en_erreur[index['codes']]
+    valeurs_erreur = np.asarray(index['categories'], dtype=object)[index['codes'][lignes_en_erreur]]
+    return verification_lignes(index['lignes'], lignes_en_erreur, valeurs_erreur, details)
+
+def analyser_ean(valeurs):
+    """
+    Pour des valeurs texte : masque des valeurs formées de 13 chiffres et masque
+    de celles dont le dernier chiffre est la clé de contrôle EAN-13. Les
+    valeurs de 13 caractères sont vues comme une matrice (n, 13) de points de
+    code : chiffres, somme pondérée et clé sont calculés pour toutes à la fois.
+    """
+    valeurs = np.asarray(valeurs, dtype=object)
+    longueurs = np.fromiter(map(len, valeurs), dtype=np.int64, count=len(valeurs))
+    format_valide = longueurs == LONGUEUR_EAN
+    cle_valide = np.zeros(len(valeurs), dtype=bool)
+    if format_valide.any():
+        points = valeurs[format_valide].astype(f"U{LONGUEUR_EAN}").view(np.uint32).reshape(-1, LONGUEUR_EAN)
+        chiffres = points.astype(np.int64) - ord("0")
+        que_des_chiffres = ((chiffres >= 0) & (chiffres <= 9)).all(axis=1)
+        cle = (10 - (chiffres[:, :-1] @ POIDS_EAN) % 10) % 10
+        format_valide[format_valide] = que_des_chiffres
+        cle_valide[np.flatnonzero(longueurs == LONGUEUR_EAN)[que_des_chiffres]] = (cle == chiffres[:, -1])[que_des_chiffres]
+    return format_valide, cle_valide
+
+def verifier_codes_ean(index_cles, colonnes):
+    """
+    Clé de contrôle EAN-13 de chaque cellule remplie des colonnes EAN, évaluée
+    une fois par valeur distincte de l'index puis reportée sur les lignes
+    """
+    resultats = {}
+    for col in colonnes:
+        if col not in index_cles:
+            resultats[col] = {'statut': 'ABSENT', 'details': f"Colonne {col} absente"}
+            continue
+        index = index_cles[col]
+        format_valide, cle_valide = analyser_ean(index['categories'])
+        verification = verification_index(index, ~cle_valide,
+                                            "codes EAN invalides (13 chiffres dont une clé de contrôle exacte attendus)")
+        if verification['statut'] == 'ERREUR':
+            formats_invalides = int((~format_valide)[index['codes']].sum())
+            verification['nb_formats_invalides'] = formats_invalides
+            verification['nb_cles_invalides'] = verification['nb_erreurs'] - formats_invalides
+        resultats[col] = verification
+    return resultats
+
+def verifier_unicite(index_cles, colonnes):
+    """Lignes dont la clé (REFCOL, IFLS, EAN...) apparaît plusieurs fois dans l'onglet, d'après les codes de l'index"""
+    resultats = {}
+    for col in colonnes:
+        if col not in index_cles:
+            resultats[col] = {'statut': 'ABSENT', 'details': f"Colonne {col} absente"}
+            continue
+        index = index_cles[col]
+        en_double = np.bincount(index['codes'], minlength=len(index['categories'])) > 1
+        verification = verification_index(index, en_double, "lignes dont la valeur apparaît plusieurs fois dans l'onglet")
+        verification['nb_valeurs_en_double'] = int(en_double.sum())
+        resultats[col] = verification
+    return resultats
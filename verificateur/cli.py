@@ -0,0 +1,176 @@
+"""Vérification en ligne de commande (sans Streamlit) : un résultat JSON par ligne"""
+
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import tempfile
+
+from .admission import BUDGET_MEMOIRE
+from .cache import CacheResultats
+from .export import FORMATS_EXPORT, EcrivainConstats, parquet_disponible
+from .lecture import EXTENSIONS_CLASSEURS
+from .metriques import profiler
+from .parallele import NB_PROCESSUS, verifier_lot
+from .references import IndexLot, ajouter_doublons_lot, sans_index_cles
+from .regles import COLONNES_UNIQUES_LOT, SPEC_REFERENTIEL
+from .traitement import traiter_fichier, verifier_entetes_fichier
+
+MODES = {
+    'complet': traiter_fichier,
+    'entetes': verifier_entetes_fichier
+}
+
+def _json_defaut(valeur):
+    """Sérialise les types numpy/pandas présents dans les résultats"""
+    # Les tableaux (plages de lignes...) ont aussi item() : tolist() d'abord
+    if hasattr(valeur, 'tolist'):
+        return valeur.tolist()
+    if hasattr(valeur, 'item'):
+        return valeur.item()
+    if isinstance(valeur, (set, frozenset)):
+        return sorted(valeur)
+    raise TypeError(f"Type non sérialisable en JSON : {type(valeur).__name__}")
+
+def lister_fichiers(chemins, recursif=False):
+    """Développe les répertoires et motifs glob en une liste triée de classeurs .xlsb/.xlsx (sans doublons)"""
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            trouves = []
+            for extension in EXTENSIONS_CLASSEURS:
+                motif = os.path.join(chemin, "**", f"*.{extension}") if recursif else os.path.join(chemin, f"*.{extension}")
+                trouves.extend(glob.glob(motif, recursive=recursif))
+            # Fichiers de verrouillage d'Excel (~$classeur.xlsx) ignorés
+            fichiers.extend(sorted(p for p in trouves if not os.path.basename(p).startswith("~$")))
+        else:
+            fichiers.extend(sorted(p for p in glob.glob(chemin, recursive=recursif) if os.path.isfile(p)))
+    return list(dict.fromkeys(fichiers))
+
+def _analyser_arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m verificateur",
+        description="Vérifie la conformité de classeurs .xlsb/.xlsx et écrit un résultat JSON par fichier (JSON Lines)."
+    )
+    parser.add_argument("chemins", nargs="+", help="Fichiers, répertoires ou motifs glob (ex: 'partage/**/*.xlsb')")
+    parser.add_argument("-j", "--processus", type=int, default=NB_PROCESSUS,
+                        help=f"Nombre de processus en parallèle (défaut : {NB_PROCESSUS})")
+    parser.add_argument("-o", "--sortie", default="-", help="Fichier JSON Lines de sortie (défaut : sortie standard)")
+    parser.add_argument("--mode", choices=sorted(MODES), default="complet",
+                        help="complet : toutes les vérifications ; entetes : structure (ligne 1) uniquement")
+    parser.add_argument("-r", "--recursif", action="store_true", help="Parcourt les répertoires récursivement")
+    parser.add_argument("--budget-memoire", type=int, metavar="MO", default=BUDGET_MEMOIRE // (1024 * 1024),
+                        help=f"Pic de mémoire estimé des fichiers vérifiés en même temps, les autres attendent "
+                             f"(défaut : {BUDGET_MEMOIRE // (1024 * 1024)} Mo, 0 : sans limite)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Réutilise les résultats déjà calculés pour un contenu et des règles identiques")
+    parser.add_argument("--constats", metavar="FICHIER",
+                        help="Exporte aussi une ligne par anomalie ; format déduit de l'extension (.csv, .jsonl, .parquet)")
+    parser.add_argument("--metriques-memoire", action="store_true",
+                        help="Mesure aussi le pic mémoire de chaque étape (tracemalloc, vérification plus lente)")
+    parser.add_argument("--profil", metavar="MOTIF",
+                        help="Profile (cProfile) les fichiers dont le nom correspond au motif (ex: 'plan_*.xlsb')")
+    parser.add_argument("--repertoire-profils", default=".", help="Répertoire des fichiers .pstats (défaut : .)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Point d'entrée : retourne 0 si tous les fichiers sont conformes, 1 si au
+    moins un fichier est en erreur (y compris par une clé du Référentiel déclarée
+    dans un autre fichier du lot, signalée en fin de lot), 2 si aucun fichier n'a été trouvé
+    ou si le format de --constats n'est pas disponible.
+    Les lignes JSON sont écrites en fin de lot, complétées de ces clés partagées.
+    """
+    args = _analyser_arguments(argv)
+    format_constats = None
+    if args.constats:
+        format_constats = os.path.splitext(args.constats)[1].lstrip(".").lower()
+        if format_constats not in FORMATS_EXPORT:
+            print(f"Extension non prise en charge pour --constats : {args.constats} "
+                  f"(attendu : {', '.join('.' + f for f in FORMATS_EXPORT)})", file=sys.stderr)
+            return 2
+        if format_constats == 'parquet' and not parquet_disponible():
+            print("L'export Parquet (--constats .parquet) nécessite le paquet optionnel pyarrow "
+                  "(pip install pyarrow), ou choisissez .csv ou .jsonl", file=sys.stderr)
+            return 2
+    chemins = lister_fichiers(args.chemins, args.recursif)
+    if not chemins:
+        print("Aucun fichier .xlsb ou .xlsx trouvé", file=sys.stderr)
+        return 2
+
+    if args.metriques_memoire:
+        # Lu à l'import par les workers, démarrés après cette ligne
+        os.environ["VERIFICATEUR_METRIQUES_MEMOIRE"] = "1"
+
+    # Les workers lisent eux-mêmes les fichiers : seuls les chemins transitent entre processus
+    fichiers = [(os.path.basename(chemin), chemin) for chemin in chemins]
+    cache = CacheResultats() if args.cache else None
+    en_erreur = set()
+    # Index des clés de chaque fichier (pas ses résultats), pour les doublons entre fichiers en fin de lot
+    index_lot = IndexLot()
+    positions_lot = []
+
+    sortie = sys.stdout if args.sortie == "-" else open(args.sortie, "w", encoding="utf-8")
+    # Lignes JSON mises de côté sur disque (pas en mémoire) jusqu'à la fin du lot : les clés partagées
+    # entre fichiers, connues seulement alors, sont ajoutées au résultat de chaque fichier concerné
+    tampon = tempfile.TemporaryFile("w+", encoding="utf-8")
+    # Constats écrits au fil des résultats : rien n'est conservé pour la fin du lot
+    constats = EcrivainConstats(args.constats, format_constats) if args.constats else None
+    try:
+        for i, future in verifier_lot(fichiers, MODES[args.mode], nb_processus=args.processus, cache=cache,
+                                      budget_memoire=args.budget_memoire * 1024 * 1024):
+            try:
+                resultat = future.result()
+            except Exception as e:
+                resultat = {'nom_fichier': fichiers[i][0], 'statut_global': 'ERREUR', 'erreur_generale': str(e)}
+            resultat = {'chemin': chemins[i], **resultat}
+
+            if resultat['statut_global'] == 'ERREUR':
+                en_erreur.add(i)
+            index_lot.ajouter(resultat)
+            positions_lot.append(i)
+            resultat = sans_index_cles(resultat)
+            tampon.write(json.dumps(resultat, ensure_ascii=False, default=_json_defaut) + "\n")
+            if constats is not None:
+                constats.ecrire([resultat])
+
+        partages = 0
+        tampon.seek(0)
+        for i, ligne, doublons in zip(positions_lot, tampon, index_lot.doublons()):
+            if doublons:
+                resultat = ajouter_doublons_lot(json.loads(ligne), doublons)
+                ligne = json.dumps(resultat, ensure_ascii=False, default=_json_defaut) + "\n"
+            sortie.write(ligne)
+
+            doublons = {col: v for col, v in doublons.items() if v['statut'] == 'ERREUR'}
+            if not doublons:
+                continue
+            partages += 1
+            en_erreur.add(i)
+            for colonne, verification in doublons.items():
+                print(f"{chemins[i]} : {colonne}, {verification['details']}", file=sys.stderr)
+            if constats is not None:
+                constats.ecrire([{'nom_fichier': fichiers[i][0], SPEC_REFERENTIEL['cle']: {'doublons_lot': doublons}}])
+        if partages:
+            print(f"{partages} fichier(s) déclarent des clés ({', '.join(COLONNES_UNIQUES_LOT)}) "
+                  f"présentes dans d'autres fichiers du lot", file=sys.stderr)
+    finally:
+        tampon.close()
+        if constats is not None:
+            constats.close()
+        if sortie is not sys.stdout:
+            sortie.close()
+
+    if args.profil:
+        os.makedirs(args.repertoire_profils, exist_ok=True)
+        for nom, chemin in fichiers:
+            if fnmatch.fnmatch(nom, args.profil):
+                chemin_profil = os.path.join(args.repertoire_profils, f"{os.path.splitext(nom)[0]}.pstats")
+                profiler(MODES[args.mode], nom, chemin, chemin_profil)
+                print(f"Profil de {chemin} écrit dans {chemin_profil}", file=sys.stderr)
+
+    print(f"{len(chemins)} fichier(s) vérifié(s) : {len(chemins) - len(en_erreur)} conforme(s), "
+          f"{len(en_erreur)} avec erreurs", file=sys.stderr)
+    return 1 if en_erreur else 0
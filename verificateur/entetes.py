@@ -0,0 +1,57 @@
+"""Index et empreinte de la ligne d'en-tête d'un onglet (partagés par les fichiers d'un même modèle)"""
+
+import hashlib
+
+import pandas as pd
+
+from .lecture import noms_colonnes_pandas
+
+def empreinte_entete(entete_brute):
+    """
+    Empreinte de l'en-tête brut (ligne 1) : deux fichiers issus du même modèle
+    ont la même. repr distingue les types (1 et '1', None et 'None').
+    """
+    return hashlib.blake2b("\x1f".join(map(repr, entete_brute)).encode("utf-8"), digest_size=16).hexdigest()
+
+def normaliser_nom(nom):
+    """Forme tolérante d'un nom de colonne : casse et espaces (bords, doubles, insécables) ignorés"""
+    return " ".join(str(nom).split()).casefold()
+
+class IndexEntete:
+    """
+    Index d'une ligne d'en-tête, calculé une fois par empreinte : position de
+    chaque colonne (noms pandas), doublons stricts de l'en-tête brut et noms
+    normalisés pour repérer les orthographes approchantes d'une colonne absente
+    """
+
+    def __init__(self, entete_brute):
+        self.entete_brute = list(entete_brute)
+        self.noms = noms_colonnes_pandas(self.entete_brute)
+        self.positions = {nom: i for i, nom in enumerate(self.noms)}
+
+        deja_vus = {}
+        self.doublons = []
+        self.normalises = {}
+        for i, nom in enumerate(self.entete_brute):
+            # Convertir en string pour éviter les problèmes avec les valeurs NaN
+            nom_str = str(nom) if pd.notna(nom) else f"Colonne_vide_{i}"
+            if nom_str in deja_vus:
+                self.doublons.append((nom_str, deja_vus[nom_str], i))
+            else:
+                deja_vus[nom_str] = i
+                if pd.notna(nom):
+                    self.normalises.setdefault(normaliser_nom(nom), []).append(nom_str)
+
+    def __contains__(self, nom):
+        return nom in self.positions
+
+    def __len__(self):
+        return len(self.noms)
+
+    def position(self, nom):
+        """Position (0 = colonne A) de la colonne, None si elle est absente"""
+        return self.positions.get(nom)
+
+    def approchantes(self, nom):
+        """Colonnes présentes dont seule l'orthographe diffère de nom (casse, espaces)"""
+        return [present for present in self.normalises.get(normaliser_nom(nom), []) if present != nom]
@@ -0,0 +1,186 @@
+"""Export des constats (un enregistrement par anomalie) en CSV, JSON Lines ou Parquet, en flux"""
+
+import csv
+import importlib.util
+import io
+import json
+
+from .plages import developper_plages
+from .regles import SPECS_FEUILLES
+
+CHAMPS_CONSTAT = ['fichier', 'onglet', 'verification', 'colonne', 'ligne_excel', 'valeur']
+FORMATS_EXPORT = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+# Contrôles d'un onglet de forme {colonne: vérification des lignes en erreur} et nom de leurs constats
+CONTROLES_COLONNES = {
+    'colonnes_dates': 'date_invalide',
+    'periodes': 'periode_incoherente',
+    'codes_ean': 'ean_invalide',
+    'unicite': 'cle_en_double',
+    'references': 'reference_orpheline'
+}
+# Constats écrits par lot : la mémoire ne dépend pas du nombre total d'anomalies
+TAILLE_LOT = 10_000
+
+def parquet_disponible():
+    """Parquet nécessite pyarrow (dépendance optionnelle)"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _constats_lignes(fichier, onglet, verification, colonne, plages, valeurs_lignes=None):
+    """Un constat par ligne des plages, avec la valeur de la cellule si elle est connue"""
+    lignes = developper_plages(plages).tolist()
+    if valeurs_lignes is None:
+        for ligne in lignes:
+            yield (fichier, onglet, verification, colonne, ligne, None)
+        return
+    categories = valeurs_lignes['categories']
+    for ligne, code in zip(lignes, valeurs_lignes['codes'].tolist()):
+        yield (fichier, onglet, verification, colonne, ligne, categories[code] if code >= 0 else None)
+
+def iterer_constats(tous_resultats):
+    """
+    Produit les constats de tous les fichiers, un tuple (fichier, onglet,
+    vérification, colonne, ligne Excel, valeur) par anomalie, sans jamais
+    construire la liste complète
+    """
+    for resultat in tous_resultats:
+        fichier = resultat['nom_fichier']
+        if 'erreur_generale' in resultat:
+            yield (fichier, None, 'erreur_generale', None, None, resultat['erreur_generale'])
+
+        for spec in SPECS_FEUILLES:
+            feuille = resultat.get(spec['cle'])
+            if feuille is None:
+                continue
+            onglet = spec['nom_feuille']
+            if 'erreur' in feuille:
+                yield (fichier, onglet, 'onglet_illisible', None, None, feuille['erreur'])
+                continue
+
+            # En-têtes (ligne Excel 1) ; absents d'un résultat partiel (doublons entre fichiers seuls)
+            for nom, premiere, doublon in feuille.get('colonnes_dupliquees_brutes', {}).get('duplicatas', []):
+                yield (fichier, onglet, 'colonne_dupliquee', nom, 1, f"colonnes Excel {premiere + 1} et {doublon + 1}")
+            approchantes = feuille.get('colonnes', {}).get('colonnes_approchantes', {})
+            for nom in feuille.get('colonnes', {}).get('colonnes_manquantes', []):
+                # Valeur : orthographe(s) approchante(s) trouvée(s) dans l'en-tête, s'il y en a
+                yield (fichier, onglet, 'colonne_manquante', nom, 1, " | ".join(approchantes.get(nom, [])) or None)
+
+            # Codes clients
+            colonne = spec['colonne_reference']
+            codes = feuille.get(spec['cle_codes'], {})
+            if codes.get('statut') == 'ABSENT':
+                yield (fichier, onglet, 'colonne_absente', colonne, None, None)
+            elif codes.get('statut') == 'ERREUR':
+                if 'plages_vides' not in codes:
+                    # Colonne présente mais sans aucune donnée
+                    yield (fichier, onglet, 'aucune_donnee', colonne, None, codes['details'])
+                else:
+                    yield from _constats_lignes(fichier, onglet, 'code_vide', colonne, codes['plages_vides'])
+                    yield from _constats_lignes(fichier, onglet, 'code_invalide', colonne, codes['plages_invalides'],
+                                                codes['valeurs_lignes_invalides'])
+
+            # Colonnes numériques
+            for colonne, verification in feuille.get('colonnes_numeriques', {}).items():
+                if verification['statut'] == 'ABSENT':
+                    yield (fichier, onglet, 'colonne_absente', colonne, None, None)
+                elif verification['statut'] == 'ERREUR':
+                    yield from _constats_lignes(fichier, onglet, 'valeur_non_numerique', colonne,
+                                                verification['plages_erreur'], verification['valeurs_lignes'])
+
+            # Dates et clés, puis clés déclarées dans d'autres fichiers du lot
+            for cle_verification, nom_verification in [*CONTROLES_COLONNES.items(), ('doublons_lot', 'doublon_lot')]:
+                for colonne, verification in feuille.get(cle_verification, {}).items():
+                    if verification['statut'] == 'ERREUR':
+                        yield from _constats_lignes(fichier, onglet, nom_verification, colonne,
+                                                    verification['plages_erreur'], verification['valeurs_lignes'])
+
+def _par_lots(constats, taille_lot=TAILLE_LOT):
+    lot = []
+    for constat in constats:
+        lot.append(constat)
+        if len(lot) == taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+class EcrivainConstats:
+    """
+    Écrit des constats au format 'csv', 'jsonl' ou 'parquet' dans destination
+    (chemin ou fichier binaire ouvert), lot par lot : les résultats peuvent être
+    ajoutés au fur et à mesure de la vérification, sans garder les constats en mémoire
+    """
+
+    def __init__(self, destination, format_export):
+        if format_export not in FORMATS_EXPORT:
+            raise ValueError(f"Format d'export inconnu : {format_export} (attendu : {', '.join(FORMATS_EXPORT)})")
+        self.format_export = format_export
+        self.nb_constats = 0
+        self._fermer_destination = isinstance(destination, (str, bytes)) or hasattr(destination, '__fspath__')
+
+        if format_export == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._pa = pa
+            self._schema = pa.schema([
+                ('fichier', pa.string()),
+                ('onglet', pa.string()),
+                ('verification', pa.string()),
+                ('colonne', pa.string()),
+                ('ligne_excel', pa.int32()),
+                ('valeur', pa.string())
+            ])
+            self._parquet = pq.ParquetWriter(destination, self._schema)
+            return
+
+        self._destination = open(destination, "wb") if self._fermer_destination else destination
+        self._texte = io.StringIO()
+        if format_export == 'csv':
+            self._csv = csv.writer(self._texte, delimiter=";")
+            self._csv.writerow(CHAMPS_CONSTAT)
+
+    def ecrire(self, tous_resultats):
+        """Ajoute les constats des résultats donnés"""
+        for lot in _par_lots(iterer_constats(tous_resultats)):
+            self.nb_constats += len(lot)
+            if self.format_export == 'parquet':
+                colonnes = list(zip(*lot))
+                self._parquet.write_table(self._pa.Table.from_arrays(
+                    [self._pa.array(c, type=t) for c, t in zip(colonnes, self._schema.types)], schema=self._schema
+                ))
+                continue
+            if self.format_export == 'csv':
+                self._csv.writerows(lot)
+            else:
+                for constat in lot:
+                    self._texte.write(json.dumps(dict(zip(CHAMPS_CONSTAT, constat)), ensure_ascii=False) + "\n")
+            self._vider()
+
+    def _vider(self):
+        self._destination.write(self._texte.getvalue().encode("utf-8"))
+        self._texte.seek(0)
+        self._texte.truncate()
+
+    def close(self):
+        if self.format_export == 'parquet':
+            self._parquet.close()
+            return
+        self._vider()
+        if self._fermer_destination:
+            self._destination.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def exporter_constats(tous_resultats, destination, format_export):
+    """Écrit en une fois les constats de tous les résultats ; retourne leur nombre"""
+    with EcrivainConstats(destination, format_export) as ecrivain:
+        ecrivain.ecrire(tous_resultats)
+    return ecrivain.nb_constats
@@ -0,0 +1,96 @@
+"""Dernière vérification de chaque nom de fichier de chaque utilisateur : revérification incrémentale et évolution des erreurs"""
+
+import hashlib
+import io
+import json
+import os
+import pickle
+
+from .cache import CacheResultats
+from .export import iterer_constats
+from .repertoires import repertoire_defaut
+
+REPERTOIRE_HISTORIQUE = os.environ.get("VERIFICATEUR_HISTORIQUE_DIR", repertoire_defaut("historique"))
+TAILLE_MAX_HISTORIQUE = int(os.environ.get("VERIFICATEUR_HISTORIQUE_MAX_MO", 256)) * 1024 * 1024
+
+def empreintes_colonnes(df):
+    """
+    Empreinte du contenu de chaque colonne (valeurs et types exacts : 12 et
+    '12' diffèrent), indépendante de la provenance des valeurs (classeur
+    décodé ou instantané Arrow)
+    """
+    empreintes = {}
+    for colonne in df.columns:
+        flux = io.BytesIO()
+        serialiseur = pickle.Pickler(flux, protocol=5)
+        # Sans mémo : la sérialisation ne dépend pas des objets partagés entre cellules
+        serialiseur.fast = True
+        serialiseur.dump(df[colonne].tolist())
+        empreintes[colonne] = hashlib.blake2b(flux.getbuffer(), digest_size=16).hexdigest()
+    return empreintes
+
+def charger_precedent(precedent):
+    """Résultat précédent passé à un worker : dict, chemin du pickle de l'historique, ou None"""
+    if precedent is None or isinstance(precedent, dict):
+        return precedent
+    try:
+        with open(precedent, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # Entrée évincée ou corrompue entre-temps : vérification complète
+        return None
+
+def comparer_constats(precedent, resultat):
+    """
+    Évolution entre deux vérifications d'un fichier : constats (onglet,
+    vérification, colonne, ligne Excel) disparus, apparus et conservés
+    """
+    avant = {constat[1:5] for constat in iterer_constats([precedent])}
+    apres = {constat[1:5] for constat in iterer_constats([resultat])}
+    return {
+        'corrigees': len(avant - apres),
+        'nouvelles': len(apres - avant),
+        'inchangees': len(avant & apres)
+    }
+
+class HistoriqueResultats(CacheResultats):
+    """
+    Dernier résultat de chaque nom de fichier (mêmes niveaux mémoire et disque
+    que CacheResultats). La clé ne dépend que du propriétaire, du nom, du mode
+    et de la version des règles et du code : un fichier corrigé puis réuploadé
+    sous le même nom retrouve sa vérification précédente, ce qui permet de ne
+    revérifier que les colonnes modifiées et d'afficher les erreurs corrigées
+    et nouvelles. Le propriétaire (utilisateur ou session) sépare les
+    historiques : deux utilisateurs qui vérifient chacun un plan.xlsb ne
+    voient pas l'évolution de celui de l'autre.
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_HISTORIQUE, taille_max_disque=TAILLE_MAX_HISTORIQUE,
+                 max_entrees_memoire=16):
+        super().__init__(repertoire, taille_max_disque, max_entrees_memoire)
+
+    def cle(self, nom_fichier, mode="traiter_fichier", proprietaire=None):
+        """Clé d'historique d'un nom de fichier d'un propriétaire pour un mode de vérification donné"""
+        identite = json.dumps([proprietaire, nom_fichier]).encode("utf-8")
+        return f"{hashlib.sha256(identite).hexdigest()[:32]}-{self._version}-{mode}"
+
+    def precedent(self, cle):
+        """
+        Référence légère au résultat précédent, à transmettre à un worker : chemin
+        du pickle sur disque (le worker le relit lui-même), sinon le résultat en mémoire
+        """
+        with self._verrou:
+            if self.repertoire is not None and self._chemin(cle).exists():
+                return str(self._chemin(cle))
+            return self._memoire.get(cle)
+
+    def comparer_et_enregistrer(self, cle, resultat):
+        """
+        Remplace la vérification précédente par resultat et retourne resultat
+        complété de son évolution ('comparaison') s'il y avait un précédent
+        """
+        precedent = self.obtenir(cle)
+        self.enregistrer(cle, resultat)
+        if precedent is None:
+            return resultat
+        return {**resultat, 'comparaison': comparer_constats(precedent, resultat)}
@@ -0,0 +1,246 @@
+"""Instantanés Arrow des feuilles décodées : une feuille déjà lue est relue par mappage mémoire, sans décoder le classeur"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .repertoires import preparer_repertoire, repertoire_defaut
+
+REPERTOIRE_INSTANTANES = os.environ.get("VERIFICATEUR_INSTANTANES_DIR", repertoire_defaut("instantanes"))
+TAILLE_MAX_INSTANTANES = int(os.environ.get("VERIFICATEUR_INSTANTANES_MAX_MO", 4096)) * 1024 * 1024
+
+# Types des valeurs d'une cellule décodée : chaque colonne de l'instantané est une union dense
+# (code de type par ligne + position dans le tableau Arrow de ce type), une ligne pouvant mélanger
+# textes et nombres. Les codes sont les positions des types dans l'union
+TYPES_VALEURS = (
+    (type(None), 'vide', 'null'),
+    (str, 'texte', 'string'),
+    (float, 'nombre', 'float64'),
+    (int, 'entier', 'int64'),
+    (bool, 'booleen', 'bool_')
+)
+CODES_VALEURS = {type_python: code for code, (type_python, _, _) in enumerate(TYPES_VALEURS)}
+
+def instantanes_disponibles():
+    """Les instantanés nécessitent pyarrow (dépendance optionnelle, comme l'export Parquet)"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _version_lecture():
+    """Empreinte du code de lecture : un instantané décodé par une autre version n'est pas réutilisé"""
+    empreinte = hashlib.sha256()
+    for nom in ("lecture.py", "instantanes.py"):
+        empreinte.update((Path(__file__).parent / nom).read_bytes())
+    return empreinte.hexdigest()[:16]
+
+def _type_union(pa):
+    return pa.dense_union([pa.field(genre, getattr(pa, type_arrow)()) for _, genre, type_arrow in TYPES_VALEURS],
+                          list(range(len(TYPES_VALEURS))))
+
+def _encoder_valeurs(pa, valeurs):
+    """Liste de valeurs d'une colonne (un lot de lignes) -> union dense Arrow"""
+    codes = np.fromiter((CODES_VALEURS.get(type(v), -1) for v in valeurs), dtype=np.int8, count=len(valeurs))
+    if (codes < 0).any():
+        raise TypeError("Valeur non prise en charge dans un instantané")
+
+    objets = np.empty(len(valeurs), dtype=object)
+    objets[:] = valeurs
+    positions = np.zeros(len(valeurs), dtype=np.int32)
+    enfants = []
+    for code, (_, genre, type_arrow) in enumerate(TYPES_VALEURS):
+        presents = codes == code
+        nb = int(presents.sum())
+        positions[presents] = np.arange(nb, dtype=np.int32)
+        enfants.append(pa.nulls(nb) if genre == 'vide' else pa.array(objets[presents], type=getattr(pa, type_arrow)()))
+    return pa.UnionArray.from_dense(pa.array(codes), pa.array(positions), enfants,
+                                    [genre for _, genre, _ in TYPES_VALEURS], list(range(len(TYPES_VALEURS))))
+
+def _decoder_valeurs(colonne):
+    """Union dense Arrow (une colonne, tous ses lots) -> liste des valeurs Python d'origine"""
+    valeurs = []
+    for lot in colonne.chunks:
+        codes = lot.type_codes.to_numpy()
+        positions = lot.offsets.to_numpy()
+        extrait = np.full(len(codes), None, dtype=object)
+        for code, (_, genre, _) in enumerate(TYPES_VALEURS):
+            presents = codes == code
+            if genre != 'vide' and presents.any():
+                extrait[presents] = lot.field(code).to_numpy(zero_copy_only=False)[positions[presents]]
+        valeurs.extend(extrait.tolist())
+    return valeurs
+
+class EcrivainInstantane:
+    """
+    Écriture d'un instantané au fil de la lecture d'une feuille (paramètre
+    ecrivain de lire_feuille) : toutes les colonnes sont transmises par lots
+    de lignes et écrites aussitôt, seules les colonnes projetées restent en
+    mémoire. Gestionnaire de contexte : l'instantané n'est publié (écriture
+    atomique) que si la lecture se termine sans erreur. Une valeur non
+    représentable abandonne l'instantané sans interrompre la lecture.
+    """
+
+    def __init__(self, instantanes, chemin):
+        self._instantanes = instantanes
+        self._chemin = chemin
+        self._temporaire = None
+        self._flux = None
+        self._ecriture = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            if exc_type is None and self._ecriture is not None:
+                self._ecriture.close()
+                self._flux.close()
+                self._ecriture = None
+                os.replace(self._temporaire, self._chemin)
+                self._instantanes._evincer()
+        finally:
+            self._abandonner()
+
+    def commencer(self, entete_brute, noms):
+        """Ouvre l'instantané ; une feuille sans colonne (ligne 1 vide) n'en a pas"""
+        import pyarrow as pa
+
+        if not noms:
+            return
+        try:
+            description = json.dumps({'entete': entete_brute, 'colonnes': noms})
+            self._schema = pa.schema([pa.field(str(i), _type_union(pa)) for i in range(len(noms))],
+                                     metadata={"verificateur": description})
+            descripteur, self._temporaire = tempfile.mkstemp(dir=self._instantanes.repertoire, suffix=".tmp")
+            os.close(descripteur)
+            self._flux = pa.OSFile(self._temporaire, "wb")
+            self._ecriture = pa.ipc.new_file(self._flux, self._schema)
+        except (TypeError, ValueError, OSError, pa.ArrowException):
+            self._abandonner()
+
+    def ajouter(self, colonnes):
+        """Écrit un lot de lignes : une liste de valeurs par colonne, dans l'ordre de l'en-tête"""
+        import pyarrow as pa
+
+        if self._ecriture is None:
+            return
+        try:
+            lot = pa.record_batch([_encoder_valeurs(pa, valeurs) for valeurs in colonnes], schema=self._schema)
+            self._ecriture.write_batch(lot)
+        except (TypeError, ValueError, OverflowError, OSError, pa.ArrowException):
+            self._abandonner()
+
+    def _abandonner(self):
+        for ressource in (self._ecriture, self._flux):
+            if ressource is not None:
+                try:
+                    ressource.close()
+                except Exception:
+                    pass
+        self._ecriture = self._flux = None
+        if self._temporaire is not None:
+            Path(self._temporaire).unlink(missing_ok=True)
+            self._temporaire = None
+
+class InstantanesFeuilles:
+    """
+    Magasin disque des feuilles décodées (toutes leurs colonnes) au format
+    Arrow IPC (Feather v2) non compressé, écrites par lots pendant la lecture, borné en octets avec éviction LRU
+    par date d'accès comme CacheResultats. La clé combine l'empreinte de la
+    feuille, son nom et la version du code de lecture, pas celle des règles :
+    une règle nouvelle ou modifiée relit l'instantané par mappage mémoire,
+    seules les colonnes demandées sont matérialisées.
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_INSTANTANES, taille_max=TAILLE_MAX_INSTANTANES):
+        self.repertoire = preparer_repertoire(repertoire)
+        self.taille_max = taille_max
+        self._version = _version_lecture()
+
+    def cle(self, empreinte_feuille, nom_feuille):
+        """Clé de l'instantané d'une feuille (empreinte_feuille du classeur)"""
+        nom = hashlib.blake2b(nom_feuille.encode("utf-8"), digest_size=8).hexdigest()
+        return f"{empreinte_feuille}-{nom}-{self._version}"
+
+    def lire(self, empreinte_feuille, nom_feuille, colonnes=None):
+        """
+        (entete_brute, DataFrame) comme lire_feuille du classeur, limité aux
+        colonnes demandées (toutes si colonnes est None), ou None sans instantané
+        """
+        import pyarrow as pa
+
+        chemin = self._chemin(self.cle(empreinte_feuille, nom_feuille))
+        try:
+            # Mappage mémoire : seules les colonnes converties ci-dessous sont lues sur le disque
+            table = pa.ipc.open_file(pa.memory_map(str(chemin))).read_all()
+            description = json.loads(table.schema.metadata[b"verificateur"])
+            projection = None if colonnes is None else set(colonnes)
+            # Même construction que lire_feuille (listes de valeurs Python) : mêmes types pandas
+            valeurs = {nom: _decoder_valeurs(table.column(str(i)))
+                       for i, nom in enumerate(description['colonnes'])
+                       if projection is None or nom in projection}
+            df = pd.DataFrame(valeurs, index=pd.RangeIndex(table.num_rows))
+            os.utime(chemin)  # Date d'accès pour l'éviction LRU
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Instantané corrompu (autre version de pyarrow...)
+            chemin.unlink(missing_ok=True)
+            return None
+        return description['entete'], df
+
+    def ecrivain(self, empreinte_feuille, nom_feuille):
+        """EcrivainInstantane à passer à lire_feuille pour enregistrer la feuille pendant sa lecture"""
+        return EcrivainInstantane(self, self._chemin(self.cle(empreinte_feuille, nom_feuille)))
+
+    def statistiques(self):
+        """Nombre d'instantanés et occupation du disque"""
+        fichiers = self._fichiers()
+        return {'entrees': len(fichiers), 'taille': sum(taille for _, _, taille in fichiers)}
+
+    def vider(self):
+        for chemin, _, _ in self._fichiers():
+            chemin.unlink(missing_ok=True)
+
+    def _chemin(self, cle):
+        return self.repertoire / f"{cle}.arrow"
+
+    def _fichiers(self):
+        fichiers = []
+        for chemin in self.repertoire.glob("*.arrow"):
+            try:
+                infos = chemin.stat()
+            except FileNotFoundError:
+                continue
+            fichiers.append((chemin, infos.st_mtime, infos.st_size))
+        return fichiers
+
+    def _evincer(self):
+        """Supprime les instantanés les moins récemment utilisés au-delà de la taille maximale"""
+        fichiers = sorted(self._fichiers(), key=lambda f: f[1])
+        taille_totale = sum(taille for _, _, taille in fichiers)
+        for chemin, _, taille in fichiers:
+            if taille_totale <= self.taille_max:
+                break
+            try:
+                chemin.unlink(missing_ok=True)
+            except OSError:
+                # Instantané encore mappé par un autre processus (Windows) : évincé plus tard
+                continue
+            taille_totale -= taille
+
+_instantanes = None
+
+def instantanes_par_defaut():
+    """
+    Magasin d'instantanés du processus (configuré par VERIFICATEUR_INSTANTANES_DIR,
+    vide pour désactiver), ou None si pyarrow n'est pas installé
+    """
+    global _instantanes
+    if _instantanes is None and REPERTOIRE_INSTANTANES and instantanes_disponibles():
+        _instantanes = InstantanesFeuilles()
+    return _instantanes
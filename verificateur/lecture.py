@@ -0,0 +1,721 @@
+"""Lecture en flux des classeurs Excel (.xlsb avec pyxlsb, .xlsx avec openpyxl en lecture seule)"""
+
+import datetime
+import hashlib
+import io
+import itertools
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.text import Text
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_ISO8601, to_excel
+from pyxlsb import BIFF12Reader, Worksheet, biff12
+from pyxlsb.handlers import Handler
+
+# Extensions des classeurs pris en charge (le moteur de lecture est choisi d'après le contenu)
+EXTENSIONS_CLASSEURS = ('xlsb', 'xlsx')
+
+# Parties du classeur dont dépendent aussi les valeurs lues dans une feuille
+# (chaînes partagées, formats de date, calendrier 1904)
+PARTIES_COMMUNES = ('xl/workbook.bin', 'xl/workbook.xml', 'xl/sharedStrings.bin', 'xl/sharedStrings.xml',
+                    'xl/styles.bin', 'xl/styles.xml')
+
+# Dimensions déclarées en tête d'une feuille .xlsx (<dimension ref="A1:EZ50006"/>), avant les données
+MOTIF_DIMENSION_XLSX = re.compile(rb'<(?:\w+:)?dimension\s+ref="(?:[A-Z]+\d+:)?([A-Z]+)(\d+)"')
+OCTETS_ENTETE_XLSX = 1 << 14
+ESPACE_RELATIONS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+ESPACE_TABLEUR = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+# Lignes transmises à la fois à l'écrivain d'un instantané (voir _lire_avec_instantane)
+TAILLE_LOT_INSTANTANE = 8192
+# Blocs décompressés de la table des chaînes parcourue pour un en-tête (voir _chaines_demandees_xlsb / _xlsx)
+TAILLE_BLOC_CHAINES = 1 << 20
+# Déclaration XML et élément racine de la table des chaînes d'un .xlsx (<sst xmlns=... count=...>)
+MOTIF_DECLARATION_XML = re.compile(rb'\s*<\?xml[^>]*encoding=["\']([\w-]+)')
+MOTIF_RACINE_CHAINES_XLSX = re.compile(rb'<((?:[\w.-]+:)?)sst\b[^>]*>')
+
+def _empreinte_parties(conteneur, partie_feuille):
+    """
+    Empreinte d'une feuille d'après le répertoire central du zip (CRC-32 et
+    taille de la feuille et des parties communes) : rien n'est décompressé
+    """
+    empreinte = hashlib.blake2b(digest_size=16)
+    for nom in (partie_feuille, *PARTIES_COMMUNES):
+        try:
+            info = conteneur.getinfo(nom)
+        except KeyError:
+            continue
+        empreinte.update(f"{nom}:{info.CRC}:{info.file_size}\n".encode("utf-8"))
+    return empreinte.hexdigest()
+
+def noms_colonnes_pandas(entete_brute):
+    """Reproduit le nommage des colonnes de pandas (en-têtes vides et doublons renommés)"""
+    noms = [f"Unnamed: {i}" if pd.isna(nom) else nom for i, nom in enumerate(entete_brute)]
+    compteurs = {}
+    for i, nom in enumerate(noms):
+        nb = compteurs.get(nom, 0)
+        while nb > 0:
+            compteurs[nom] = nb + 1
+            nom = f"{nom}.{nb}"
+            nb = compteurs.get(nom, 0)
+        noms[i] = nom
+        compteurs[nom] = nb + 1
+    return noms
+
+def _valeur_cellule(valeur):
+    """Convertit une valeur de cellule pyxlsb comme le fait pandas (vide -> None, flottant entier -> int)"""
+    if valeur is None or valeur == "":
+        return None
+    if isinstance(valeur, float) and valeur.is_integer():
+        return int(valeur)
+    return valeur
+
+def _extraire_entete(lignes):
+    """Sépare l'en-tête brut (ligne 1) du reste des lignes d'une feuille pyxlsb"""
+    premiere = next(lignes, None)
+    if premiere is not None and premiere[0].r != 0:
+        # Ligne 1 vide : pas d'en-tête, la première ligne lue est une donnée
+        return [], itertools.chain([premiere], lignes)
+
+    entete_brute = [_valeur_cellule(cellule.v) for cellule in premiere or []]
+    while entete_brute and entete_brute[-1] is None:
+        entete_brute.pop()
+    return entete_brute, lignes
+
+def _lire_avec_instantane(entete_brute, lignes, colonnes, ecrivain):
+    """
+    Corps de lire_feuille quand un instantané est écrit pendant la lecture :
+    lignes produit (index pandas, valeurs converties de toute la ligne).
+    Toutes les colonnes partent vers l'écrivain par lots de
+    TAILLE_LOT_INSTANTANE lignes, seules les colonnes projetées sont gardées.
+    """
+    noms = noms_colonnes_pandas(entete_brute)
+    projection = set(noms if colonnes is None else colonnes)
+    positions = {nom: i for i, nom in enumerate(noms) if nom in projection}
+    valeurs = {nom: [] for nom in positions}
+    ecrivain.commencer(entete_brute, noms)
+    lot = [[] for _ in noms]
+    nb_lignes = 0
+
+    for index, ligne in lignes:
+        # Une ligne ne compte que si au moins une cellule est remplie (comme pandas)
+        if all(v is None for v in ligne):
+            continue
+        if len(ligne) < len(noms):
+            ligne.extend([None] * (len(noms) - len(ligne)))
+
+        manquantes = index - nb_lignes
+        if manquantes:
+            for liste in itertools.chain(valeurs.values(), lot):
+                liste.extend([None] * manquantes)
+        for liste, i in zip(valeurs.values(), positions.values()):
+            liste.append(ligne[i])
+        for liste, valeur in zip(lot, ligne):
+            liste.append(valeur)
+        nb_lignes = index + 1
+
+        if noms and len(lot[0]) >= TAILLE_LOT_INSTANTANE:
+            ecrivain.ajouter(lot)
+            lot = [[] for _ in noms]
+
+    if noms and lot[0]:
+        ecrivain.ajouter(lot)
+    return pd.DataFrame(valeurs, index=pd.RangeIndex(nb_lignes))
+
+def _chaines_demandees_xlsb(flux, indexes):
+    """
+    {indice: chaîne} des chaînes d'indices demandés de sharedStrings.bin, lu
+    par blocs : les enregistrements sont parcourus d'après leur type et leur
+    longueur (entiers variables lus comme BIFF12Reader), seuls les demandés
+    sont décodés. Les autres ne coûtent que la lecture de leurs deux premiers octets.
+    """
+    chaines = {}
+    dernier = max(indexes)
+    tampon = flux.read(TAILLE_BLOC_CHAINES)
+    p = 0
+    position = 0
+    while position <= dernier:
+        if p > len(tampon):
+            # Enregistrement sauté au-delà du bloc
+            flux.seek(p - len(tampon), io.SEEK_CUR)
+            tampon, p = b"", 0
+        if len(tampon) - p < 8:
+            tampon = tampon[p:] + flux.read(TAILLE_BLOC_CHAINES)
+            p = 0
+        if p >= len(tampon):
+            break
+
+        octet = tampon[p]
+        type_enreg = octet
+        p += 1
+        decalage = 8
+        while octet & 0x80 and decalage < 32:
+            octet = tampon[p]
+            type_enreg += octet << decalage
+            p += 1
+            decalage += 8
+        octet = tampon[p]
+        longueur = octet & 0x7F
+        p += 1
+        decalage = 7
+        while octet & 0x80 and decalage < 28:
+            octet = tampon[p]
+            longueur += (octet & 0x7F) << decalage
+            p += 1
+            decalage += 7
+
+        if type_enreg == biff12.SST_END:
+            break
+        if type_enreg == biff12.SI:
+            if position in indexes:
+                if len(tampon) - p < longueur:
+                    tampon = tampon[p:] + flux.read(longueur)
+                    p = 0
+                # Comme StringInstanceHandler : un octet d'options, puis le nombre et les caractères UTF-16
+                nb_caracteres = int.from_bytes(tampon[p + 1:p + 5], "little")
+                chaines[position] = tampon[p + 5:p + 5 + 2 * nb_caracteres].decode('utf-16', errors='replace')
+            position += 1
+        p += longueur
+    return chaines
+
+class _IndexChaine(int):
+    """Indice de chaîne partagée laissé dans une cellule de l'en-tête, remplacé par sa chaîne ensuite"""
+
+class _IndicesChaines:
+    """Table des chaînes passée à pyxlsb pour l'en-tête : chaque chaîne reste un _IndexChaine"""
+
+    def __getitem__(self, index):
+        return _IndexChaine(index)
+
+class _TableChainesXlsb:
+    """
+    Table des chaînes partagées d'un classeur .xlsb décodée à la demande :
+    en séquence pour les feuilles (__getitem__), ou seulement les chaînes
+    demandées pour les en-têtes (extraire)
+    """
+
+    def __init__(self, zip_classeur):
+        self._zip = zip_classeur
+        self._chaines = []
+        try:
+            flux = io.BufferedReader(zip_classeur.open('xl/sharedStrings.bin'), ClasseurXlsb.TAILLE_TAMPON)
+            self._lecteur = BIFF12Reader(fp=flux)
+        except KeyError:
+            self._lecteur = None
+
+    def __getitem__(self, index):
+        while index >= len(self._chaines) and self._lecteur is not None:
+            try:
+                type_enreg, valeur = next(self._lecteur)
+            except StopIteration:
+                self.close()
+                break
+            if type_enreg == biff12.SI:
+                self._chaines.append(valeur.t)
+            elif type_enreg == biff12.SST_END:
+                self.close()
+        return self._chaines[index]
+
+    def extraire(self, indexes):
+        """
+        {indice: chaîne} des chaînes demandées. Les chaînes pas encore décodées
+        sont cherchées dans un second flux de la table : les enregistrements
+        qui précèdent sont sautés d'après leur longueur, sans être décodés
+        (l'en-tête de Promo est en fin de table, après les chaînes du Référentiel)
+        """
+        chaines = {i: self._chaines[i] for i in indexes if i < len(self._chaines)}
+        restants = set(indexes) - chaines.keys()
+        if not restants:
+            return chaines
+
+        with self._zip.open('xl/sharedStrings.bin') as flux:
+            chaines.update(_chaines_demandees_xlsb(flux, restants))
+        return chaines
+
+    def close(self):
+        if self._lecteur is not None:
+            self._lecteur.close()
+            self._lecteur = None
+
+class _ProprietesClasseurXlsb(Handler):
+    """Enregistrement BrtWbProp de workbook.bin (ignoré par pyxlsb) : seul le calendrier 1904 (bit 0) est lu"""
+
+    def read(self, reader, recid, reclen):
+        return {'date1904': bool((reader.read_int() or 0) & 1)}
+
+class ClasseurXlsb:
+    """
+    Session de lecture d'un classeur .xlsb : le conteneur zip et les métadonnées
+    du classeur ne sont analysés qu'une seule fois pour toutes les feuilles.
+    Les feuilles sont lues en flux, ligne par ligne, avec l'itérateur de pyxlsb.
+    Les dates restent des numéros de série du calendrier du classeur (date1904).
+    """
+
+    TAILLE_TAMPON = 1 << 16
+
+    def __init__(self, contenu):
+        # Contenu en mémoire (bytes) ou chemin du fichier sur disque
+        source = io.BytesIO(contenu) if isinstance(contenu, (bytes, bytearray)) else contenu
+        self._zip = zipfile.ZipFile(source)
+        self._cibles, self.date1904 = self._lire_classeur()
+        self._chaines = _TableChainesXlsb(self._zip)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _lire_classeur(self):
+        """
+        Associe chaque nom de feuille à sa partie dans le zip (xl/workbook.bin +
+        relations) et lit le calendrier du classeur : (cibles, date1904)
+        """
+        with self._zip.open('xl/_rels/workbook.bin.rels') as flux:
+            relations = {el.attrib['Id']: el.attrib['Target'] for el in ET.parse(flux).getroot()}
+
+        cibles = {}
+        date1904 = False
+        with BIFF12Reader(fp=io.BufferedReader(self._zip.open('xl/workbook.bin'), self.TAILLE_TAMPON)) as lecteur:
+            # Gestionnaires propres à ce lecteur : ceux de la classe sont partagés
+            lecteur.handlers = {**BIFF12Reader.handlers, biff12.WORKBOOKPR: _ProprietesClasseurXlsb()}
+            for type_enreg, valeur in lecteur:
+                if type_enreg == biff12.WORKBOOKPR:
+                    date1904 = valeur['date1904']
+                elif type_enreg == biff12.SHEET:
+                    cible = relations[valeur.rId].split('/')
+                    cibles[valeur.name] = f"xl/{cible[0]}/{cible[-1]}"
+                elif type_enreg == biff12.SHEETS_END:
+                    break
+        return cibles, date1904
+
+    @property
+    def feuilles(self):
+        return list(self._cibles)
+
+    def _ouvrir_feuille(self, nom_feuille, chaines=None):
+        """Ouvre la feuille directement depuis le zip, sans la décompresser entièrement en mémoire"""
+        if nom_feuille not in self._cibles:
+            raise ValueError(f"Worksheet named '{nom_feuille}' not found")
+
+        flux = io.BufferedReader(self._zip.open(self._cibles[nom_feuille]), self.TAILLE_TAMPON)
+        return Worksheet(name=nom_feuille, fp=flux, stringtable=self._chaines if chaines is None else chaines)
+
+    def empreinte_feuille(self, nom_feuille):
+        """Empreinte du contenu d'une feuille, sans la lire (égale tant que la feuille n'a pas changé)"""
+        if nom_feuille not in self._cibles:
+            raise ValueError(f"Worksheet named '{nom_feuille}' not found")
+        return _empreinte_parties(self._zip, self._cibles[nom_feuille])
+
+    def dimensions_feuille(self, nom_feuille):
+        """(nb_lignes, nb_colonnes) déclarés en tête de la feuille (0 si absents), sans lire ses lignes"""
+        with self._ouvrir_feuille(nom_feuille) as feuille:
+            dimension = feuille.dimension
+        return (0, 0) if dimension is None else (dimension.r + dimension.h, dimension.c + dimension.w)
+
+    def taille_feuille(self, nom_feuille):
+        """Taille décompressée de la feuille dans le zip (octets)"""
+        return self._zip.getinfo(self._cibles[nom_feuille]).file_size
+
+    def lire_entete(self, nom_feuille):
+        """
+        Retourne l'en-tête brut (ligne 1) d'une feuille sans lire les lignes de
+        données : seules les chaînes partagées de la ligne 1 sont décodées
+        """
+        with self._ouvrir_feuille(nom_feuille, _IndicesChaines()) as feuille:
+            premiere = next(feuille.rows(sparse=True), None)
+        if premiere is not None:
+            chaines = self._chaines.extraire({c.v for c in premiere if isinstance(c.v, _IndexChaine)})
+            premiere = [c._replace(v=chaines[c.v]) if isinstance(c.v, _IndexChaine) else c for c in premiere]
+        entete_brute, _ = _extraire_entete(iter([premiere] if premiere is not None else []))
+        return entete_brute
+
+    def lire_feuille(self, nom_feuille, colonnes=None, ecrivain=None):
+        """
+        Lit une feuille en flux et retourne l'en-tête brut (ligne 1, doublons
+        conservés) ainsi qu'un DataFrame limité aux colonnes demandées (toutes
+        si colonnes est None). Les autres cellules ne sont jamais conservées,
+        la mémoire ne dépend donc que du nombre de colonnes projetées. Avec un
+        ecrivain (EcrivainInstantane), toutes les colonnes lui sont aussi
+        transmises par lots pour enregistrer l'instantané de la feuille.
+        """
+        with self._ouvrir_feuille(nom_feuille) as feuille:
+            entete_brute, lignes = _extraire_entete(feuille.rows(sparse=True))
+            if ecrivain is not None:
+                lignes = ((ligne[0].r - 1, [_valeur_cellule(c.v) for c in ligne]) for ligne in lignes)
+                return entete_brute, _lire_avec_instantane(entete_brute, lignes, colonnes, ecrivain)
+            noms = noms_colonnes_pandas(entete_brute)
+            projection = set(noms if colonnes is None else colonnes)
+            positions = {nom: i for i, nom in enumerate(noms) if nom in projection}
+            valeurs = {nom: [] for nom in positions}
+            nb_lignes = 0
+
+            for ligne in lignes:
+                extrait = [_valeur_cellule(ligne[i].v) for i in positions.values()]
+                # Une ligne ne compte que si au moins une cellule est remplie (comme pandas)
+                if all(v is None for v in extrait) and all(_valeur_cellule(c.v) is None for c in ligne):
+                    continue
+
+                # Index pandas = ligne Excel - 2 : les lignes vides intermédiaires sont conservées
+                manquantes = ligne[0].r - 1 - nb_lignes
+                for liste, valeur in zip(valeurs.values(), extrait):
+                    if manquantes:
+                        liste.extend([None] * manquantes)
+                    liste.append(valeur)
+                nb_lignes = ligne[0].r
+
+        return entete_brute, pd.DataFrame(valeurs, index=pd.RangeIndex(nb_lignes))
+
+    def close(self):
+        self._chaines.close()
+        self._zip.close()
+
+def _valeur_cellule_xlsx(valeur, date1904=False):
+    """
+    Convertit une valeur openpyxl comme une valeur pyxlsb : les dates, que
+    openpyxl décode d'après le format de cellule, redeviennent des numéros de
+    série Excel du calendrier du classeur (1904 si date1904), comme en .xlsb
+    et comme les dates sans format de date
+    """
+    if isinstance(valeur, (datetime.datetime, datetime.date, datetime.time)):
+        valeur = to_excel(valeur, CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900)
+    elif isinstance(valeur, datetime.timedelta):
+        valeur = valeur.total_seconds() / 86400
+    return _valeur_cellule(valeur)
+
+def _parties_xlsx(conteneur):
+    """
+    ({nom de feuille: partie dans le zip}, partie des chaînes partagées ou None,
+    date1904) d'après workbook.xml et ses relations, comme openpyxl (feuilles de
+    calcul seulement, dans l'ordre du classeur ; <workbookPr date1904="1"/>)
+    """
+    with conteneur.open('xl/_rels/workbook.xml.rels') as flux:
+        relations = {el.attrib['Id']: el.attrib for el in ET.parse(flux).getroot()}
+
+    def partie(relation):
+        cible = relation['Target']
+        return cible.lstrip('/') if cible.startswith('/') else posixpath.normpath(f"xl/{cible}")
+
+    with conteneur.open('xl/workbook.xml') as flux:
+        classeur = ET.parse(flux).getroot()
+    cibles = {el.attrib['name']: relations[el.attrib[f"{ESPACE_RELATIONS}id"]]
+              for el in classeur.iter(f"{ESPACE_TABLEUR}sheet")}
+    proprietes = classeur.find(f"{ESPACE_TABLEUR}workbookPr")
+    date1904 = proprietes is not None and proprietes.get('date1904', '').lower() in ('1', 'true')
+    feuilles = {nom: partie(relation) for nom, relation in cibles.items() if relation['Type'].endswith('/worksheet')}
+    chaines = [partie(relation) for relation in relations.values() if relation['Type'].endswith('/sharedStrings')]
+    return feuilles, chaines[0] if chaines else None, date1904
+
+def _premiere_ligne_xlsx(flux):
+    """
+    Cellules de la ligne 1 d'une feuille .xlsx, analysée en flux (iterparse)
+    jusqu'à la fin de cette ligne : [(colonne, type t, valeur)], valeur étant
+    le texte de <v> ou, pour une chaîne en ligne, son texte. Vide si la
+    première ligne du fichier n'est pas la ligne 1.
+    """
+    cellules = []
+    colonne = 0
+    for evenement, element in ET.iterparse(flux, events=("start", "end")):
+        if evenement == "start":
+            if element.tag == f"{ESPACE_TABLEUR}row" and element.get('r', '1') != '1':
+                break
+            continue
+        if element.tag == f"{ESPACE_TABLEUR}c":
+            # Comme WorkSheetParser.parse_cell d'openpyxl (data_only : la formule est ignorée)
+            colonne = coordinate_to_tuple(element.get('r'))[1] if element.get('r') else colonne + 1
+            type_cellule = element.get('t', 'n')
+            if type_cellule == 'inlineStr':
+                chaine = element.find(f"{ESPACE_TABLEUR}is")
+                valeur = None if chaine is None else Text.from_tree(chaine).content
+            else:
+                valeur = element.findtext(f"{ESPACE_TABLEUR}v", None) or None
+            cellules.append((colonne, type_cellule, valeur))
+        elif element.tag in (f"{ESPACE_TABLEUR}row", f"{ESPACE_TABLEUR}sheetData"):
+            break
+    return cellules
+
+def _valeur_xlsx(type_cellule, valeur, chaines, date1904=False):
+    """Valeur d'une cellule lue par _premiere_ligne_xlsx, comme openpyxl puis _valeur_cellule_xlsx"""
+    if valeur is None:
+        return None
+    if type_cellule == 'n':
+        # Même sans le style de la cellule : une date redeviendrait le même numéro de série
+        valeur = float(valeur) if "." in valeur or "E" in valeur or "e" in valeur else int(valeur)
+    elif type_cellule == 's':
+        valeur = chaines[int(valeur)]
+    elif type_cellule == 'b':
+        valeur = bool(int(valeur))
+    elif type_cellule == 'd':
+        valeur = from_ISO8601(valeur)
+    return _valeur_cellule_xlsx(valeur, date1904)
+
+def _chaines_demandees_xlsx(flux, indexes):
+    """
+    {indice: chaîne} des chaînes d'indices demandés de sharedStrings.xml, ou
+    None si la table n'est pas en UTF-8. Les éléments <si> sont comptés par
+    blocs dans le texte brut (fins d'éléments), sans analyse XML ; seuls les
+    demandés sont analysés, replacés dans l'élément racine de la table pour
+    ses espaces de noms.
+    """
+    tampon = flux.read(TAILLE_BLOC_CHAINES)
+    declaration = MOTIF_DECLARATION_XML.match(tampon)
+    racine = MOTIF_RACINE_CHAINES_XLSX.search(tampon)
+    if racine is None or (declaration is not None and declaration[1].lower() not in (b"utf-8", b"utf8")):
+        return None
+    prefixe = racine[1]
+    fermeture, vide, cloture = b"</%bsi>" % prefixe, b"<%bsi/>" % prefixe, b"</%bsst>" % prefixe
+    fins = re.compile(re.escape(fermeture) + b"|" + re.escape(vide))
+
+    chaines = {}
+    restants = sorted(indexes, reverse=True)
+    position = 0
+    tampon = tampon[racine.end():]
+    while restants:
+        nb_elements = tampon.count(fermeture) + tampon.count(vide)
+        if position + nb_elements <= restants[-1]:
+            # Aucune chaîne demandée dans le bloc : ses éléments sont seulement comptés
+            if nb_elements:
+                tampon = tampon[max(tampon.rfind(fermeture) + len(fermeture), tampon.rfind(vide) + len(vide)):]
+            position += nb_elements
+        else:
+            debut = 0
+            for fin in fins.finditer(tampon):
+                if position == restants[-1]:
+                    element = ET.fromstring(racine[0] + tampon[debut:fin.end()] + cloture)[0]
+                    # Comme openpyxl.reader.strings.read_string_table
+                    chaines[position] = Text.from_tree(element).content.replace('x005F_', '')
+                    restants.pop()
+                    if not restants:
+                        break
+                position += 1
+                debut = fin.end()
+            tampon = tampon[debut:]
+
+        bloc = flux.read(TAILLE_BLOC_CHAINES)
+        if not bloc:
+            break
+        tampon += bloc
+    return chaines
+
+class _TableChainesXlsx:
+    """
+    Chaînes partagées d'un classeur .xlsx décodées à la demande pour les
+    en-têtes : load_workbook d'openpyxl les décode toutes à l'ouverture
+    """
+
+    def __init__(self, zip_classeur, partie):
+        self._zip = zip_classeur
+        self._partie = partie
+
+    def extraire(self, indexes):
+        """
+        {indice: chaîne} des chaînes demandées (voir _chaines_demandees_xlsx).
+        Une table dans un autre encodage est analysée en flux (iterparse)
+        jusqu'à la dernière chaîne demandée.
+        """
+        chaines = {}
+        if not indexes or self._partie is None:
+            return chaines
+        with self._zip.open(self._partie) as flux:
+            demandees = _chaines_demandees_xlsx(flux, indexes)
+        if demandees is not None:
+            return demandees
+
+        dernier = max(indexes)
+        position = 0
+        with self._zip.open(self._partie) as flux:
+            for _, element in ET.iterparse(flux):
+                if element.tag != f"{ESPACE_TABLEUR}si":
+                    continue
+                if position in indexes:
+                    # Comme openpyxl.reader.strings.read_string_table
+                    chaines[position] = Text.from_tree(element).content.replace('x005F_', '')
+                element.clear()
+                if position == dernier:
+                    break
+                position += 1
+        return chaines
+
+class ClasseurXlsx:
+    """
+    Session de lecture d'un classeur .xlsx, même interface que ClasseurXlsb.
+    Les feuilles sont lues avec openpyxl en lecture seule (read_only) : elles
+    sont analysées en flux ligne par ligne (iter_rows, values_only), sans
+    jamais construire le modèle complet des cellules en mémoire. load_workbook
+    décodant toute la table des chaînes partagées, le classeur openpyxl n'est
+    ouvert qu'à la première feuille lue : les noms, empreintes et en-têtes
+    des feuilles sont lus directement dans le zip. Les dates redeviennent des
+    numéros de série du calendrier du classeur (date1904).
+    """
+
+    def __init__(self, contenu):
+        self._contenu = contenu
+        source = io.BytesIO(contenu) if isinstance(contenu, (bytes, bytearray)) else contenu
+        self._zip = zipfile.ZipFile(source)
+        self._cibles, partie_chaines, self.date1904 = _parties_xlsx(self._zip)
+        self._chaines = _TableChainesXlsx(self._zip, partie_chaines)
+        self._openpyxl = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    @property
+    def feuilles(self):
+        return list(self._cibles)
+
+    @property
+    def _classeur(self):
+        if self._openpyxl is None:
+            source = io.BytesIO(self._contenu) if isinstance(self._contenu, (bytes, bytearray)) else self._contenu
+            self._openpyxl = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+        return self._openpyxl
+
+    def _partie(self, nom_feuille):
+        if nom_feuille not in self._cibles:
+            raise ValueError(f"Worksheet named '{nom_feuille}' not found")
+        return self._cibles[nom_feuille]
+
+    def _lignes(self, nom_feuille, **bornes):
+        self._partie(nom_feuille)
+        feuille = self._classeur[nom_feuille]
+        # Les dimensions déclarées dans le fichier sont parfois fausses (lignes tronquées) :
+        # on les ignore, chaque ligne s'arrête alors à sa dernière cellule
+        feuille.reset_dimensions()
+        return feuille.iter_rows(values_only=True, **bornes)
+
+    def _entete(self, premiere):
+        entete_brute = [_valeur_cellule_xlsx(valeur, self.date1904) for valeur in premiere or ()]
+        while entete_brute and entete_brute[-1] is None:
+            entete_brute.pop()
+        return entete_brute
+
+    def empreinte_feuille(self, nom_feuille):
+        """Empreinte du contenu d'une feuille, sans la lire (égale tant que la feuille n'a pas changé)"""
+        return _empreinte_parties(self._zip, self._partie(nom_feuille))
+
+    def lire_entete(self, nom_feuille):
+        """
+        Retourne l'en-tête brut (ligne 1) d'une feuille sans lire les lignes de
+        données ni ouvrir le classeur openpyxl : seules la ligne 1 et ses
+        chaînes partagées sont analysées
+        """
+        with self._zip.open(self._partie(nom_feuille)) as flux:
+            cellules = _premiere_ligne_xlsx(flux)
+        chaines = self._chaines.extraire({int(valeur) for _, type_cellule, valeur in cellules
+                                          if type_cellule == 's' and valeur is not None})
+        premiere = [None] * max((colonne for colonne, _, _ in cellules), default=0)
+        for colonne, type_cellule, valeur in cellules:
+            premiere[colonne - 1] = _valeur_xlsx(type_cellule, valeur, chaines, self.date1904)
+        return self._entete(premiere)
+
+    def lire_feuille(self, nom_feuille, colonnes=None, ecrivain=None):
+        """
+        Lit une feuille en flux et retourne l'en-tête brut (ligne 1, doublons
+        conservés) ainsi qu'un DataFrame limité aux colonnes demandées (toutes
+        si colonnes est None), comme ClasseurXlsb.lire_feuille
+        """
+        lignes = self._lignes(nom_feuille)
+        entete_brute = self._entete(next(lignes, None))
+        if ecrivain is not None:
+            lignes = ((position, [_valeur_cellule_xlsx(v, self.date1904) for v in ligne])
+                      for position, ligne in enumerate(lignes))
+            return entete_brute, _lire_avec_instantane(entete_brute, lignes, colonnes, ecrivain)
+        noms = noms_colonnes_pandas(entete_brute)
+        projection = set(noms if colonnes is None else colonnes)
+        positions = {nom: i for i, nom in enumerate(noms) if nom in projection}
+        valeurs = {nom: [] for nom in positions}
+        nb_lignes = 0
+
+        # iter_rows produit aussi les lignes absentes du fichier : position = ligne Excel - 2
+        for position, ligne in enumerate(lignes):
+            extrait = [_valeur_cellule_xlsx(ligne[i], self.date1904) if i < len(ligne) else None
+                       for i in positions.values()]
+            # Une ligne ne compte que si au moins une cellule est remplie (comme pandas)
+            if all(v is None for v in extrait) and all(_valeur_cellule_xlsx(v) is None for v in ligne):
+                continue
+
+            manquantes = position - nb_lignes
+            for liste, valeur in zip(valeurs.values(), extrait):
+                if manquantes:
+                    liste.extend([None] * manquantes)
+                liste.append(valeur)
+            nb_lignes = position + 1
+
+        return entete_brute, pd.DataFrame(valeurs, index=pd.RangeIndex(nb_lignes))
+
+    def close(self):
+        if self._openpyxl is not None:
+            self._openpyxl.close()
+        self._zip.close()
+
+def _dimensions_feuilles_xlsx(conteneur, noms_feuilles):
+    """
+    Dimensions déclarées et taille des feuilles d'un .xlsx d'après workbook.xml
+    et ses relations : openpyxl n'est pas utilisé, il chargerait toutes les
+    chaînes partagées
+    """
+    cibles, _, _ = _parties_xlsx(conteneur)
+
+    dimensions = {}
+    for nom in noms_feuilles:
+        if nom not in cibles:
+            continue
+        partie = cibles[nom]
+        with conteneur.open(partie) as flux:
+            trouve = MOTIF_DIMENSION_XLSX.search(flux.read(OCTETS_ENTETE_XLSX))
+        dimensions[nom] = {
+            'nb_lignes': int(trouve[2]) if trouve else 0,
+            'nb_colonnes': column_index_from_string(trouve[1].decode()) if trouve else 0,
+            'taille': conteneur.getinfo(partie).file_size,
+            'format': 'xlsx'
+        }
+    return dimensions
+
+def dimensions_feuilles(contenu, noms_feuilles):
+    """
+    {nom: {'nb_lignes', 'nb_colonnes', 'taille', 'format'}} des feuilles
+    demandées présentes dans le classeur (bytes ou chemin). Seuls les en-têtes
+    des feuilles sont lus : les dimensions déclarées (0 si absentes) peuvent
+    être fausses, la taille décompressée de la feuille donne un second ordre
+    de grandeur.
+    """
+    source = io.BytesIO(contenu) if isinstance(contenu, (bytes, bytearray)) else contenu
+    with zipfile.ZipFile(source) as conteneur:
+        if 'xl/workbook.bin' not in conteneur.namelist():
+            return _dimensions_feuilles_xlsx(conteneur, noms_feuilles)
+
+    dimensions = {}
+    with ClasseurXlsb(contenu) as classeur:
+        for nom in noms_feuilles:
+            if nom in classeur.feuilles:
+                nb_lignes, nb_colonnes = classeur.dimensions_feuille(nom)
+                dimensions[nom] = {'nb_lignes': nb_lignes, 'nb_colonnes': nb_colonnes,
+                                   'taille': classeur.taille_feuille(nom), 'format': 'xlsb'}
+    return dimensions
+
+def ouvrir_classeur(contenu):
+    """
+    Ouvre un classeur (bytes ou chemin) avec le moteur adapté à son contenu,
+    quelle que soit son extension : xl/workbook.bin -> .xlsb (pyxlsb),
+    xl/workbook.xml -> .xlsx (openpyxl en lecture seule)
+    """
+    source = io.BytesIO(contenu) if isinstance(contenu, (bytes, bytearray)) else contenu
+    try:
+        with zipfile.ZipFile(source) as conteneur:
+            parties = set(conteneur.namelist())
+    except zipfile.BadZipFile:
+        raise ValueError("Format de fichier non reconnu : classeur .xlsb ou .xlsx attendu "
+                         "(les anciens .xls et les classeurs protégés par mot de passe ne sont pas pris en charge)")
+
+    if 'xl/workbook.bin' in parties:
+        return ClasseurXlsb(contenu)
+    if 'xl/workbook.xml' in parties:
+        return ClasseurXlsx(contenu)
+    raise ValueError("Format de fichier non reconnu : archive sans classeur Excel (xl/workbook.bin ou xl/workbook.xml)")
@@ -0,0 +1,112 @@
+"""Mesure du temps et de la mémoire des étapes d'une vérification, profilage à la demande"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Pic mémoire par étape (tracemalloc ralentit la vérification : désactivé par défaut)
+MESURER_MEMOIRE = os.environ.get("VERIFICATEUR_METRIQUES_MEMOIRE", "0") == "1"
+
+def _pic_processus_reinitialise():
+    """
+    Remet à zéro le pic de mémoire résidente du processus (Linux) et retourne
+    la mémoire résidente actuelle, ou None si le système ne le permet pas
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _memoire_processus()['VmRSS']
+    except (OSError, KeyError):
+        return None
+
+def _memoire_processus():
+    """Mémoire résidente (VmRSS) et son pic (VmHWM) du processus en octets, d'après /proc (Linux)"""
+    with open("/proc/self/status") as f:
+        return {cle: int(valeur) * 1024 for cle, valeur in re.findall(r"^(VmRSS|VmHWM):\s+(\d+) kB", f.read(), re.M)}
+
+class Metriques:
+    """
+    Durée de chaque étape d'une vérification et, si demandé, pic de mémoire
+    allouée pendant l'étape. S'utilise comme gestionnaire de contexte, qui
+    démarre et arrête tracemalloc quand la mesure mémoire est active.
+    Sous Linux, le pic de mémoire résidente du processus pendant le bloc
+    ('pic_processus', sans surcoût) est toujours relevé : il sert à ajuster
+    l'estimation du contrôle d'admission.
+    """
+
+    def __init__(self, memoire=None):
+        self.memoire = MESURER_MEMOIRE if memoire is None else memoire
+        self.etapes = {}
+        self.pic_processus = None
+        self._pics = []
+        self._tracemalloc_demarre = False
+        self._rss_depart = None
+
+    def __enter__(self):
+        self._rss_depart = _pic_processus_reinitialise()
+        if self.memoire and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_demarre = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._tracemalloc_demarre:
+            tracemalloc.stop()
+            self._tracemalloc_demarre = False
+        if self._rss_depart is not None:
+            self.pic_processus = max(_memoire_processus()['VmHWM'] - self._rss_depart, 0)
+
+    @contextmanager
+    def mesurer(self, etape):
+        """Mesure le bloc sous le nom etape (les étapes peuvent être imbriquées)"""
+        memoire = self.memoire and tracemalloc.is_tracing()
+        if memoire:
+            # reset_peak efface le pic de l'étape englobante : il est conservé à part
+            if self._pics:
+                self._pics[-1] = max(self._pics[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            depart = tracemalloc.get_traced_memory()[0]
+            self._pics.append(depart)
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            mesure = {'duree': time.perf_counter() - debut}
+            if memoire:
+                pic = max(tracemalloc.get_traced_memory()[1], self._pics.pop())
+                if self._pics:
+                    self._pics[-1] = max(self._pics[-1], pic)
+                mesure['pic_memoire'] = pic - depart
+            self.etapes[etape] = mesure
+
+    def en_dict(self):
+        """Métriques à placer sous la clé 'metriques' des résultats"""
+        metriques = {'etapes': dict(self.etapes), 'memoire': self.memoire}
+        if self.pic_processus is not None:
+            metriques['pic_processus'] = self.pic_processus
+        return metriques
+
+def mesurer(metriques, etape):
+    """metriques.mesurer(etape), ou un contexte vide si aucune mesure n'est demandée"""
+    return metriques.mesurer(etape) if metriques is not None else nullcontext()
+
+def profiler(fonction_verification, nom_fichier, contenu, chemin_profil):
+    """
+    Exécute la vérification d'un fichier sous cProfile et écrit les
+    statistiques (format pstats) dans chemin_profil
+    """
+    profil = cProfile.Profile()
+    resultat = profil.runcall(fonction_verification, nom_fichier, contenu)
+    profil.dump_stats(chemin_profil)
+    return resultat
+
+def resume_profil(chemin_profil, limite=25):
+    """Fonctions les plus coûteuses (temps cumulé) d'un fichier pstats, en texte"""
+    flux = io.StringIO()
+    pstats.Stats(str(chemin_profil), stream=flux).strip_dirs().sort_stats("cumulative").print_stats(limite)
+    return flux.getvalue()
@@ -0,0 +1,510 @@
+"""Moteur de règles : évaluation en une passe des vérifications ligne à ligne d'un onglet"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from .historique import empreintes_colonnes
+from .metriques import mesurer
+from .plages import encoder_plages, formater_plages
+
+# Valeurs invalides distinctes conservées au plus dans les résultats
+LIMITE_VALEURS_INVALIDES = 20
+# Nombre de chiffres d'un code EAN-13
+LONGUEUR_EAN = 13
+# Numéros de série Excel, calendrier 1900 : le 1 est le 1900-01-01, le 60 le 29/02/1900 qui n'existe pas
+# (repris de Lotus 1-2-3), le 2 958 465 le 9999-12-31
+ORIGINE_DATES_EXCEL = np.datetime64('1899-12-30', 'D')
+SERIE_MAX_EXCEL = 2_958_465
+SERIE_29_FEVRIER_1900 = 60
+# Calendrier 1904 (classeurs créés sur Mac, option date1904) : le 0 est le 1904-01-01, 1 462 jours après
+ORIGINE_DATES_EXCEL_1904 = np.datetime64('1904-01-01', 'D')
+SERIE_MAX_EXCEL_1904 = 2_957_003
+
+def colonnes_projetees(spec):
+    """Colonnes à lire dans l'onglet pour évaluer ses règles ligne à ligne"""
+    return list(dict.fromkeys([spec['colonne_reference']] + spec['colonnes_numeriques'] + spec.get('colonnes_cles', [])
+                              + spec.get('colonnes_dates', [])))
+
+def _vide(valeurs):
+    """Masque des cellules vides (NaN ou texte blanc), calculé sur les vues texte normalisées"""
+    texte = valeurs.astype(str).str.strip()
+    return valeurs.isna().to_numpy() | (texte == "").to_numpy(dtype=bool, na_value=False)
+
+def preparer_contexte(df, spec):
+    """
+    Calcule une seule fois ce que partagent toutes les règles d'un onglet :
+    masque des lignes exclues, vue normalisée de la colonne de référence et
+    zone utile (jusqu'à la dernière ligne où la colonne de référence est remplie)
+    """
+    nb_lignes = len(df)
+    # Index pandas = ligne Excel - 2 (l'en-tête occupe la ligne 1)
+    lignes_excel = np.arange(nb_lignes) + 2
+    exclues = np.isin(lignes_excel, spec['lignes_exclues'])
+
+    contexte = {
+        'df': df,
+        'lignes_excel': lignes_excel,
+        'exclues': exclues,
+        'reference_presente': spec['colonne_reference'] in df.columns,
+        'derniere_ligne_utile': None,
+        'zone': ~exclues
+    }
+
+    if contexte['reference_presente']:
+        reference = df[spec['colonne_reference']]
+        vide = _vide(reference)
+        remplies = np.flatnonzero(~vide & ~exclues)
+        contexte['reference'] = reference
+        contexte['reference_vide'] = vide
+        if len(remplies):
+            contexte['derniere_ligne_utile'] = remplies[-1]
+            contexte['zone'] = ~exclues & (np.arange(nb_lignes) <= remplies[-1])
+
+    return contexte
+
+def _valeurs_par_ligne(valeurs):
+    """
+    Valeur de chaque ligne en erreur, stockée compactement : valeurs distinctes
+    (texte) et, pour chaque ligne, l'indice de sa valeur (-1 : cellule vide)
+    """
+    codes, categories = pd.factorize(np.asarray(valeurs, dtype=object))
+    return {'categories': [str(v) for v in categories], 'codes': codes.astype(np.int32)}
+
+def _verifier_codes(contexte, spec):
+    """Règle "codes autorisés" sur la colonne de référence (CODECLIENT / CLIENT)"""
+    colonne = spec['colonne_reference']
+    if not contexte['reference_presente']:
+        return {'statut': 'ABSENT', 'details': f'Colonne {colonne} absente'}
+
+    derniere_ligne_utile = contexte['derniere_ligne_utile']
+    if derniere_ligne_utile is None:
+        return {'statut': 'ERREUR', 'details': f'Aucune donnée trouvée dans {colonne}'}
+
+    zone = contexte['zone']
+    reference = contexte['reference']
+    vide_zone = contexte['reference_vide'] & zone
+    invalides_zone = ~reference.isin(spec['codes_autorises']).to_numpy() & ~contexte['reference_vide'] & zone
+
+    nb_vides = int(vide_zone.sum())
+    nb_invalides = int(invalides_zone.sum())
+    nb_lignes_utiles = int(zone.sum())
+
+    details = []
+    plages_vides = encoder_plages([])
+    plages_invalides = encoder_plages([])
+    valeurs_lignes_invalides = _valeurs_par_ligne([])
+    valeurs_invalides = []
+
+    if nb_vides > 0:
+        plages_vides = encoder_plages(contexte['lignes_excel'][vide_zone])
+        details.append(f'{nb_vides} lignes vides (lignes Excel: {formater_plages(plages_vides)})')
+
+    if nb_invalides > 0:
+        plages_invalides = encoder_plages(contexte['lignes_excel'][invalides_zone])
+        valeurs_lignes_invalides = _valeurs_par_ligne(reference.to_numpy()[invalides_zone])
+        uniques = valeurs_lignes_invalides['categories']
+        valeurs_invalides = uniques[:LIMITE_VALEURS_INVALIDES]
+        autres = f' (+{len(uniques) - LIMITE_VALEURS_INVALIDES} autres)' if len(uniques) > LIMITE_VALEURS_INVALIDES else ''
+        details.append(f'{nb_invalides} codes invalides: {valeurs_invalides}{autres} '
+                       f'(lignes Excel: {formater_plages(plages_invalides)})')
+
+    # Ajouter info sur la zone analysée
+    details_zone = f"Zone analysée: {nb_lignes_utiles} lignes (jusqu'à ligne Excel {derniere_ligne_utile + 2})"
+
+    if nb_vides == 0 and nb_invalides == 0:
+        return {'statut': 'OK', 'details': f'Tous les codes clients sont valides (hors lignes exclues). {details_zone}'}
+    # Lignes en plages [début, fin] : voir plages.developper_plages pour la liste complète
+    return {
+        'statut': 'ERREUR',
+        'details': ' | '.join(details) + f' | {details_zone}',
+        'nb_vides': nb_vides,
+        'nb_invalides': nb_invalides,
+        'plages_vides': plages_vides,
+        'plages_invalides': plages_invalides,
+        'valeurs_invalides': valeurs_invalides,
+        # Valeur de chaque ligne de plages_invalides, dans l'ordre (exports)
+        'valeurs_lignes_invalides': valeurs_lignes_invalides,
+        'zone_analysee': nb_lignes_utiles
+    }
+
+# Natures (au sens de pandas.api.types.infer_dtype) ne contenant que des nombres
+NATURES_NUMERIQUES = {'integer', 'floating', 'mixed-integer-float', 'decimal', 'empty'}
+
+# Catégorie de chaque type de cellule : nombre natif, texte ou autre valeur (booléens...)
+_NOMBRE, _TEXTE, _AUTRE, _VIDE = 0, 1, 2, 3
+_CATEGORIES_TYPES = {int: _NOMBRE, float: _NOMBRE, np.int64: _NOMBRE, np.float64: _NOMBRE,
+                     str: _TEXTE, bool: _AUTRE, type(None): _VIDE}
+
+def _analyser_colonne(serie):
+    """
+    Sépare les nombres natifs d'une colonne (float64, NaN ailleurs) du reste :
+    seules les cellules texte restantes passent par l'analyse de chaînes, les
+    autres valeurs (booléens...) sont refusées, comme les cellules vides de la
+    zone utile (comptées non numériques, comme avant le moteur). Retourne le
+    vecteur des nombres et le masque des cellules non numériques invalides.
+    """
+    nature = infer_dtype(serie, skipna=True)
+    if nature in NATURES_NUMERIQUES:
+        nombres = serie.astype(float).to_numpy()
+        return nombres, np.isnan(nombres)
+    if nature == 'boolean':
+        return np.full(len(serie), np.nan), np.ones(len(serie), dtype=bool)
+
+    valeurs = serie.to_numpy(dtype=object)
+    if nature == 'string':
+        categories = np.where(serie.notna().to_numpy(), _TEXTE, _VIDE)
+    else:
+        categories = np.fromiter((_CATEGORIES_TYPES.get(type(v), _AUTRE) for v in valeurs), np.int8, len(valeurs))
+        # Autres types numériques (numpy, Decimal...) : acceptés s'ils sont convertibles
+        for i in np.flatnonzero(categories == _AUTRE):
+            if not isinstance(valeurs[i], bool) and pd.api.types.is_number(valeurs[i]):
+                categories[i] = _NOMBRE
+
+    nombres = np.full(len(valeurs), np.nan)
+    est_nombre = categories == _NOMBRE
+    nombres[est_nombre] = valeurs[est_nombre].astype(float)
+
+    invalides = (categories == _AUTRE) | (categories == _VIDE) | (est_nombre & np.isnan(nombres))
+    est_texte = categories == _TEXTE
+    if est_texte.any():
+        texte = pd.Series(valeurs[est_texte], dtype=object).str.strip()
+        invalides[est_texte] = ~texte.str.fullmatch(r'\d+').to_numpy(dtype=bool, na_value=False)
+    return nombres, invalides
+
+def _valeurs_exemples(valeurs, limite=10):
+    """Valeurs uniques (texte nettoyé) dans l'ordre d'apparition, sans les vides"""
+    exemples = []
+    for valeur in pd.unique(valeurs):
+        if pd.isna(valeur):
+            continue
+        texte = str(valeur).strip()
+        if texte not in ('nan', '') and texte not in exemples:
+            exemples.append(texte)
+            if len(exemples) == limite:
+                break
+    return exemples
+
+def _verifier_numeriques(contexte, spec):
+    """
+    Règle "entiers positifs uniquement" sur les colonnes numériques, dans la zone
+    utile. Les valeurs numériques natives de toutes les colonnes sont contrôlées
+    ensemble sous forme d'un bloc NumPy 2-D (les flottants entiers comme 12.0
+    sont acceptés) ; seules les cellules texte sont analysées par expression régulière.
+    """
+    df = contexte['df']
+    zone = contexte['zone']
+    lignes_zone = contexte['lignes_excel'][zone]
+    presentes = [col for col in spec['colonnes_numeriques'] if col in df.columns]
+
+    nombres = np.full((len(lignes_zone), len(presentes)), np.nan)
+    invalides = np.zeros(nombres.shape, dtype=bool)
+    for j, col in enumerate(presentes):
+        nombres[:, j], invalides[:, j] = _analyser_colonne(df[col][zone])
+
+    # Contrôle vectorisé du bloc : négatifs, décimaux et infinis sont refusés
+    with np.errstate(invalid='ignore'):
+        invalides |= ~np.isnan(nombres) & ((nombres < 0) | (nombres != np.floor(nombres)) | np.isinf(nombres))
+
+    resultats = {}
+    for col in spec['colonnes_numeriques']:
+        if col not in df.columns:
+            resultats[col] = {'statut': 'ABSENT', 'nb_erreurs': 0, 'plages_erreur': encoder_plages([]),
+                              'valeurs_non_numeriques': [], 'valeurs_lignes': _valeurs_par_ligne([])}
+            continue
+
+        non_numeriques = invalides[:, presentes.index(col)]
+        nb_erreurs = int(non_numeriques.sum())
+
+        valeurs_erreur = df[col][zone].to_numpy()[non_numeriques]
+        resultats[col] = {
+            'statut': 'OK' if nb_erreurs == 0 else 'ERREUR',
+            'nb_erreurs': nb_erreurs,
+            'plages_erreur': encoder_plages(lignes_zone[non_numeriques]),
+            # 10 valeurs au plus pour éviter l'encombrement
+            'valeurs_non_numeriques': _valeurs_exemples(valeurs_erreur) if nb_erreurs else [],
+            # Valeur de chaque ligne de plages_erreur, dans l'ordre (exports)
+            'valeurs_lignes': _valeurs_par_ligne(valeurs_erreur),
+            'zone_analysee': len(lignes_zone)
+        }
+
+    return resultats
+
+def _dates_excel(serie, date1904=False):
+    """
+    Convertit en une fois les numéros de série Excel d'une colonne en
+    datetime64[D] (NaT si vide ou invalide, heure ignorée) et retourne aussi
+    le masque des cellules remplies qui ne sont pas une date : texte, booléen,
+    nombre hors des bornes d'Excel, 29/02/1900. Pas de conversion cellule par
+    cellule (pyxlsb.convert_date) : origine du calendrier du classeur (1900,
+    ou 1904 si date1904) + nombre de jours.
+    """
+    nature = infer_dtype(serie, skipna=True)
+    if nature in NATURES_NUMERIQUES:
+        nombres = serie.astype(float).to_numpy()
+        autres = np.zeros(len(nombres), dtype=bool)
+    else:
+        valeurs = serie.to_numpy(dtype=object)
+        if nature == 'string':
+            categories = np.where(serie.notna().to_numpy(), _TEXTE, _VIDE)
+        else:
+            categories = np.fromiter((_CATEGORIES_TYPES.get(type(v), _AUTRE) for v in valeurs), np.int8, len(valeurs))
+        nombres = np.full(len(valeurs), np.nan)
+        est_nombre = categories == _NOMBRE
+        nombres[est_nombre] = valeurs[est_nombre].astype(float)
+        autres = categories == _AUTRE
+        est_texte = categories == _TEXTE
+        # Texte blanc : cellule vide
+        autres[est_texte] = [bool(v.strip()) for v in valeurs[est_texte]]
+
+    with np.errstate(invalid='ignore'):
+        if date1904:
+            valides = np.isfinite(nombres) & (nombres >= 0) & (nombres < SERIE_MAX_EXCEL_1904 + 1)
+        else:
+            valides = np.isfinite(nombres) & (nombres >= 1) & (nombres < SERIE_MAX_EXCEL + 1)
+    jours = np.floor(np.where(valides, nombres, 0)).astype(np.int64)
+    if date1904:
+        dates = ORIGINE_DATES_EXCEL_1904 + jours.astype('timedelta64[D]')
+    else:
+        # Le 29/02/1900 n'est pas une date ; avant lui, les séries sont décalées d'un jour
+        valides &= jours != SERIE_29_FEVRIER_1900
+        jours += jours < SERIE_29_FEVRIER_1900
+        dates = ORIGINE_DATES_EXCEL + jours.astype('timedelta64[D]')
+    dates[~valides] = np.datetime64('NaT')
+    return dates, autres | (~np.isnan(nombres) & ~valides)
+
+def verification_lignes(lignes, en_erreur, valeurs_erreur, details):
+    """
+    Résultat d'une règle ligne à ligne : lignes Excel (parmi lignes) marquées
+    par en_erreur et valeur affichable de chacune (valeurs_erreur, dans l'ordre)
+    """
+    nb_erreurs = int(en_erreur.sum())
+    if nb_erreurs == 0:
+        return {'statut': 'OK', 'nb_erreurs': 0, 'plages_erreur': encoder_plages([]),
+                'valeurs_lignes': _valeurs_par_ligne([]), 'exemples': []}
+    plages = encoder_plages(lignes[en_erreur])
+    valeurs_lignes = _valeurs_par_ligne(valeurs_erreur)
+    return {
+        'statut': 'ERREUR',
+        'nb_erreurs': nb_erreurs,
+        'plages_erreur': plages,
+        # Valeur de chaque ligne de plages_erreur, dans l'ordre (exports)
+        'valeurs_lignes': valeurs_lignes,
+        'exemples': valeurs_lignes['categories'][:LIMITE_VALEURS_INVALIDES],
+        'details': f"{nb_erreurs} {details} (lignes Excel: {formater_plages(plages)})"
+    }
+
+def _verifier_dates(contexte, spec, colonnes, periodes, date1904=False):
+    """
+    Règles de dates dans la zone utile : chaque date des colonnes est valide et
+    dans la fenêtre de la saison, et pour chaque période (début, fin) dont les
+    deux dates sont valides, le début ne suit pas la fin. Chaque colonne
+    n'est convertie qu'une fois, même si elle sert à plusieurs règles.
+    """
+    df = contexte['df']
+    zone = contexte['zone']
+    lignes_zone = contexte['lignes_excel'][zone]
+    debut_saison, fin_saison = (np.datetime64(borne, 'D') for borne in spec['fenetre_dates'])
+
+    dates = {}
+    def convertir(col):
+        if col not in dates:
+            dates[col] = _dates_excel(df[col][zone], date1904)
+        return dates[col]
+
+    verification_colonnes = {}
+    for col in colonnes:
+        if col not in df.columns:
+            verification_colonnes[col] = {'statut': 'ABSENT', 'details': f"Colonne {col} absente"}
+            continue
+        valeurs, invalides = convertir(col)
+        hors_saison = ~np.isnat(valeurs) & ((valeurs < debut_saison) | (valeurs > fin_saison))
+        en_erreur = invalides | hors_saison
+        # Valeur brute d'une cellule invalide, date d'une date hors saison
+        valeurs_erreur = np.where(
+            invalides[en_erreur],
+            df[col][zone].to_numpy(dtype=object)[en_erreur].astype(str),
+            np.char.add(np.datetime_as_string(valeurs[en_erreur], unit='D'), " (hors saison)")
+        )
+        verification = verification_lignes(
+            lignes_zone, en_erreur, valeurs_erreur,
+            f"dates invalides ou hors de la saison {debut_saison} – {fin_saison}"
+        )
+        if verification['statut'] == 'ERREUR':
+            verification['nb_invalides'] = int(invalides.sum())
+            verification['nb_hors_saison'] = int(hors_saison.sum())
+        verification['zone_analysee'] = len(lignes_zone)
+        verification_colonnes[col] = verification
+
+    verification_periodes = {}
+    for debut, fin in periodes:
+        nom = f"{debut}/{fin}"
+        absentes = [col for col in (debut, fin) if col not in df.columns]
+        if absentes:
+            verification_periodes[nom] = {'statut': 'ABSENT', 'details': f"Colonne {', '.join(absentes)} absente"}
+            continue
+        dates_debut, dates_fin = convertir(debut)[0], convertir(fin)[0]
+        # Comparaison fausse dès qu'une des deux dates est NaT : seules les périodes complètes sont contrôlées
+        inversees = dates_debut > dates_fin
+        valeurs_erreur = np.char.add(np.char.add(np.datetime_as_string(dates_debut[inversees], unit='D'), " > "),
+                                     np.datetime_as_string(dates_fin[inversees], unit='D'))
+        verification_periodes[nom] = verification_lignes(lignes_zone, inversees, valeurs_erreur,
+                                                        f"lignes où {debut} est postérieure à {fin}")
+
+    return verification_colonnes, verification_periodes
+
+def _textes_cles(serie, largeur_nombres=0):
+    """
+    Texte normalisé de chaque cellule d'une colonne de clés (sans espaces de
+    bord, None si vide) ; les nombres entiers lus en flottant (3614.0) valent
+    '3614', complétés de zéros à gauche jusqu'à largeur_nombres (un EAN saisi
+    comme nombre perd ses zéros de tête). Les nombres sont convertis en bloc
+    (entiers NumPy), les cellules texte passent seulement par str.strip.
+    """
+    nature = infer_dtype(serie, skipna=True)
+    valeurs = serie.to_numpy(dtype=object)
+    remplies = serie.notna().to_numpy()
+    if nature in NATURES_NUMERIQUES:
+        est_nombre = remplies
+    elif nature == 'string':
+        est_nombre = np.zeros(len(valeurs), dtype=bool)
+    else:
+        est_nombre = remplies & np.fromiter((_CATEGORIES_TYPES.get(type(v)) == _NOMBRE for v in valeurs),
+                                            bool, len(valeurs))
+
+    textes = np.full(len(valeurs), None, dtype=object)
+    if est_nombre.any():
+        nombres = valeurs[est_nombre].astype(float)
+        entiers = np.isfinite(nombres) & (nombres == np.floor(nombres))
+        textes_nombres = np.empty(len(nombres), dtype=object)
+        textes_entiers = list(map(str, nombres[entiers].astype(np.int64).tolist()))
+        if largeur_nombres:
+            textes_entiers = [texte.zfill(largeur_nombres) for texte in textes_entiers]
+        textes_nombres[entiers] = textes_entiers
+        textes_nombres[~entiers] = list(map(str, nombres[~entiers].tolist()))
+        textes[est_nombre] = textes_nombres
+    autres = remplies & ~est_nombre
+    if autres.any():
+        textes[autres] = [str(v).strip() or None for v in valeurs[autres]]
+    return textes
+
+def _indexer_cles(contexte, colonnes, colonnes_ean=()):
+    """
+    Index haché de chaque colonne de clés présente, sur les cellules remplies
+    de la zone utile : valeurs distinctes ('categories') et leur empreinte
+    64 bits ('hachages'), puis pour chaque ligne Excel indexée l'indice de sa
+    valeur ('codes'). Les contrôles de clés travaillent sur ces valeurs
+    distinctes et joignent les empreintes sans comparer les lignes deux à deux.
+    """
+    df = contexte['df']
+    index = {}
+    for col in colonnes:
+        if col not in df.columns:
+            continue
+        textes = _textes_cles(df[col], LONGUEUR_EAN if col in colonnes_ean else 0)
+        remplies = contexte['zone'] & ~pd.isna(textes)
+        codes, categories = pd.factorize(textes[remplies])
+        index[col] = {
+            'categories': categories.tolist(),
+            'hachages': pd.util.hash_array(np.asarray(categories, dtype=object), categorize=False),
+            'codes': codes.astype(np.int32),
+            'lignes': contexte['lignes_excel'][remplies].astype(np.int32)
+        }
+    return index
+
+# Règles évaluables isolément (evaluer_regle), par nom
+REGLES_FEUILLE = {'codes': _verifier_codes, 'colonnes_numeriques': _verifier_numeriques}
+
+def evaluer_regle(df, spec, regle):
+    """
+    Évalue une seule règle d'un onglet (nom de REGLES_FEUILLE) sur son contexte,
+    sans les empreintes, l'index des clés ni les autres règles d'evaluer_feuille
+    """
+    return REGLES_FEUILLE[regle](preparer_contexte(df, spec), spec)
+
+def evaluer_feuille(df, spec, metriques=None, precedent=None, date1904=False):
+    """
+    Évalue toutes les règles ligne à ligne d'un onglet à partir d'un contexte
+    commun (lignes exclues, zone utile, vues normalisées) calculé une seule fois.
+    Avec metriques, la durée de chaque règle est enregistrée. date1904 : les
+    dates de l'onglet sont des numéros de série du calendrier 1904 (propriété
+    date1904 du classeur).
+
+    Avec precedent (résultat de l'onglet lors de la vérification précédente du
+    même fichier), une règle dont les colonnes lues ont la même empreinte est
+    reprise telle quelle. Toutes les règles dépendent de la colonne de
+    référence (zone utile) et du nombre de lignes : s'ils changent, tout est réévalué ;
+    les règles de dates dépendent aussi du calendrier.
+    """
+    with mesurer(metriques, f"{spec['cle']}.empreintes"):
+        empreintes = empreintes_colonnes(df)
+
+    anciennes = (precedent or {}).get('empreintes_colonnes')
+    reference = spec['colonne_reference']
+    zone_inchangee = (anciennes is not None and precedent.get('nb_lignes') == len(df)
+                      and empreintes.get(reference) == anciennes.get(reference))
+
+    def inchangee(colonne):
+        return zone_inchangee and empreintes.get(colonne) == anciennes.get(colonne)
+
+    regles_reprises = []
+    verification_codes = None
+    if inchangee(reference) and spec['cle_codes'] in precedent:
+        verification_codes = precedent[spec['cle_codes']]
+        regles_reprises.append(reference)
+    verification_numeriques = {}
+    for col in spec['colonnes_numeriques']:
+        if inchangee(col) and col in precedent.get('colonnes_numeriques', {}):
+            verification_numeriques[col] = precedent['colonnes_numeriques'][col]
+            regles_reprises.append(col)
+    a_evaluer = [col for col in spec['colonnes_numeriques'] if col not in verification_numeriques]
+    # Index des clés toujours recalculé : il n'est pas conservé avec le résultat (volumineux)
+    index_cles = {}
+    a_indexer = [col for col in spec.get('colonnes_cles', []) if col in df.columns]
+    calendrier_inchange = precedent is not None and precedent.get('date1904', False) == date1904
+    verification_dates = {}
+    for col in spec.get('colonnes_dates', []):
+        if calendrier_inchange and inchangee(col) and col in precedent.get('colonnes_dates', {}):
+            verification_dates[col] = precedent['colonnes_dates'][col]
+            regles_reprises.append(col)
+    verification_periodes = {}
+    for debut, fin in spec.get('periodes', []):
+        nom = f"{debut}/{fin}"
+        if calendrier_inchange and inchangee(debut) and inchangee(fin) and nom in precedent.get('periodes', {}):
+            verification_periodes[nom] = precedent['periodes'][nom]
+    dates_a_evaluer = [col for col in spec.get('colonnes_dates', []) if col not in verification_dates]
+    periodes_a_evaluer = [(debut, fin) for debut, fin in spec.get('periodes', [])
+                          if f"{debut}/{fin}" not in verification_periodes]
+
+    if verification_codes is None or a_evaluer or a_indexer or dates_a_evaluer or periodes_a_evaluer:
+        with mesurer(metriques, f"{spec['cle']}.contexte"):
+            contexte = preparer_contexte(df, spec)
+    if verification_codes is None:
+        with mesurer(metriques, f"{spec['cle']}.{spec['cle_codes']}"):
+            verification_codes = _verifier_codes(contexte, spec)
+    if a_evaluer:
+        with mesurer(metriques, f"{spec['cle']}.colonnes_numeriques"):
+            verification_numeriques.update(_verifier_numeriques(contexte, {**spec, 'colonnes_numeriques': a_evaluer}))
+    if a_indexer:
+        with mesurer(metriques, f"{spec['cle']}.index_cles"):
+            index_cles.update(_indexer_cles(contexte, a_indexer, spec.get('colonnes_ean', [])))
+    if dates_a_evaluer or periodes_a_evaluer:
+        with mesurer(metriques, f"{spec['cle']}.dates"):
+            colonnes_dates, periodes = _verifier_dates(contexte, spec, dates_a_evaluer, periodes_a_evaluer, date1904)
+        verification_dates.update(colonnes_dates)
+        verification_periodes.update(periodes)
+
+    return {
+        spec['cle_codes']: verification_codes,
+        'colonnes_numeriques': {col: verification_numeriques[col] for col in spec['colonnes_numeriques']},
+        'colonnes_dates': {col: verification_dates[col] for col in spec.get('colonnes_dates', [])},
+        'periodes': {f"{debut}/{fin}": verification_periodes[f"{debut}/{fin}"] for debut, fin in spec.get('periodes', [])},
+        # Calendrier des dates lues (les règles de dates ne sont reprises que pour le même)
+        'date1904': date1904,
+        # Index haché des colonnes de clés présentes (contrôles référentiels, voir references), retiré
+        # du résultat une fois ceux-ci faits (traitement)
+        'index_cles': index_cles,
+        'empreintes_colonnes': empreintes,
+        # Colonnes dont le résultat est repris de la vérification précédente
+        'regles_reprises': regles_reprises
+    }
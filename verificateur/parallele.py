@@ -0,0 +1,129 @@
+"""Vérification d'un lot de fichiers dans un pool de processus"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from .admission import BUDGET_MEMOIRE, ControleAdmission, estimer_memoire
+from .traitement import traiter_fichier
+
+# Nombre de processus du pool (par défaut : un par cœur)
+NB_PROCESSUS = int(os.environ.get("VERIFICATEUR_NB_PROCESSUS", os.cpu_count() or 1))
+
+def creer_pool(nb_processus=None):
+    """
+    Crée un pool de processus pour les vérifications. Le contexte "spawn" évite
+    de dupliquer par fork les threads du serveur Streamlit dans les workers.
+    """
+    return ProcessPoolExecutor(
+        max_workers=nb_processus or NB_PROCESSUS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+def _future_terminee(resultat):
+    future = Future()
+    future.set_result(resultat)
+    return future
+
+def _completer_metriques(resultat, estimation, attente):
+    """Copie du résultat dont les métriques comparent le pic de mémoire estimé au pic mesuré"""
+    return {
+        **resultat,
+        'metriques': {**resultat.get('metriques', {}), 'memoire_estimee': estimation, 'attente_admission': attente}
+    }
+
+def verifier_lot(fichiers, fonction_verification=traiter_fichier, pool=None, nb_processus=None, cache=None,
+                 historique=None, budget_memoire=BUDGET_MEMOIRE, proprietaire=None):
+    """
+    Soumet chaque fichier (nom, contenu) au pool et produit les couples
+    (index, future) au fur et à mesure que les fichiers sont terminés.
+    L'index permet de restituer les résultats dans l'ordre d'upload.
+    Avec un cache, les fichiers déjà vérifiés sont restitués immédiatement
+    et seuls les autres sont envoyés au pool. Avec un historique, chaque
+    worker reçoit la vérification précédente du même nom de fichier par le
+    même proprietaire (seules les colonnes modifiées sont revérifiées) et
+    chaque résultat est complété de son évolution ('comparaison' : erreurs
+    corrigées et nouvelles).
+    Avec un budget mémoire (octets, None pour ne pas limiter), un fichier
+    n'est soumis au pool que si son pic estimé tient dans le budget avec les
+    fichiers en cours ; les autres attendent, dans l'ordre d'upload. Les
+    métriques de chaque résultat indiquent l'estimation et l'attente.
+    """
+    a_soumettre = []
+    cles = {}
+    cles_historique = {}
+    for i, (nom, contenu) in enumerate(fichiers):
+        if historique is not None:
+            cles_historique[i] = historique.cle(nom, fonction_verification.__name__, proprietaire)
+        if cache is not None:
+            cles[i] = cache.cle(contenu, fonction_verification.__name__)
+            resultat = cache.obtenir(cles[i], nom)
+            if resultat is not None:
+                if historique is not None:
+                    resultat = historique.comparer_et_enregistrer(cles_historique[i], resultat)
+                yield i, _future_terminee(resultat)
+                continue
+        a_soumettre.append(i)
+
+    if not a_soumettre:
+        return
+
+    pool_local = pool is None
+    if pool_local:
+        pool = creer_pool(nb_processus)
+
+    def soumettre(i):
+        if historique is None:
+            return pool.submit(fonction_verification, *fichiers[i])
+        return pool.submit(fonction_verification, *fichiers[i], historique.precedent(cles_historique[i]))
+
+    admission = ControleAdmission(budget_memoire) if budget_memoire else None
+    en_attente = deque(a_soumettre)
+    estimations = {}
+    soumissions = {}
+    en_cours = {}
+
+    def admettre():
+        """Soumet les fichiers en attente, dans l'ordre, tant que le budget le permet"""
+        while en_attente:
+            i = en_attente[0]
+            if admission is not None:
+                if i not in estimations:
+                    estimations[i] = estimer_memoire(fichiers[i][1], fonction_verification.__name__)
+                if not admission.admissible(estimations[i]):
+                    return
+                admission.admettre(estimations[i])
+            en_attente.popleft()
+            soumissions[i] = time.monotonic()
+            en_cours[soumettre(i)] = i
+
+    debut = time.monotonic()
+    try:
+        admettre()
+        while en_cours:
+            terminees, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for future in terminees:
+                if admission is not None:
+                    admission.liberer(estimations[en_cours[future]])
+            # Fichiers suivants soumis avant de restituer les résultats : le pool ne reste pas inactif
+            admettre()
+            for future in terminees:
+                i = en_cours.pop(future)
+                if future.exception() is None:
+                    if admission is not None:
+                        future = _future_terminee(_completer_metriques(future.result(), estimations[i],
+                                                                       soumissions[i] - debut))
+                    if cache is not None:
+                        cache.enregistrer(cles[i], future.result())
+                    if historique is not None:
+                        # Nouvelle future : le résultat mis en cache reste sans comparaison
+                        future = _future_terminee(historique.comparer_et_enregistrer(cles_historique[i], future.result()))
+                yield i, future
+    finally:
+        # Lot interrompu : les fichiers pas encore démarrés sont abandonnés
+        for future in en_cours:
+            future.cancel()
+        if pool_local:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,41 @@
+"""Ensembles de lignes Excel stockés en plages contiguës (ex: 12–4 500, 4 510)"""
+
+import numpy as np
+
+# Plages affichées au plus dans les détails, l'interface et le rapport texte
+LIMITE_PLAGES = 20
+
+def encoder_plages(lignes):
+    """Plages [début, fin] (bornes incluses) de numéros de ligne triés, en tableau NumPy (k, 2)"""
+    lignes = np.asarray(lignes, dtype=np.int32)
+    if not len(lignes):
+        return np.empty((0, 2), dtype=np.int32)
+    ruptures = np.flatnonzero(np.diff(lignes) != 1)
+    debuts = np.concatenate([lignes[:1], lignes[ruptures + 1]])
+    fins = np.concatenate([lignes[ruptures], lignes[-1:]])
+    return np.column_stack([debuts, fins])
+
+def nb_lignes_plages(plages):
+    """Nombre de lignes couvertes par les plages"""
+    plages = np.asarray(plages).reshape(-1, 2)
+    return int((plages[:, 1] - plages[:, 0] + 1).sum())
+
+def developper_plages(plages):
+    """Liste complète des lignes (à réserver aux exports : peut être très longue)"""
+    plages = np.asarray(plages, dtype=np.int64).reshape(-1, 2)
+    longueurs = plages[:, 1] - plages[:, 0] + 1
+    decalages = np.arange(longueurs.sum()) - np.repeat(np.cumsum(longueurs) - longueurs, longueurs)
+    return np.repeat(plages[:, 0], longueurs) + decalages
+
+def _nombre(n):
+    # Séparateur de milliers : espace fine insécable
+    return f"{n:,}".replace(",", " ")
+
+def formater_plages(plages, limite=LIMITE_PLAGES):
+    """Résumé lisible et borné des plages : "12–4 500, 4 510, … (+N plages)" """
+    plages = np.asarray(plages).reshape(-1, 2)
+    morceaux = [_nombre(debut) if debut == fin else f"{_nombre(debut)}–{_nombre(fin)}"
+                for debut, fin in plages[:limite].tolist()]
+    if len(plages) > limite:
+        morceaux.append(f"… (+{len(plages) - limite} plages)")
+    return ", ".join(morceaux)
@@ -0,0 +1,127 @@
+"""Rapport texte téléchargeable d'un lot de fichiers vérifiés"""
+
+from datetime import datetime
+
+from .export import CONTROLES_COLONNES
+from .plages import formater_plages
+from .regles import SPECS_FEUILLES
+from .traitement import feuille_en_erreur
+
+def _lignes_erreurs(resultat):
+    """Résumé borné des vérifications en erreur de chaque onglet (plages de lignes abrégées)"""
+    for spec in SPECS_FEUILLES:
+        feuille = resultat.get(spec['cle'])
+        if feuille is None:
+            continue
+        prefixe = f"  {spec['nom_feuille']} - "
+        if 'erreur' in feuille:
+            yield f"{prefixe}{feuille['erreur']}\n"
+            continue
+        if feuille['colonnes_dupliquees_brutes']['statut'] == 'ERREUR':
+            yield f"{prefixe}Colonnes dupliquées: {feuille['colonnes_dupliquees_brutes']['details']}\n"
+        if feuille['colonnes']['statut'] == 'ERREUR':
+            yield f"{prefixe}Colonnes manquantes: {', '.join(feuille['colonnes']['colonnes_manquantes'])}\n"
+            for colonne, approchantes in feuille['colonnes'].get('colonnes_approchantes', {}).items():
+                yield f"{prefixe}  {colonne} présente sous la forme {', '.join(repr(nom) for nom in approchantes)}\n"
+        codes = feuille.get(spec['cle_codes'], {})
+        if codes.get('statut') == 'ERREUR':
+            yield f"{prefixe}{spec['colonne_reference']}: {codes['details']}\n"
+        for colonne, verification in feuille.get('colonnes_numeriques', {}).items():
+            if verification['statut'] == 'ERREUR':
+                yield (f"{prefixe}{colonne}: {verification['nb_erreurs']} valeurs non numériques "
+                       f"(lignes Excel: {formater_plages(verification['plages_erreur'])})\n")
+        for cle_verification in CONTROLES_COLONNES:
+            for colonne, verification in feuille.get(cle_verification, {}).items():
+                if verification['statut'] == 'ERREUR':
+                    yield f"{prefixe}{colonne}: {verification['details']}\n"
+        for colonne, verification in feuille.get('doublons_lot', {}).items():
+            if verification['statut'] == 'ERREUR':
+                yield f"{prefixe}{colonne}: {verification['details']}\n"
+                fichiers = ", ".join(f"{nom} ({nb} valeurs)" for nom, nb in verification['fichiers_concernes'].items())
+                yield f"{prefixe}  valeurs partagées avec {fichiers}\n"
+
+def _lignes_metriques(metriques):
+    """Durée (et pic mémoire si mesuré) de chaque étape de la vérification d'un fichier"""
+    yield "Métriques:\n"
+    for etape, mesure in metriques['etapes'].items():
+        pic = f"{mesure['pic_memoire'] / 1024 / 1024:>10.1f} Mo" if 'pic_memoire' in mesure else ""
+        yield f"  {etape:<35}{mesure['duree']:>10.3f} s{pic}\n"
+    if 'memoire_estimee' in metriques:
+        mesure = f"{metriques['pic_processus'] / 1024 / 1024:.1f} Mo" if 'pic_processus' in metriques else "non mesuré"
+        yield (f"  Pic mémoire estimé {metriques['memoire_estimee'] / 1024 / 1024:.1f} Mo, mesuré {mesure} "
+               f"(attente d'admission {metriques['attente_admission']:.1f} s)\n")
+
+def _texte_comparaison(comparaison):
+    return f"{comparaison['corrigees']} erreurs corrigées, {comparaison['nouvelles']} nouvelles"
+
+def _nb_erreurs_feuille(feuille, spec):
+    """Nombre d'anomalies d'un onglet : doublons, colonnes manquantes, lignes en erreur"""
+    nb_erreurs = feuille['colonnes_dupliquees_brutes'].get('nb_duplicatas', 0)
+    nb_erreurs += feuille['colonnes']['nb_colonnes_manquantes']
+    codes = feuille.get(spec['cle_codes'], {})
+    nb_erreurs += codes.get('nb_vides', 0) + codes.get('nb_invalides', 0)
+    nb_erreurs += sum(v['nb_erreurs'] for v in feuille.get('colonnes_numeriques', {}).values())
+    for cle_verification in CONTROLES_COLONNES:
+        nb_erreurs += sum(v.get('nb_erreurs', 0) for v in feuille.get(cle_verification, {}).values())
+    nb_erreurs += sum(v['nb_erreurs'] for v in feuille.get('doublons_lot', {}).values())
+    return nb_erreurs
+
+def construire_synthese(tous_resultats):
+    """
+    Une ligne par fichier (statut et nombre d'anomalies de chaque onglet, durée)
+    pour le tableau de synthèse ; 'index' est la position dans tous_resultats
+    """
+    synthese = []
+    for i, resultat in enumerate(tous_resultats):
+        ligne = {
+            'index': i,
+            'Fichier': resultat['nom_fichier'],
+            'Statut': '✅ CONFORME' if resultat['statut_global'] == 'OK' else '❌ NON CONFORME'
+        }
+        for spec in SPECS_FEUILLES:
+            feuille = resultat.get(spec['cle'])
+            if feuille is None:
+                statut, nb_erreurs = '—', None
+            elif 'erreur' in feuille:
+                statut, nb_erreurs = '🔴 Illisible', None
+            else:
+                nb_erreurs = _nb_erreurs_feuille(feuille, spec)
+                statut = '❌' if feuille_en_erreur(feuille) else '✅'
+            ligne[spec['nom_feuille']] = statut
+            ligne[f"Erreurs {spec['nom_feuille']}"] = nb_erreurs
+            ligne[f"Lignes {spec['nom_feuille']}"] = (feuille or {}).get('nb_lignes')
+        ligne['Évolution'] = _texte_comparaison(resultat['comparaison']) if 'comparaison' in resultat else None
+        ligne['Durée (s)'] = resultat.get('metriques', {}).get('etapes', {}).get('total', {}).get('duree')
+        synthese.append(ligne)
+    return synthese
+
+def construire_rapport(tous_resultats, horodatage=None):
+    """
+    Construit le rapport texte (résumé global puis statut de chaque fichier) ;
+    les morceaux sont assemblés en une seule fois à la fin
+    """
+    horodatage = horodatage or datetime.now()
+    total_fichiers = len(tous_resultats)
+    fichiers_ok = sum(1 for r in tous_resultats if r['statut_global'] == 'OK')
+    fichiers_erreur = total_fichiers - fichiers_ok
+
+    morceaux = [
+        f"RAPPORT DE VÉRIFICATION - {horodatage.strftime('%Y-%m-%d %H:%M:%S')}\n",
+        "=" * 80 + "\n\n",
+        "RÉSUMÉ GLOBAL\n",
+        f"Total fichiers traités: {total_fichiers}\n",
+        f"Fichiers conformes: {fichiers_ok}\n",
+        f"Fichiers avec erreurs: {fichiers_erreur}\n\n"
+    ]
+
+    for resultat in tous_resultats:
+        morceaux.append(f"FICHIER: {resultat['nom_fichier']}\n")
+        morceaux.append(f"Statut: {'CONFORME' if resultat['statut_global'] == 'OK' else 'NON CONFORME'}\n")
+        if 'comparaison' in resultat:
+            morceaux.append(f"Depuis la vérification précédente: {_texte_comparaison(resultat['comparaison'])}\n")
+        morceaux.extend(_lignes_erreurs(resultat))
+        if 'metriques' in resultat:
+            morceaux.extend(_lignes_metriques(resultat['metriques']))
+        morceaux.append("-" * 60 + "\n\n")
+
+    return "".join(morceaux)
@@ -0,0 +1,208 @@
+"""Intégrité référentielle par index de clés hachées : lignes Promo orphelines et clés partagées entre fichiers d'un lot"""
+
+import numpy as np
+import pandas as pd
+
+from .cles import verification_index
+from .moteur import LIMITE_VALEURS_INVALIDES
+from .plages import developper_plages, encoder_plages
+from .regles import COLONNES_UNIQUES_LOT, SPEC_REFERENTIEL
+
+def verifier_references(feuille, feuille_referencee, colonnes, nom_feuille_referencee):
+    """
+    Lignes de l'onglet dont la clé (REFCOL, CODEPSS...) n'existe pas dans
+    l'onglet référencé du même fichier, par jointure des empreintes de valeurs
+    distinctes de leurs index : {colonne: vérification}
+    """
+    index = feuille.get('index_cles', {})
+    if feuille_referencee is None or 'erreur' in feuille_referencee:
+        return {col: {'statut': 'ABSENT', 'details': f"Onglet {nom_feuille_referencee} illisible"} for col in colonnes}
+    index_reference = feuille_referencee.get('index_cles', {})
+
+    resultats = {}
+    for col in colonnes:
+        if col not in index:
+            resultats[col] = {'statut': 'ABSENT', 'details': f"Colonne {col} absente"}
+        elif col not in index_reference:
+            resultats[col] = {'statut': 'ABSENT', 'details': f"Colonne {col} absente de l'onglet {nom_feuille_referencee}"}
+        else:
+            # Jointure par table de hachage (pandas) : linéaire en nombre de valeurs distinctes
+            orphelines = ~pd.Index(index[col]['hachages']).isin(index_reference[col]['hachages'])
+            resultats[col] = verification_index(index[col], orphelines,
+                                                 f"lignes dont la valeur est absente de l'onglet {nom_feuille_referencee}")
+    return resultats
+
+def extraire_cles_lot(feuille, colonnes=COLONNES_UNIQUES_LOT):
+    """
+    Clés du Référentiel contrôlées entre les fichiers d'un lot (REFCOL, EAN),
+    extraites de son index pour être conservées avec le résultat à sa place :
+    par colonne, valeurs distinctes, lignes Excel en plages et indice de la
+    valeur de chaque ligne (None quand chaque ligne a sa propre valeur, cas
+    d'une clé unique). Les empreintes sont recalculées par IndexLot.
+    """
+    if feuille is None or 'erreur' in feuille:
+        return {}
+    cles = {}
+    for col in colonnes:
+        index = feuille.get('index_cles', {}).get(col)
+        if index is None:
+            continue
+        codes = index['codes']
+        sans_repetition = len(codes) == len(index['categories'])
+        cles[col] = {
+            'categories': index['categories'],
+            'codes': None if sans_repetition else codes,
+            'plages': encoder_plages(index['lignes'])
+        }
+    return cles
+
+def _index_cles_lot(cles):
+    """Index haché (voir moteur._indexer_cles) d'une colonne de cles_lot"""
+    categories = cles['categories']
+    codes = cles['codes']
+    return {
+        'categories': categories,
+        'hachages': pd.util.hash_array(np.asarray(categories, dtype=object), categorize=False),
+        'codes': np.arange(len(categories), dtype=np.int32) if codes is None else codes,
+        'lignes': developper_plages(cles['plages']).astype(np.int32)
+    }
+
+class IndexLot:
+    """
+    Clés du Référentiel (REFCOL, EAN) de chaque fichier d'un lot ('cles_lot'
+    des résultats), ajoutées au fil des résultats : seules les clés sont
+    conservées, pas les résultats. doublons() repère en une passe np.unique
+    sur toutes les empreintes du lot les valeurs déclarées dans plusieurs fichiers.
+    """
+
+    def __init__(self, colonnes=COLONNES_UNIQUES_LOT):
+        self.colonnes = colonnes
+        self.noms_fichiers = []
+        self._index = []
+
+    def ajouter(self, resultat):
+        """Ajoute les clés du lot d'un résultat (aucune si le Référentiel est illisible) ; retourne sa position"""
+        return self.ajouter_cles(resultat['nom_fichier'], resultat.get('cles_lot'))
+
+    def ajouter_cles(self, nom_fichier, cles):
+        """Ajoute les clés du lot (cles_lot d'un résultat, ou None) d'un fichier ; retourne sa position"""
+        cles = cles or {}
+        self.noms_fichiers.append(nom_fichier)
+        self._index.append({col: _index_cles_lot(cles[col]) for col in self.colonnes if col in cles})
+        return len(self._index) - 1
+
+    def doublons(self):
+        """
+        Pour chaque fichier ajouté (dans l'ordre d'ajout), {colonne: vérification}
+        de ses lignes dont la clé est aussi déclarée dans un autre fichier du lot.
+        'fichiers_concernes' compte les valeurs partagées avec chaque autre
+        fichier, 'autres_fichiers' donne les fichiers de chaque valeur d'exemple.
+        """
+        resultats = [{} for _ in self._index]
+        for col in self.colonnes:
+            positions = [i for i, index in enumerate(self._index) if col in index]
+            if len(positions) < 2:
+                continue
+            # Valeurs distinctes par fichier : une empreinte présente plusieurs fois l'est dans plusieurs fichiers
+            tailles = [len(self._index[i][col]['hachages']) for i in positions]
+            debuts = np.cumsum(tailles) - tailles
+            hachages = np.concatenate([self._index[i][col]['hachages'] for i in positions])
+            fichiers = np.repeat(positions, tailles)
+            codes_valeurs, valeurs = pd.factorize(hachages)
+            nb_fichiers = np.bincount(codes_valeurs, minlength=len(valeurs))
+            partagees = nb_fichiers[codes_valeurs] > 1
+
+            # Occurrences des valeurs partagées, regroupées par valeur
+            membres = np.flatnonzero(partagees)
+            membres = membres[np.argsort(codes_valeurs[membres], kind='stable')]
+            valeurs_membres = codes_valeurs[membres]
+            debuts_groupes = np.flatnonzero(np.r_[True, np.diff(valeurs_membres) != 0]) if len(membres) else membres
+            fins_groupes = np.r_[debuts_groupes[1:], len(membres)]
+
+            # Valeurs partagées par fichier pris deux à deux, comptées de façon creuse : seules existent
+            # les paires (i, j) de fichiers qui partagent des valeurs, clé i * nb_fichiers + j triée. Les
+            # valeurs déclarées dans le même ensemble de fichiers (signature : somme des empreintes des
+            # fichiers) sont comptées ensemble : les paires d'un ensemble distinct, pas d'une valeur
+            nb_fichiers_lot = len(self._index)
+            cles_paires = np.empty(0, dtype=np.int64)
+            poids_paires = np.empty(0, dtype=np.int64)
+            if len(membres):
+                empreintes_fichiers = pd.util.hash_array(np.arange(nb_fichiers_lot))
+                signatures = np.add.reduceat(empreintes_fichiers[fichiers[membres]], debuts_groupes)
+                ensembles = pd.factorize(signatures)[0]
+                _, representants, poids = np.unique(ensembles, return_index=True, return_counts=True)
+                paires = []
+                poids_groupes = []
+                for groupe, nb_valeurs in zip(representants.tolist(), poids.tolist()):
+                    fichiers_groupe = fichiers[membres[debuts_groupes[groupe]:fins_groupes[groupe]]].astype(np.int64)
+                    premiers = np.repeat(fichiers_groupe, len(fichiers_groupe))
+                    seconds = np.tile(fichiers_groupe, len(fichiers_groupe))
+                    distincts = premiers != seconds
+                    paires.append(premiers[distincts] * nb_fichiers_lot + seconds[distincts])
+                    poids_groupes.append(np.full(int(distincts.sum()), nb_valeurs, dtype=np.int64))
+                cles_paires, inverse = np.unique(np.concatenate(paires), return_inverse=True)
+                poids_paires = np.bincount(inverse, weights=np.concatenate(poids_groupes)).astype(np.int64)
+
+            for i, debut, taille in zip(positions, debuts.tolist(), tailles):
+                index = self._index[i][col]
+                partagees_fichier = partagees[debut:debut + taille]
+                verification = verification_index(index, partagees_fichier,
+                                                    "lignes dont la valeur est aussi déclarée dans un autre fichier du lot")
+                if verification['statut'] == 'ERREUR':
+                    debut_paires, fin_paires = np.searchsorted(cles_paires, [i * nb_fichiers_lot, (i + 1) * nb_fichiers_lot])
+                    verification['fichiers_concernes'] = {
+                        self.noms_fichiers[j]: nb_valeurs for j, nb_valeurs in
+                        zip((cles_paires[debut_paires:fin_paires] % nb_fichiers_lot).tolist(),
+                            poids_paires[debut_paires:fin_paires].tolist())
+                    }
+                    # Fichiers de chaque valeur d'exemple (premières valeurs partagées, dans l'ordre des lignes)
+                    autres_fichiers = {}
+                    codes_lignes = index['codes'][partagees_fichier[index['codes']]]
+                    for categorie in pd.unique(codes_lignes)[:LIMITE_VALEURS_INVALIDES].tolist():
+                        code = codes_valeurs[debut + categorie]
+                        groupe = membres[np.searchsorted(valeurs_membres, code):np.searchsorted(valeurs_membres, code, 'right')]
+                        autres_fichiers[index['categories'][categorie]] = [
+                            self.noms_fichiers[j] for j in fichiers[groupe].tolist() if j != i
+                        ]
+                    verification['autres_fichiers'] = autres_fichiers
+                resultats[i][col] = verification
+        return resultats
+
+def ajouter_doublons_lot(resultat, doublons):
+    """
+    Copie d'un résultat dont l'onglet Référentiel est complété des clés
+    partagées avec d'autres fichiers (doublons, élément de IndexLot.doublons)
+    sous 'doublons_lot' ; le fichier devient non conforme si l'une est en erreur
+    """
+    if not doublons:
+        return resultat
+    en_erreur = any(v['statut'] == 'ERREUR' for v in doublons.values())
+    return {
+        **resultat,
+        SPEC_REFERENTIEL['cle']: {**resultat[SPEC_REFERENTIEL['cle']], 'doublons_lot': doublons},
+        'statut_global': 'ERREUR' if en_erreur else resultat['statut_global']
+    }
+
+def annoter_doublons_lot(tous_resultats):
+    """
+    Copie des résultats d'un lot dont l'onglet Référentiel est complété des
+    clés partagées avec d'autres fichiers ('doublons_lot') ; un fichier
+    concerné devient non conforme
+    """
+    index_lot = IndexLot()
+    for resultat in tous_resultats:
+        index_lot.ajouter(resultat)
+    return [ajouter_doublons_lot(resultat, doublons) for resultat, doublons in zip(tous_resultats, index_lot.doublons())]
+
+def sans_index_cles(resultat):
+    """
+    Copie d'un résultat sans les clés du lot ('cles_lot', utiles seulement
+    aux contrôles entre fichiers) ni, pour un résultat d'une version
+    antérieure, les index de clés de ses onglets : ce qui est enregistré
+    pour l'interface et les exports
+    """
+    return {
+        cle: {k: v for k, v in valeur.items() if k != 'index_cles'} if isinstance(valeur, dict) and 'index_cles' in valeur
+        else valeur
+        for cle, valeur in resultat.items() if cle != 'cles_lot'
+    }
@@ -0,0 +1,117 @@
+"""Règles de conformité des fichiers de plan de lignes (colonnes attendues par onglet)"""
+
+import datetime
+import hashlib
+import json
+import os
+
+# ✅ Configuration des colonnes obligatoires
+COLONNES_REFERENTIEL = [
+    "STATUTARTICLE", "DTR/NDTR", "CODECOLOR", "LIBCOLORFR", "LIBCOLOREN", "REFCOL", "REFCOLCLIENT", "IFLS", "EAN",
+    "NBREF", "NBREFCO", "LIGNEDEPRODUIT", "TYPEPIECE/DIMENSION", "PACKAGING/MERCH", "COMPOSITION", "RECONDUIT/NOUVEAU",
+    "IDB", "LIBZONEIMPLANTNAT", "COMMENTAIRESASSISTANT", "CODEIMPLANTNAT", "TYPODEMISAISON1", "TYPODEMISAISON2",
+    "NBMAGDEMISAISON1", "NBMAGDEMISAISON2", "DEBUTVIE1", "FINVIE1", "DEBUTVIE2", "FINVIE2", "REFFRN", "LIBFRN",
+    "CODEFRN", "BUREAUGS", "ORIGINEPRODUIT", "CODEREGROUPEMENT", "LIBREGROUPEMENT", "PABRUT", "DEVISE", "INCOTERM",
+    "CYCFS", "TAUX$", "COEFAPPROCHE", "TXREMISESGLOGALES", "PCLSANSTAXE", "ROYALTIES", "TAXEDEEE", "NOMCP",
+    "TAXEECO", "TAXEBOIS", "PCMFDR", "PVFORTTTCFDR", "TXMARGEIN", "ROYALTIESPROMO", "PCMPROMO", "PVPROMO",
+    "NUMPACKING", "FLUXIMPLANT", "FLUXREASSORT", "FLUXPROMO", "NBREUNITESPARLOT", "CODECLIENT", "PVUNITAIRE",
+    "PRESENCECATALOGUE", "PRESENCEPICKING", "RECAPTAILLES", "GRILLETAILLE"
+] + [f"TAILLE{i}" for i in range(1, 40)] + [
+    "COLLECTIONPSS", "PCBIMPLANT", "PCBPROMO", "PCBMASTERPICKING", "SPCBINNERPICKING", "CODEPACKINGIMPLANT",
+    "CODEPACKINGREASSORT", "DATEOKBUYER", "DATEMAA", "CIRCUITDACHAT", "CODEBCOLL", "DATERELECTUREPSS",
+    "CODEGFAMNAT", "LIBGFAMNAT", "VOLUMEIMPLANT", "CODEFAMNAT", "VOLUMEPICKING", "LIBFAMNAT", "CODESFAMNAT",
+    "LIBSFAMNAT", "VOLUMEPROMO", "VOLUMETOTAL", "CODESFAMINT", "NUMBOX", "CODEPSS", "LIBPRODUITFR", "LIBPRODUITEN",
+    "LIBELLECOURTPRODUITFR", "LIBELLECAISSEPRODUITFR", "CIBLE", "SAISON", "QUADRYPTIQUE", "MARQUE",
+    "TEX RESPONSABLE", "PERSONNAGE", "FRANCHISE"
+]
+
+COLONNES_PROMO = [
+    "STATUTARTICLE", "COMMENTAIRE", "REFCOL", "CLIENT", "NOMCATA", "CPRO", "GRFAMILLE", "NUMEROCATA",
+    "DEBUTCATA", "FINCATA", "NUMDISPLAY", "LIGNEDEPRODUIT", "CODEPSS", "LIBPRODUITFR", "MARQUE", "COLORIS",
+    "COLORISPSS", "PVFORTTTCFDR", "LIBELLEUB", "NUMPAGEDEf", "NUMUBDEF", "EANMAITRE", "LIBELLEPUB", "LOGO",
+    "LEGENDE", "EXISTEAUSSI", "PLUSPRODUIT", "MISEENPAGE", "UNITEDEVENTE", "TYPODEMISAISON1", "TYPODEMISAISON2",
+    "PCBPROMO", "PCBMASTERPICKING", "SPCBINNERPICKING", "RECONDUIT/NOUVEAU", "TOPUB", "PHARE", "MECACATA1",
+    "MAXXING", "PHOTOCATA1", "MEA_CATA", "VITESSECATA1", "POSCATA1", "REMISEPROMO", "PCMCATA1", "PVCATA1",
+    "PVPROMOASAISIR", "TXREMISECATA1", "MARGECATAVAL", "MARGECATA%", "QTEESTOTALES", "VALEURVENTECATA",
+    "ESTITXREVENTECATA1", "ESTIVOLUMEVENTECATA1", "ESTICACATA1", "RECEPTIONECH"
+]
+
+COLONNES_NUMERIQUES = ["PCBMASTERPICKING", "SPCBINNERPICKING", "PCBPROMO", "PCBIMPLANT"]
+# Colonnes numériques pour l'onglet Promo (sans PCBIMPLANT)
+COLONNES_NUMERIQUES_PROMO = ["PCBMASTERPICKING", "SPCBINNERPICKING", "PCBPROMO"]
+
+# Codes autorisés dans CODECLIENT (Référentiel) et CLIENT (Promo)
+CODES_CLIENTS_AUTORISES = ["FRCA", "FRCH"]
+
+# Colonnes de Promo dont chaque valeur doit exister dans le Référentiel du même fichier
+COLONNES_REFERENCES_PROMO = ["REFCOL", "CODEPSS"]
+# Clés du Référentiel qui ne doivent être déclarées que dans un seul fichier d'un lot
+COLONNES_UNIQUES_LOT = ["REFCOL", "EAN"]
+
+# Codes EAN-13 (clé de contrôle vérifiée) et clés uniques dans l'onglet Référentiel
+COLONNES_EAN_REFERENTIEL = ["EAN"]
+COLONNES_EAN_PROMO = ["EANMAITRE"]
+COLONNES_UNIQUES_REFERENTIEL = ["REFCOL", "IFLS", "EAN"]
+
+# Colonnes de dates (numéros de série Excel) et périodes (début, fin) dont le début ne doit pas suivre la fin
+COLONNES_DATES_REFERENTIEL = ["DEBUTVIE1", "FINVIE1", "DEBUTVIE2", "FINVIE2", "DATEOKBUYER", "DATEMAA"]
+PERIODES_REFERENTIEL = [("DEBUTVIE1", "FINVIE1"), ("DEBUTVIE2", "FINVIE2")]
+COLONNES_DATES_PROMO = ["DEBUTCATA", "FINCATA"]
+PERIODES_PROMO = [("DEBUTCATA", "FINCATA")]
+
+# Fenêtre de la saison (AAAA-MM-JJ, bornes incluses) hors de laquelle une date est signalée. Par défaut,
+# du 1er janvier de l'année précédente au 31 décembre dans deux ans (articles reconduits, saisons préparées
+# à l'avance) : une date saisie sur le mauvais siècle ou en 1900 (série 0/1) est signalée. Calculée au
+# démarrage ; à resserrer pour chaque saison (ex: VERIFICATEUR_SAISON_DEBUT=2026-01-01)
+_ANNEE_EN_COURS = datetime.date.today().year
+FENETRE_SAISON = [os.environ.get("VERIFICATEUR_SAISON_DEBUT", f"{_ANNEE_EN_COURS - 1}-01-01"),
+                  os.environ.get("VERIFICATEUR_SAISON_FIN", f"{_ANNEE_EN_COURS + 2}-12-31")]
+
+# Lignes Excel ignorées par les vérifications ligne à ligne (sous-titres du modèle)
+LIGNES_EXCLUES_EXCEL = [2, 3, 4, 5, 6]
+
+# Spécification déclarative des règles de chaque onglet, évaluées par le moteur
+SPEC_REFERENTIEL = {
+    'cle': 'referentiel',
+    'nom_feuille': "Référentiel",
+    'colonnes_obligatoires': COLONNES_REFERENTIEL,
+    'colonne_reference': "CODECLIENT",
+    'cle_codes': 'codeclient',
+    'codes_autorises': CODES_CLIENTS_AUTORISES,
+    'colonnes_numeriques': COLONNES_NUMERIQUES,
+    # Colonnes indexées (empreintes des valeurs) pour les contrôles de clés : EAN, unicité, références
+    'colonnes_cles': list(dict.fromkeys(COLONNES_REFERENCES_PROMO + COLONNES_UNIQUES_LOT + COLONNES_UNIQUES_REFERENTIEL)),
+    'colonnes_ean': COLONNES_EAN_REFERENTIEL,
+    'colonnes_uniques': COLONNES_UNIQUES_REFERENTIEL,
+    'colonnes_uniques_lot': COLONNES_UNIQUES_LOT,
+    'colonnes_dates': COLONNES_DATES_REFERENTIEL,
+    'periodes': PERIODES_REFERENTIEL,
+    'fenetre_dates': FENETRE_SAISON,
+    'lignes_exclues': LIGNES_EXCLUES_EXCEL
+}
+
+SPEC_PROMO = {
+    'cle': 'promo',
+    'nom_feuille': "Promo",
+    'colonnes_obligatoires': COLONNES_PROMO,
+    'colonne_reference': "CLIENT",
+    'cle_codes': 'client',
+    'codes_autorises': CODES_CLIENTS_AUTORISES,
+    'colonnes_numeriques': COLONNES_NUMERIQUES_PROMO,
+    'colonnes_cles': COLONNES_REFERENCES_PROMO + COLONNES_EAN_PROMO,
+    'colonnes_ean': COLONNES_EAN_PROMO,
+    'colonnes_uniques': [],
+    # Colonnes de colonnes_cles dont chaque valeur doit exister dans l'onglet feuille_referencee
+    'colonnes_referencees': COLONNES_REFERENCES_PROMO,
+    'feuille_referencee': 'referentiel',
+    'colonnes_dates': COLONNES_DATES_PROMO,
+    'periodes': PERIODES_PROMO,
+    'fenetre_dates': FENETRE_SAISON,
+    'lignes_exclues': LIGNES_EXCLUES_EXCEL
+}
+
+SPECS_FEUILLES = [SPEC_REFERENTIEL, SPEC_PROMO]
+
+def version_regles():
+    """Empreinte de l'ensemble des règles : change dès qu'une liste ou une spécification ci-dessus est modifiée"""
+    return hashlib.sha256(json.dumps(SPECS_FEUILLES, sort_keys=True).encode("utf-8")).hexdigest()[:16]
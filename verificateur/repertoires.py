@@ -0,0 +1,42 @@
+"""Répertoires de travail sur disque (cache, historique, travaux, instantanés), privés à l'utilisateur"""
+
+import getpass
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+def repertoire_defaut(nom):
+    """
+    Répertoire par défaut nom, dans un dossier propre à l'utilisateur du
+    répertoire temporaire (partagé entre utilisateurs sous Linux)
+    """
+    utilisateur = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"verificateur-{utilisateur}", nom)
+
+def preparer_repertoire(repertoire):
+    """
+    Crée le répertoire (mode 0o700) s'il n'existe pas et vérifie qu'il
+    appartient à l'utilisateur courant et n'est accessible qu'à lui, dans un
+    parent où personne d'autre ne peut le remplacer. Les pickles qu'il
+    contient sont relus tels quels : un autre utilisateur qui pourrait y
+    écrire exécuterait son code dans l'application. PermissionError sinon
+    (sous Windows, sans propriétaire POSIX, seule la création est faite).
+    """
+    chemin = Path(repertoire)
+    chemin.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return chemin
+
+    infos = chemin.stat()
+    if infos.st_uid != os.getuid():
+        raise PermissionError(f"Le répertoire {chemin} appartient à un autre utilisateur")
+    if infos.st_mode & 0o077:
+        raise PermissionError(f"Le répertoire {chemin} est accessible à d'autres utilisateurs (chmod 700 requis)")
+
+    # Un parent à un autre utilisateur, ou modifiable par tous sans sticky bit (contrairement à /tmp),
+    # permettrait de remplacer le répertoire
+    parent = chemin.resolve().parent.stat()
+    if parent.st_uid not in (os.getuid(), 0) or (parent.st_mode & 0o002 and not parent.st_mode & stat.S_ISVTX):
+        raise PermissionError(f"Le répertoire parent de {chemin} peut être modifié par d'autres utilisateurs")
+    return chemin
@@ -0,0 +1,232 @@
+"""Traitement complet d'un fichier : lecture des onglets et agrégation des vérifications"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from .cles import verifier_codes_ean, verifier_unicite
+from .entetes import IndexEntete, empreinte_entete
+from .historique import charger_precedent
+from .instantanes import instantanes_par_defaut
+from .lecture import ouvrir_classeur
+from .metriques import Metriques
+from .moteur import colonnes_projetees, evaluer_feuille
+from .references import extraire_cles_lot, verifier_references
+from .regles import SPEC_REFERENTIEL, SPECS_FEUILLES
+from .verifications import detecter_colonnes_dupliquees_brutes, verifier_colonnes_obligatoires
+
+# Verdicts d'en-tête mémorisés par empreinte : les fichiers d'un même modèle
+# (même ligne 1) ne refont pas ce travail dans un processus donné
+MAX_ENTETES_MEMORISEES = 128
+_verdicts_entetes = OrderedDict()
+_verrou_entetes = threading.Lock()
+
+def _verifier_entete(entete_brute, colonnes_requises, nom_feuille):
+    """Vérifications ne nécessitant que la ligne d'en-tête d'un onglet (mémorisées par empreinte)"""
+    cle = (empreinte_entete(entete_brute), nom_feuille, tuple(colonnes_requises))
+    with _verrou_entetes:
+        verdict = _verdicts_entetes.get(cle)
+        if verdict is not None:
+            _verdicts_entetes.move_to_end(cle)
+
+    if verdict is None:
+        index = IndexEntete(entete_brute)
+        verdict = {
+            'colonnes_dupliquees_brutes': detecter_colonnes_dupliquees_brutes(index, nom_feuille),
+            'colonnes': verifier_colonnes_obligatoires(index, colonnes_requises, nom_feuille)
+        }
+        with _verrou_entetes:
+            _verdicts_entetes[cle] = verdict
+            while len(_verdicts_entetes) > MAX_ENTETES_MEMORISEES:
+                _verdicts_entetes.popitem(last=False)
+
+    # Copie : chaque résultat de fichier reste indépendant du verdict partagé
+    return copy.deepcopy(verdict)
+
+def feuille_en_erreur(resultat_feuille):
+    """Indique si l'onglet est illisible ou si l'une de ses vérifications est en erreur"""
+    if 'erreur' in resultat_feuille:
+        return True
+    for verification in resultat_feuille.values():
+        if not isinstance(verification, dict):
+            continue
+        if 'statut' in verification:
+            if verification['statut'] == 'ERREUR':
+                return True
+        # Vérifications par colonne (ex: colonnes numériques)
+        elif any(isinstance(v, dict) and v.get('statut') == 'ERREUR' for v in verification.values()):
+            return True
+    return False
+
+def _precedent_feuille(precedent, spec):
+    """Résultat précédent d'un onglet, s'il a pu être lu entièrement"""
+    feuille = (precedent or {}).get(spec['cle'])
+    return feuille if feuille is not None and 'erreur' not in feuille else None
+
+def _fichier_inchange(classeur, precedent):
+    """
+    Indique si tous les onglets vérifiés sont identiques (même empreinte) à la
+    vérification précédente, qui conserve les clés du lot de son Référentiel
+    """
+    if precedent is None or 'cles_lot' not in precedent:
+        return False
+    try:
+        return all((_precedent_feuille(precedent, spec) or {}).get('empreinte_feuille')
+                   == classeur.empreinte_feuille(spec['nom_feuille']) for spec in SPECS_FEUILLES)
+    except Exception:
+        return False
+
+def _lire_feuille(classeur, nom_feuille, empreinte, colonnes, metriques, etape):
+    """
+    Lit les colonnes d'une feuille depuis son instantané Arrow s'il existe.
+    Sinon la feuille est décodée avec la même projection de colonnes et son
+    instantané (toutes les colonnes) est écrit en flux pendant la lecture :
+    toute règle ultérieure, même sur d'autres colonnes, relira l'instantané
+    au lieu du classeur.
+    """
+    instantanes = instantanes_par_defaut()
+    if instantanes is None:
+        with metriques.mesurer(f"{etape}.chargement"):
+            return classeur.lire_feuille(nom_feuille, colonnes)
+
+    with metriques.mesurer(f"{etape}.instantane"):
+        lu = instantanes.lire(empreinte, nom_feuille, colonnes)
+    if lu is not None:
+        return lu
+    with metriques.mesurer(f"{etape}.chargement"), instantanes.ecrivain(empreinte, nom_feuille) as ecrivain:
+        return classeur.lire_feuille(nom_feuille, colonnes, ecrivain)
+
+def verifier_entetes_fichier(nom_fichier, contenu, precedent=None):
+    """
+    Vérification rapide de la structure d'un classeur (.xlsb ou .xlsx) : seule la ligne
+    d'en-tête de chaque onglet est lue (colonnes obligatoires et doublons).
+    precedent est accepté pour l'interface commune avec traiter_fichier mais
+    inutile ici : les verdicts d'en-tête sont déjà mémorisés par empreinte.
+    """
+    resultats = {
+        'nom_fichier': nom_fichier,
+        'statut_global': 'OK',
+        'mode': 'entetes',
+        'erreurs': []
+    }
+
+    with Metriques() as metriques, metriques.mesurer('total'):
+        try:
+            with metriques.mesurer('ouverture'):
+                classeur = ouvrir_classeur(contenu)
+            with classeur:
+                for spec in SPECS_FEUILLES:
+                    nom_feuille = spec['nom_feuille']
+                    try:
+                        with metriques.mesurer(f"{spec['cle']}.entete"):
+                            entete = classeur.lire_entete(nom_feuille)
+                            resultats[spec['cle']] = _verifier_entete(entete, spec['colonnes_obligatoires'], nom_feuille)
+                    except Exception as e:
+                        resultats[spec['cle']] = {'erreur': f"Impossible de lire l'onglet {nom_feuille}: {str(e)}"}
+
+            for spec in SPECS_FEUILLES:
+                if feuille_en_erreur(resultats[spec['cle']]):
+                    resultats['statut_global'] = 'ERREUR'
+
+        except Exception as e:
+            resultats['erreur_generale'] = str(e)
+            resultats['statut_global'] = 'ERREUR'
+
+    resultats['metriques'] = metriques.en_dict()
+    return resultats
+
+def _controler_cles(resultats, metriques):
+    """
+    Contrôles sur les index de clés des onglets lus, une fois par valeur
+    distincte (les références dépendent des deux onglets dont l'un a pu
+    changer), puis remplacement des index par les seules clés du lot
+    """
+    for spec in SPECS_FEUILLES:
+        feuille = resultats.get(spec['cle'])
+        if feuille is None or 'erreur' in feuille:
+            continue
+        with metriques.mesurer(f"{spec['cle']}.codes_ean"):
+            feuille['codes_ean'] = verifier_codes_ean(feuille['index_cles'], spec['colonnes_ean'])
+        with metriques.mesurer(f"{spec['cle']}.unicite"):
+            feuille['unicite'] = verifier_unicite(feuille['index_cles'], spec['colonnes_uniques'])
+        if 'feuille_referencee' not in spec:
+            continue
+        spec_referencee = next(s for s in SPECS_FEUILLES if s['cle'] == spec['feuille_referencee'])
+        with metriques.mesurer(f"{spec['cle']}.references"):
+            feuille['references'] = verifier_references(feuille, resultats.get(spec_referencee['cle']),
+                                                        spec['colonnes_referencees'], spec_referencee['nom_feuille'])
+
+    resultats['cles_lot'] = extraire_cles_lot(resultats.get(SPEC_REFERENTIEL['cle']))
+    for spec in SPECS_FEUILLES:
+        feuille = resultats.get(spec['cle'])
+        if feuille is not None:
+            feuille.pop('index_cles', None)
+
+def traiter_fichier(nom_fichier, contenu, precedent=None):
+    """
+    Traite un classeur .xlsb ou .xlsx (contenu en bytes ou chemin sur disque) et
+    retourne les résultats de vérification. precedent (résultat de la vérification
+    précédente du même fichier, ou chemin de son pickle) permet de reprendre les
+    règles dont les colonnes n'ont pas changé. Une feuille déjà décodée est relue
+    depuis son instantané Arrow (voir instantanes.py). Les colonnes de clés sont ensuite
+    contrôlées sur leur index : EAN-13, unicité, et présence dans le Référentiel
+    des clés de Promo (REFCOL, CODEPSS). Les index ne sont pas conservés : seules
+    les clés du Référentiel contrôlées entre fichiers d'un lot le sont, sous
+    forme compacte ('cles_lot', voir references.extraire_cles_lot).
+    """
+    resultats = {
+        'nom_fichier': nom_fichier,
+        'statut_global': 'OK',
+        'erreurs': []
+    }
+
+    with Metriques() as metriques, metriques.mesurer('total'):
+        try:
+            precedent = charger_precedent(precedent)
+            # Une seule ouverture du classeur pour tous les onglets
+            with metriques.mesurer('ouverture'):
+                classeur = ouvrir_classeur(contenu)
+            with classeur:
+                inchange = _fichier_inchange(classeur, precedent)
+                for spec in SPECS_FEUILLES:
+                    nom_feuille = spec['nom_feuille']
+                    if inchange:
+                        # Onglets identiques à la vérification précédente : ni lecture, ni règles, ni contrôles de clés
+                        resultats[spec['cle']] = {
+                            **precedent[spec['cle']],
+                            'regles_reprises': colonnes_projetees(spec),
+                            'feuille_reprise': True
+                        }
+                        continue
+                    try:
+                        empreinte = classeur.empreinte_feuille(nom_feuille)
+                        precedent_feuille = _precedent_feuille(precedent, spec)
+                        entete, df = _lire_feuille(classeur, nom_feuille, empreinte, colonnes_projetees(spec),
+                                                   metriques, spec['cle'])
+                        with metriques.mesurer(f"{spec['cle']}.entete"):
+                            verification_entete = _verifier_entete(entete, spec['colonnes_obligatoires'], nom_feuille)
+                        resultats[spec['cle']] = {
+                            **verification_entete,
+                            **evaluer_feuille(df, spec, metriques, precedent_feuille, classeur.date1904),
+                            'nb_lignes': len(df),
+                            'empreinte_feuille': empreinte
+                        }
+                    except Exception as e:
+                        resultats[spec['cle']] = {'erreur': f"Impossible de lire l'onglet {nom_feuille}: {str(e)}"}
+
+            if inchange:
+                resultats['cles_lot'] = precedent['cles_lot']
+            else:
+                _controler_cles(resultats, metriques)
+
+            # Déterminer le statut global
+            for spec in SPECS_FEUILLES:
+                if spec['cle'] in resultats and feuille_en_erreur(resultats[spec['cle']]):
+                    resultats['statut_global'] = 'ERREUR'
+
+        except Exception as e:
+            resultats['erreur_generale'] = str(e)
+            resultats['statut_global'] = 'ERREUR'
+
+    resultats['metriques'] = metriques.en_dict()
+    return resultats
@@ -0,0 +1,505 @@
+"""
+File de travaux de vérification en arrière-plan (base SQLite + processus worker)
+
+L'interface soumet un travail (fichiers copiés dans son répertoire) et suit sa
+progression ; un worker indépendant de Streamlit l'exécute avec le pool de
+processus, le cache et l'historique, et enregistre chaque résultat dès qu'il
+est prêt. Les travaux survivent donc aux réexécutions du script et à la
+fermeture de l'onglet, et leurs résultats restent consultables ensuite.
+
+    python -m verificateur.travaux        # worker (démarré automatiquement par l'application)
+"""
+
+import argparse
+import os
+import pickle
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .cache import CacheResultats
+from .cli import MODES
+from .historique import HistoriqueResultats
+from .metriques import profiler
+from .parallele import creer_pool, verifier_lot
+from .references import IndexLot, ajouter_doublons_lot, sans_index_cles
+from .repertoires import preparer_repertoire, repertoire_defaut
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou de fichier, un seul serveur est supposé
+    fcntl = None
+
+REPERTOIRE_TRAVAUX = os.environ.get("VERIFICATEUR_TRAVAUX_DIR", repertoire_defaut("travaux"))
+# Travaux (et résultats) conservés ce nombre de jours
+DUREE_CONSERVATION_JOURS = float(os.environ.get("VERIFICATEUR_TRAVAUX_JOURS", 7))
+
+# Un worker signale sa présence toutes les PERIODE_BATTEMENT secondes ;
+# sans signe de vie depuis DELAI_WORKER_ABSENT secondes, il est considéré arrêté
+PERIODE_BATTEMENT = 2.0
+DELAI_WORKER_ABSENT = 15.0
+# Un worker sans travail depuis ce délai s'arrête (l'application le relance au besoin)
+DELAI_INACTIVITE = 600.0
+
+# Verrous (fichiers du répertoire de la file) : lancement d'un worker par l'application, puis worker en vie
+FICHIER_VERROU_LANCEMENT = "lancement.lock"
+FICHIER_VERROU_WORKER = "worker.lock"
+
+EN_ATTENTE, EN_COURS, TERMINE, ANNULE, ECHEC = 'en_attente', 'en_cours', 'termine', 'annule', 'echec'
+STATUTS_FINAUX = (TERMINE, ANNULE, ECHEC)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS travaux (
+    id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    proprietaire TEXT,
+    statut TEXT NOT NULL,
+    soumis REAL NOT NULL,
+    debut REAL,
+    fin REAL,
+    nb_fichiers INTEGER NOT NULL,
+    annulation INTEGER NOT NULL DEFAULT 0,
+    worker INTEGER,
+    erreur TEXT,
+    cache_succes INTEGER,
+    cache_echecs INTEGER,
+    cache_entrees INTEGER,
+    cache_taille INTEGER,
+    profil INTEGER
+);
+CREATE TABLE IF NOT EXISTS fichiers (
+    travail TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    nom TEXT NOT NULL,
+    chemin TEXT NOT NULL,
+    termine REAL,
+    resultat BLOB,
+    cles_lot BLOB,
+    PRIMARY KEY (travail, position)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    battement REAL NOT NULL
+);
+"""
+# Colonnes ajoutées aux tables depuis leur création (bases existantes mises à jour à l'ouverture)
+_COLONNES_AJOUTEES = {
+    'travaux': {
+        'proprietaire': 'TEXT',
+        'cache_succes': 'INTEGER',
+        'cache_echecs': 'INTEGER',
+        'cache_entrees': 'INTEGER',
+        'cache_taille': 'INTEGER',
+        'profil': 'INTEGER'
+    },
+    'fichiers': {
+        'cles_lot': 'BLOB'
+    }
+}
+
+@contextmanager
+def _verrou_exclusif(chemin, bloquant=True):
+    """
+    Verrou exclusif (fcntl.flock) sur chemin, créé au besoin, libéré à la
+    sortie ou à la mort du processus ; produit False si, non bloquant, il est
+    déjà détenu par un autre processus
+    """
+    with open(chemin, "a") as fichier:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(fichier, fcntl.LOCK_EX | (0 if bloquant else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fichier, fcntl.LOCK_UN)
+
+class FileTravaux:
+    """
+    Stockage des travaux dans une base SQLite (mode WAL : l'interface lit
+    pendant que le worker écrit). Chaque appel ouvre sa propre connexion,
+    l'objet peut donc être partagé entre threads et processus.
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_TRAVAUX):
+        self.repertoire = preparer_repertoire(repertoire)
+        self.chemin_base = self.repertoire / "travaux.sqlite3"
+        with self._connexion() as connexion:
+            connexion.executescript(_SCHEMA)
+            # Base créée par une version antérieure : colonnes ajoutées depuis
+            for table, ajoutees in _COLONNES_AJOUTEES.items():
+                colonnes = {ligne['name'] for ligne in connexion.execute(f"PRAGMA table_info({table})")}
+                for colonne, type_sql in ajoutees.items():
+                    if colonne not in colonnes:
+                        connexion.execute(f"ALTER TABLE {table} ADD COLUMN {colonne} {type_sql}")
+
+    def _connexion(self):
+        # Transactions explicites (BEGIN IMMEDIATE) ; une transaction inachevée est annulée à la fermeture
+        connexion = sqlite3.connect(self.chemin_base, timeout=30, isolation_level=None)
+        connexion.execute("PRAGMA journal_mode=WAL")
+        connexion.row_factory = sqlite3.Row
+        return closing(connexion)
+
+    # --- Côté interface ---
+
+    def preparer(self):
+        """Réserve un identifiant de travail et son répertoire (où copier les fichiers à vérifier)"""
+        travail = uuid.uuid4().hex[:12]
+        repertoire = self.repertoire / travail
+        repertoire.mkdir()
+        return travail, repertoire
+
+    def soumettre(self, travail, fichiers, mode, proprietaire=None, profil=None):
+        """
+        Met en file un travail : fichiers (nom, chemin) dans l'ordre d'upload,
+        mode de cli.MODES, proprietaire (utilisateur ou session) seul autorisé
+        à le consulter, et profil, position d'un fichier à vérifier aussi sous
+        cProfile (voir chemin_profil)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode de vérification inconnu : {mode}")
+        with self._connexion() as connexion:
+            connexion.execute("BEGIN IMMEDIATE")
+            connexion.execute("INSERT INTO travaux (id, mode, proprietaire, statut, soumis, nb_fichiers, profil) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (travail, mode, proprietaire, EN_ATTENTE, time.time(), len(fichiers), profil))
+            connexion.executemany("INSERT INTO fichiers (travail, position, nom, chemin) VALUES (?, ?, ?, ?)",
+                                  [(travail, i, nom, str(chemin)) for i, (nom, chemin) in enumerate(fichiers)])
+            connexion.execute("COMMIT")
+        return travail
+
+    def etat(self, travail):
+        """
+        Statut et progression d'un travail (dict), None s'il n'existe pas (ou plus).
+        En attente : 'position_file' (travaux exécutés avant lui, celui en cours
+        compris) et 'fichiers_avant' (leurs fichiers restant à vérifier).
+        """
+        with self._connexion() as connexion:
+            ligne = connexion.execute(
+                "SELECT t.*, (SELECT COUNT(*) FROM fichiers f WHERE f.travail = t.id AND f.termine IS NOT NULL) "
+                "AS nb_termines FROM travaux t WHERE t.id = ?", (travail,)
+            ).fetchone()
+            if ligne is None:
+                return None
+            etat = dict(ligne)
+            if etat['statut'] == EN_ATTENTE:
+                etat['position_file'], etat['fichiers_avant'] = connexion.execute(
+                    "SELECT COUNT(*), COALESCE(SUM((SELECT COUNT(*) FROM fichiers f WHERE f.travail = t.id "
+                    "AND f.termine IS NULL)), 0) FROM travaux t WHERE t.statut = ? OR (t.statut = ? AND t.soumis < ?)",
+                    (EN_COURS, EN_ATTENTE, etat['soumis'])
+                ).fetchone()
+        return etat
+
+    def chemin_profil(self, travail):
+        """Statistiques cProfile (pstats) du fichier à profiler d'un travail, une fois celui-ci terminé"""
+        return self.repertoire / f"{travail}.pstats"
+
+    def noms_fichiers(self, travail):
+        with self._connexion() as connexion:
+            return [ligne['nom'] for ligne in connexion.execute(
+                "SELECT nom FROM fichiers WHERE travail = ? ORDER BY position", (travail,))]
+
+    def resultats(self, travail, depuis=None):
+        """
+        Résultats disponibles {position: résultat} ; avec depuis (horodatage),
+        seulement ceux terminés depuis, pour un suivi incrémental
+        """
+        requete = "SELECT position, resultat FROM fichiers WHERE travail = ? AND termine IS NOT NULL"
+        parametres = [travail]
+        if depuis is not None:
+            requete += " AND termine >= ?"
+            parametres.append(depuis)
+        with self._connexion() as connexion:
+            return {ligne['position']: pickle.loads(ligne['resultat']) for ligne in connexion.execute(requete, parametres)}
+
+    def annuler(self, travail):
+        """Demande l'annulation (prise en compte par le worker entre deux fichiers)"""
+        with self._connexion() as connexion:
+            connexion.execute("UPDATE travaux SET annulation = 1 WHERE id = ?", (travail,))
+            # Travail pas encore démarré : annulé immédiatement
+            connexion.execute("UPDATE travaux SET statut = ?, fin = ? WHERE id = ? AND statut = ?",
+                              (ANNULE, time.time(), travail, EN_ATTENTE))
+
+    def travaux_recents(self, proprietaire, limite=20):
+        """Derniers travaux soumis par proprietaire"""
+        with self._connexion() as connexion:
+            return [dict(ligne) for ligne in connexion.execute(
+                "SELECT * FROM travaux WHERE proprietaire = ? ORDER BY soumis DESC LIMIT ?", (proprietaire, limite))]
+
+    def worker_actif(self):
+        with self._connexion() as connexion:
+            return connexion.execute("SELECT COUNT(*) FROM workers WHERE battement > ?",
+                                     (time.time() - DELAI_WORKER_ABSENT,)).fetchone()[0] > 0
+
+    def assurer_worker(self):
+        """
+        Démarre un worker détaché (indépendant du serveur Streamlit) si aucun
+        n'est actif. Vérification et lancement se font sous un verrou exclusif :
+        deux sessions simultanées ne démarrent pas deux workers (deux pools et
+        deux budgets mémoire).
+        """
+        with _verrou_exclusif(self.repertoire / FICHIER_VERROU_LANCEMENT):
+            if self.worker_actif():
+                return False
+            processus = subprocess.Popen(
+                [sys.executable, "-m", "verificateur.travaux", "--repertoire", str(self.repertoire)],
+                cwd=Path(__file__).resolve().parent.parent,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            # Inscrit avant de libérer le verrou : la session suivante le voit actif pendant son démarrage
+            self.signaler(processus.pid)
+        return True
+
+    # --- Côté worker ---
+
+    def signaler(self, pid):
+        with self._connexion() as connexion:
+            connexion.execute("INSERT OR REPLACE INTO workers (pid, battement) VALUES (?, ?)", (pid, time.time()))
+
+    def retirer_worker(self, pid):
+        with self._connexion() as connexion:
+            connexion.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def reserver(self, pid):
+        """
+        Attribue au worker le plus ancien travail en attente, ou un travail en cours
+        dont le worker a disparu (il reprend alors là où celui-ci s'était arrêté)
+        """
+        limite = time.time() - DELAI_WORKER_ABSENT
+        with self._connexion() as connexion:
+            connexion.execute("BEGIN IMMEDIATE")
+            ligne = connexion.execute(
+                "SELECT id FROM travaux WHERE statut = ? OR (statut = ? AND worker NOT IN "
+                "(SELECT pid FROM workers WHERE battement > ?)) ORDER BY soumis LIMIT 1",
+                (EN_ATTENTE, EN_COURS, limite)
+            ).fetchone()
+            if ligne is not None:
+                connexion.execute("UPDATE travaux SET statut = ?, worker = ?, debut = COALESCE(debut, ?) WHERE id = ?",
+                                  (EN_COURS, pid, time.time(), ligne['id']))
+            connexion.execute("COMMIT")
+        return None if ligne is None else ligne['id']
+
+    def fichiers_restants(self, travail):
+        """(mode, proprietaire, [(position, nom, chemin)]) des fichiers d'un travail encore sans résultat"""
+        with self._connexion() as connexion:
+            ligne = connexion.execute("SELECT mode, proprietaire FROM travaux WHERE id = ?", (travail,)).fetchone()
+            restants = [(ligne['position'], ligne['nom'], ligne['chemin']) for ligne in connexion.execute(
+                "SELECT position, nom, chemin FROM fichiers WHERE travail = ? AND termine IS NULL ORDER BY position",
+                (travail,))]
+        return ligne['mode'], ligne['proprietaire'], restants
+
+    def fichier(self, travail, position):
+        """(nom, chemin) d'un fichier d'un travail"""
+        with self._connexion() as connexion:
+            ligne = connexion.execute("SELECT nom, chemin FROM fichiers WHERE travail = ? AND position = ?",
+                                      (travail, position)).fetchone()
+        return ligne['nom'], ligne['chemin']
+
+    def enregistrer_resultat(self, travail, position, resultat):
+        """
+        Enregistre le résultat d'un fichier, sans ses clés du lot : celles-ci,
+        enregistrées à part, ne sont relues que par annoter_doublons_lot
+        """
+        donnees = pickle.dumps(sans_index_cles(resultat), protocol=pickle.HIGHEST_PROTOCOL)
+        cles_lot = resultat.get('cles_lot')
+        if cles_lot is not None:
+            cles_lot = pickle.dumps(cles_lot, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connexion() as connexion:
+            connexion.execute("UPDATE fichiers SET resultat = ?, cles_lot = ?, termine = ? "
+                              "WHERE travail = ? AND position = ?", (donnees, cles_lot, time.time(), travail, position))
+
+    def annoter_doublons_lot(self, travail):
+        """
+        Complète les résultats des fichiers d'un travail dont des clés sont aussi
+        déclarées dans un autre de ses fichiers ('doublons_lot', voir IndexLot),
+        puis supprime les clés du lot, devenues inutiles
+        """
+        index_lot = IndexLot()
+        positions = []
+        with self._connexion() as connexion:
+            for ligne in connexion.execute("SELECT position, nom, cles_lot FROM fichiers "
+                                           "WHERE travail = ? AND termine IS NOT NULL ORDER BY position", (travail,)):
+                cles_lot = None if ligne['cles_lot'] is None else pickle.loads(ligne['cles_lot'])
+                index_lot.ajouter_cles(ligne['nom'], cles_lot)
+                positions.append(ligne['position'])
+        a_enregistrer = []
+        for position, doublons in zip(positions, index_lot.doublons()):
+            if not doublons:
+                continue
+            with self._connexion() as connexion:
+                ligne = connexion.execute("SELECT resultat FROM fichiers WHERE travail = ? AND position = ?",
+                                          (travail, position)).fetchone()
+            resultat = ajouter_doublons_lot(pickle.loads(ligne['resultat']), doublons)
+            a_enregistrer.append((pickle.dumps(resultat, protocol=pickle.HIGHEST_PROTOCOL), travail, position))
+        with self._connexion() as connexion:
+            connexion.execute("BEGIN IMMEDIATE")
+            connexion.executemany("UPDATE fichiers SET resultat = ? WHERE travail = ? AND position = ?", a_enregistrer)
+            connexion.execute("UPDATE fichiers SET cles_lot = NULL WHERE travail = ?", (travail,))
+            connexion.execute("COMMIT")
+
+    def enregistrer_statistiques_cache(self, travail, succes, echecs, statistiques):
+        """
+        Succès et échecs du cache pour ce travail (cumulés si le travail a été
+        repris par un autre worker) et occupation du cache à la fin
+        """
+        with self._connexion() as connexion:
+            connexion.execute(
+                "UPDATE travaux SET cache_succes = COALESCE(cache_succes, 0) + ?, "
+                "cache_echecs = COALESCE(cache_echecs, 0) + ?, cache_entrees = ?, cache_taille = ? WHERE id = ?",
+                (succes, echecs, statistiques['entrees_disque'], statistiques['taille_disque'], travail))
+
+    def annulation_demandee(self, travail):
+        with self._connexion() as connexion:
+            return bool(connexion.execute("SELECT annulation FROM travaux WHERE id = ?", (travail,)).fetchone()[0])
+
+    def terminer(self, travail, statut, erreur=None):
+        with self._connexion() as connexion:
+            connexion.execute("UPDATE travaux SET statut = ?, fin = ?, erreur = ? WHERE id = ?",
+                              (statut, time.time(), erreur, travail))
+        # Les copies des fichiers ne servent plus : seuls les résultats sont conservés
+        shutil.rmtree(self.repertoire / travail, ignore_errors=True)
+
+    def purger(self, duree_jours=DUREE_CONSERVATION_JOURS):
+        """Supprime les travaux terminés depuis plus de duree_jours"""
+        limite = time.time() - duree_jours * 86400
+        with self._connexion() as connexion:
+            anciens = [ligne['id'] for ligne in connexion.execute(
+                f"SELECT id FROM travaux WHERE statut IN ({', '.join('?' * len(STATUTS_FINAUX))}) AND fin < ?",
+                (*STATUTS_FINAUX, limite))]
+            for travail in anciens:
+                connexion.execute("DELETE FROM fichiers WHERE travail = ?", (travail,))
+                connexion.execute("DELETE FROM travaux WHERE id = ?", (travail,))
+        for travail in anciens:
+            shutil.rmtree(self.repertoire / travail, ignore_errors=True)
+            self.chemin_profil(travail).unlink(missing_ok=True)
+        return len(anciens)
+
+def _profiler_fichier(file_travaux, travail, mode, position, pool):
+    """
+    Vérifie à nouveau sous cProfile le fichier demandé à la soumission, depuis
+    sa copie sur disque. Le travail étant terminé, la vérification tourne
+    seule dans le pool du worker : elle respecte le budget mémoire comme
+    tout fichier admis seul.
+    """
+    nom, chemin = file_travaux.fichier(travail, position)
+    try:
+        pool.submit(profiler, MODES[mode], nom, chemin, str(file_travaux.chemin_profil(travail))).result()
+    except BrokenProcessPool:
+        raise
+    except Exception:
+        # Le résultat du fichier est déjà enregistré : seul le profil manque
+        file_travaux.chemin_profil(travail).unlink(missing_ok=True)
+
+def executer_travail(file_travaux, travail, pool, cache=None, historique=None):
+    """Vérifie les fichiers encore sans résultat d'un travail ; retourne son statut final"""
+    if file_travaux.annulation_demandee(travail):
+        # Travail repris après l'arrêt de son worker, mais annulé entre-temps
+        file_travaux.annoter_doublons_lot(travail)
+        return ANNULE
+    mode, proprietaire, restants = file_travaux.fichiers_restants(travail)
+    fichiers = [(nom, chemin) for _, nom, chemin in restants]
+    succes, echecs = (cache.succes, cache.echecs) if cache is not None else (0, 0)
+    lot = verifier_lot(fichiers, MODES[mode], pool, cache=cache, historique=historique, proprietaire=proprietaire)
+    try:
+        for i, future in lot:
+            try:
+                resultat = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    raise
+                resultat = {'nom_fichier': fichiers[i][0], 'statut_global': 'ERREUR', 'erreur_generale': str(e)}
+            file_travaux.enregistrer_resultat(travail, restants[i][0], resultat)
+            if file_travaux.annulation_demandee(travail):
+                break
+    finally:
+        # Travail terminé ou annulé : les fichiers pas encore démarrés sont abandonnés
+        lot.close()
+        if cache is not None:
+            file_travaux.enregistrer_statistiques_cache(travail, cache.succes - succes, cache.echecs - echecs,
+                                                        cache.statistiques())
+    # Clés partagées entre fichiers, connues une fois le lot terminé (ou annulé) : avant le statut final,
+    # que l'interface attend pour afficher les résultats
+    file_travaux.annoter_doublons_lot(travail)
+    if file_travaux.annulation_demandee(travail):
+        return ANNULE
+    profil = file_travaux.etat(travail)['profil']
+    if profil is not None:
+        _profiler_fichier(file_travaux, travail, mode, profil, pool)
+    return TERMINE
+
+def executer_worker(file_travaux, nb_processus=None, delai_inactivite=DELAI_INACTIVITE):
+    """
+    Exécute les travaux en attente un par un, jusqu'à delai_inactivite sans
+    travail. Le worker détient un verrou toute sa vie : un second worker
+    (lancé à la main...) s'arrête aussitôt et retourne False.
+    """
+    with _verrou_exclusif(file_travaux.repertoire / FICHIER_VERROU_WORKER, bloquant=False) as acquis:
+        if not acquis:
+            # Inscrit par assurer_worker pendant son lancement
+            file_travaux.retirer_worker(os.getpid())
+            return False
+        _boucle_worker(file_travaux, nb_processus, delai_inactivite)
+    return True
+
+def _boucle_worker(file_travaux, nb_processus, delai_inactivite):
+    pid = os.getpid()
+    arret = threading.Event()
+
+    def battre():
+        while not arret.wait(PERIODE_BATTEMENT):
+            file_travaux.signaler(pid)
+
+    file_travaux.signaler(pid)
+    threading.Thread(target=battre, daemon=True).start()
+    file_travaux.purger()
+
+    pool = creer_pool(nb_processus)
+    cache = CacheResultats()
+    historique = HistoriqueResultats()
+    dernier_travail = time.monotonic()
+    try:
+        while time.monotonic() - dernier_travail < delai_inactivite:
+            travail = file_travaux.reserver(pid)
+            if travail is None:
+                time.sleep(0.5)
+                continue
+            try:
+                file_travaux.terminer(travail, executer_travail(file_travaux, travail, pool, cache, historique))
+            except BrokenProcessPool as e:
+                # Un processus du pool est mort (mémoire...) : pool recréé pour les travaux suivants
+                file_travaux.terminer(travail, ECHEC, f"Processus de vérification interrompu : {e}")
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = creer_pool(nb_processus)
+            except Exception as e:
+                file_travaux.terminer(travail, ECHEC, str(e))
+            dernier_travail = time.monotonic()
+    finally:
+        arret.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        file_travaux.retirer_worker(pid)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m verificateur.travaux",
+                                     description="Worker de la file de travaux de vérification")
+    parser.add_argument("--repertoire", default=REPERTOIRE_TRAVAUX, help="Répertoire de la file (base SQLite et fichiers)")
+    parser.add_argument("-j", "--processus", type=int, default=None, help="Nombre de processus de vérification")
+    parser.add_argument("--inactivite", type=float, default=DELAI_INACTIVITE,
+                        help="Arrêt après ce nombre de secondes sans travail")
+    args = parser.parse_args(argv)
+    executer_worker(FileTravaux(args.repertoire), args.processus, args.inactivite)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Vérifications unitaires d'un onglet (en-têtes, codes clients, colonnes numériques)"""
+
+from .entetes import IndexEntete
+from .moteur import evaluer_regle
+from .regles import SPEC_PROMO, SPEC_REFERENTIEL
+
+def detecter_colonnes_dupliquees_brutes(raw_header, nom_feuille):
+    """
+    Détecte les colonnes strictement dupliquées en analysant les en-têtes bruts
+    sans passer par pandas qui peut automatiquement renommer les doublons
+    (raw_header : liste brute ou IndexEntete déjà construit)
+    """
+    index = raw_header if isinstance(raw_header, IndexEntete) else IndexEntete(raw_header)
+    duplicatas = index.doublons
+    details_duplicatas = [f"'{nom_str}' en colonnes Excel {premiere+1} et {i+1}" for nom_str, premiere, i in duplicatas]
+
+    if duplicatas:
+        return {
+            'statut': 'ERREUR',
+            'nb_duplicatas': len(duplicatas),
+            'duplicatas': duplicatas,
+            'details': f"{len(duplicatas)} colonne(s) dupliquée(s) : " + " | ".join(details_duplicatas),
+            'details_liste': details_duplicatas
+        }
+    else:
+        return {
+            'statut': 'OK',
+            'nb_duplicatas': 0,
+            'duplicatas': [],
+            'details': 'Aucune colonne strictement dupliquée détectée',
+            'details_liste': []
+        }
+
+def verifier_colonnes_dupliquees(df, nom_feuille):
+    """Vérifie s'il y a des colonnes dupliquées dans les en-têtes (ligne 1) - Ancienne méthode"""
+    colonnes = df.columns.tolist()
+    colonnes_dupliquees = []
+    colonnes_vues = {}
+    
+    for i, col in enumerate(colonnes):
+        if col in colonnes_vues:
+            if col not in colonnes_dupliquees:
+                colonnes_dupliquees.append(col)
+        else:
+            colonnes_vues[col] = i
+    
+    if colonnes_dupliquees:
+        return {
+            'statut': 'ERREUR',
+            'colonnes_dupliquees': colonnes_dupliquees,
+            'details': f"Colonnes dupliquées détectées: {', '.join(colonnes_dupliquees)}"
+        }
+    else:
+        return {
+            'statut': 'OK',
+            'colonnes_dupliquees': [],
+            'details': 'Aucune colonne dupliquée détectée'
+        }
+
+def verifier_colonnes_obligatoires(colonnes_presentes, colonnes_requises, nom_feuille):
+    """
+    Vérifie la présence des colonnes obligatoires dans une feuille (d'après ses
+    noms de colonnes ou un IndexEntete) ; une colonne absente mais présente sous
+    une orthographe approchante (casse, espaces) est signalée dans colonnes_approchantes
+    """
+    index = colonnes_presentes if isinstance(colonnes_presentes, IndexEntete) else IndexEntete(colonnes_presentes)
+    colonnes_manquantes = [col for col in colonnes_requises if col not in index]
+    colonnes_approchantes = {}
+    for col in colonnes_manquantes:
+        approchantes = index.approchantes(col)
+        if approchantes:
+            colonnes_approchantes[col] = approchantes
+
+    return {
+        'nom_feuille': nom_feuille,
+        'colonnes_manquantes': colonnes_manquantes,
+        'nb_colonnes_manquantes': len(colonnes_manquantes),
+        'nb_colonnes_totales': len(colonnes_requises),
+        'colonnes_approchantes': colonnes_approchantes,
+        'statut': 'OK' if len(colonnes_manquantes) == 0 else 'ERREUR'
+    }
+
+def verifier_codeclient(df):
+    """Vérifie la validité de la colonne CODECLIENT (onglet Référentiel)"""
+    return evaluer_regle(df, SPEC_REFERENTIEL, 'codes')
+
+def verifier_client(df):
+    """Vérifie la validité de la colonne CLIENT pour l'onglet PROMO"""
+    return evaluer_regle(df, SPEC_PROMO, 'codes')
+
+def verifier_colonnes_numeriques(df, colonnes_num, colonne_reference="CODECLIENT"):
+    """Vérifie que les colonnes spécifiées contiennent uniquement des chiffres"""
+    spec = {**SPEC_REFERENTIEL, 'colonne_reference': colonne_reference, 'colonnes_numeriques': colonnes_num}
+    return evaluer_regle(df, spec, 'colonnes_numeriques')